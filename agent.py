@@ -1,10 +1,13 @@
 import logging
 import os
 import sys
+import threading
 
 from strands import Agent
 from strands.agent.conversation_manager import SlidingWindowConversationManager
 from strands.models import BedrockModel
+from strands.models.model import Model
+from strands.tools.executors import ConcurrentToolExecutor, SequentialToolExecutor
 from strands_tools import current_time
 
 from custom_tools import CustomTools
@@ -13,30 +16,45 @@ from custom_tools import CustomTools
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 MODEL_ID = os.getenv("MODEL_ID", "us.anthropic.claude-haiku-4-5-20251001-v1:0")
 MODEL_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", "0.2"))
+MODEL_STREAMING = os.getenv("MODEL_STREAMING", "True").lower() == "true"
+TOOL_EXECUTION = os.getenv("TOOL_EXECUTION", "concurrent").lower()
 
 # Basic logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 
-# Initialize custom tools
-custom_tools = CustomTools()
+# Custom tools are shared by all agents and created with the first agent
+_custom_tools: CustomTools | None = None
+_custom_tools_lock = threading.Lock()
 
 
-def create_agent() -> Agent:
+def get_custom_tools() -> CustomTools:
+    global _custom_tools
+    with _custom_tools_lock:
+        if _custom_tools is None:
+            _custom_tools = CustomTools()
+        return _custom_tools
+
+
+def create_model() -> Model:
     # Create an Amazon Bedrock model instance
     # Assumes you have handled your AWS credentials and configuration
-
     model = BedrockModel(
         model_id=MODEL_ID,
         region_name=AWS_REGION,
         temperature=MODEL_TEMPERATURE,
-        streaming=False,
+        streaming=MODEL_STREAMING,
         cache_prompt="default",
         cache_tools="default",
         include_tool_result_status=True,
     )
     logger.info(f"Model initialized: {model.config}")
+    return model
+
+
+def create_agent(model: Model | None = None) -> Agent:
+    model = model or create_model()
     # Create a conversation manager
     conversation_manager = SlidingWindowConversationManager(
         window_size=20,
@@ -47,8 +65,11 @@ def create_agent() -> Agent:
 
 You are a helpful assistant. 
 Try to use the google_search first for general queries, and use tavily_ai_search for more specific or content-rich queries. The google_search tool is best for finding the latest information on trending topics, while the tavily_ai_search tool is best for retrieving curated content and detailed information on specific subjects. 
+When you need several searches, request them together in a single response so they run in parallel.
 Important, always show your work, the tools you used, and the commands you executed."""
 
+    custom_tools = get_custom_tools()
+
     # Create an agent with these tools
     search_agent = Agent(
         system_prompt=main_system_prompt,
@@ -59,5 +80,10 @@ Important, always show your work, the tools you used, and the commands you execu
             custom_tools.tavily_ai_search,
         ],
         conversation_manager=conversation_manager,
+        tool_executor=(
+            ConcurrentToolExecutor()
+            if TOOL_EXECUTION == "concurrent"
+            else SequentialToolExecutor()
+        ),
     )
     return search_agent
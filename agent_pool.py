@@ -0,0 +1,155 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from strands import Agent
+
+from metrics import metrics
+from tracing import span
+
+# Load environment variables
+AGENT_POOL_MAX_SIZE = int(os.getenv("AGENT_POOL_MAX_SIZE", "4"))
+AGENT_POOL_IDLE_SECONDS = float(os.getenv("AGENT_POOL_IDLE_SECONDS", "600"))
+AGENT_POOL_CHECKOUT_TIMEOUT = float(os.getenv("AGENT_POOL_CHECKOUT_TIMEOUT", "120"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+@dataclass
+class PooledAgent:
+    agent: Agent
+    session_key: str | None = None
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class AgentPool:
+    """A bounded pool of agents, built lazily and checked out per request or per Gradio session.
+
+    Strands agents are stateful and may not be invoked concurrently, so each
+    checkout gets exclusive use of an agent. Agents checked out with a session key
+    keep their conversation for the next checkout with the same key; all other
+    checkouts start with an empty conversation.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Agent],
+        max_size: int = AGENT_POOL_MAX_SIZE,
+        idle_seconds: float = AGENT_POOL_IDLE_SECONDS,
+        checkout_timeout: float = AGENT_POOL_CHECKOUT_TIMEOUT,
+    ):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self._idle: list[PooledAgent] = []
+        self._size = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def checkout(self, session_key: str | None = None) -> Iterator[Agent]:
+        """Check out an agent for the duration of the `with` block.
+
+        Args:
+            session_key (str, optional): The Gradio session hash, to reuse the session's conversation.
+        Returns:
+            Agent: An agent reserved for the caller until the block exits.
+        """
+        with span("agent_pool.checkout", session=session_key is not None):
+            pooled_agent = self._acquire(session_key)
+        try:
+            yield pooled_agent.agent
+        finally:
+            self._release(pooled_agent, session_key)
+
+    def _acquire(self, session_key: str | None) -> PooledAgent:
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        pooled_agent = None
+        with self._condition:
+            while True:
+                self._evict_idle_locked()
+                pooled_agent = self._take_idle_locked(session_key)
+                if pooled_agent or self._size < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.increment("agent_pool.timeouts")
+                    raise TimeoutError(
+                        f"No agent available after waiting {self.checkout_timeout:.0f}s."
+                    )
+                self._condition.wait(remaining)
+            if pooled_agent is None:
+                self._size += 1
+            self._in_use += 1
+
+        if pooled_agent is None:
+            try:
+                pooled_agent = PooledAgent(agent=self.factory())
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+            metrics.increment("agent_pool.created")
+            logger.info(f"Agent pool grew to {self._size} agent(s).")
+
+        if session_key is None or pooled_agent.session_key != session_key:
+            pooled_agent.agent.messages = []
+
+        metrics.increment("agent_pool.checkouts")
+        metrics.observe("agent_pool.wait_ms", (time.monotonic() - start) * 1000)
+        self._publish_gauges()
+        return pooled_agent
+
+    def _release(self, pooled_agent: PooledAgent, session_key: str | None) -> None:
+        pooled_agent.session_key = session_key
+        pooled_agent.last_used = time.monotonic()
+        with self._condition:
+            self._idle.append(pooled_agent)
+            self._in_use -= 1
+            self._condition.notify()
+        self._publish_gauges()
+
+    def _take_idle_locked(self, session_key: str | None) -> PooledAgent | None:
+        if not self._idle:
+            return None
+        if session_key is not None:
+            for idx, pooled_agent in enumerate(self._idle):
+                if pooled_agent.session_key == session_key:
+                    return self._idle.pop(idx)
+        # Most recently used first, so surplus agents age out of the pool
+        return self._idle.pop()
+
+    def _evict_idle_locked(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        expired = [p for p in self._idle if p.last_used < cutoff]
+        if not expired:
+            return
+        self._idle = [p for p in self._idle if p.last_used >= cutoff]
+        self._size -= len(expired)
+        metrics.increment("agent_pool.evicted", len(expired))
+        logger.info(f"Evicted {len(expired)} idle agent(s) from the agent pool.")
+
+    def evict_idle(self) -> None:
+        with self._condition:
+            self._evict_idle_locked()
+        self._publish_gauges()
+
+    def _publish_gauges(self) -> None:
+        with self._condition:
+            size, in_use, idle = self._size, self._in_use, len(self._idle)
+        metrics.set_gauge("agent_pool.size", size)
+        metrics.set_gauge("agent_pool.in_use", in_use)
+        metrics.set_gauge("agent_pool.idle", idle)
+        metrics.set_gauge("agent_pool.max_size", self.max_size)
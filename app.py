@@ -1,4 +1,3 @@
-import json
 import logging
 import sys
 
@@ -6,8 +5,10 @@ import gradio as gr
 from gradio.themes import Base, GoogleFont
 
 import utilities
-from data import Recommendation
 from form_choices import FormChoices
+from metrics import startup_timer
+from tracing import traced
+from usage import usage_tracker
 
 # Basic logging
 logger = logging.getLogger(__name__)
@@ -49,40 +50,10 @@ with gr.Blocks(
                 gr.Markdown(
                     "View some of the hottest content currently trending on major streaming platforms."
                 )
-                currently_trending_output = gr.Markdown(
-                    label="Recommendations",
-                    visible=False,
+                currently_trending_output = gr.HTML(
+                    "<p style='color: gray;'>No current recommendations available.</p>"
                 )
 
-                @gr.render(inputs=[currently_trending_output])
-                def current_trending(recommendations_json_string):
-                    if not recommendations_json_string:
-                        return "<p style='color: gray;'>No current recommendations available.</p>"
-                    logger.debug(
-                        f"Received recommendations JSON string: {recommendations_json_string}"
-                    )
-                    recommendations = json.loads(recommendations_json_string)
-                    recommendations = [
-                        Recommendation.model_validate(rec) for rec in recommendations
-                    ]
-                    logger.debug(f"Validated recommendations data: {recommendations}")
-                    cards_html = ""
-                    for recommendation in recommendations:
-                        cards_html += f"""<div class="card">
-                            <img class="main-img" src="gradio_api/file=assets/coming_soon.jpg" alt="{recommendation.title}">
-                            <div class="title">{recommendation.title}</div>
-                            <div class="platform">{recommendation.streaming_platform}</div>
-                            <div class="reason">{recommendation.reason}</div>
-                            <div class="card-footer">
-                                <div><a class="link" href="{recommendation.url}" target="_blank">Watch Now</a></div>
-                            </div>
-                        </div>"""
-
-                    start_html = """<div class="recommendations-container"><div class="grid" id="recommendationsGrid">"""
-                    end_html = """</div></div>"""
-                    html = f"{start_html}{cards_html}{end_html}"
-                    gr.HTML(html)
-
     with gr.Tab("Viewer Profile", id="viewer_information", elem_classes="form"):
         with gr.Row():
             with gr.Column(scale=1):
@@ -451,6 +422,10 @@ with gr.Blocks(
                         max_lines=20,
                         value="Viewer description will appear here...",
                     )
+                with gr.Accordion("Viewers Like You Also Liked", open=False):
+                    viewers_like_you_output = gr.Markdown(
+                        value="Similar viewers' favorites will appear here after generating a viewer description.",
+                    )
         with gr.Row():
             with gr.Column(scale=1, elem_classes="form", show_progress=True):
                 with gr.Accordion("3. Generate Recommendations", open=True):
@@ -464,38 +439,11 @@ with gr.Blocks(
                     demo_recommendations_button = gr.Button(
                         "Generate Recommendations", variant="primary"
                     )
-                    demo_recommendations_output = gr.Markdown(
-                        label="Recommendations",
-                        visible=False,
-                    )
-
-        @gr.render(inputs=[demo_recommendations_output])
-        def dynamic_display(recommendations_json_string):
-            if not recommendations_json_string:
-                html = "<p style='color: gray;'>Your personalized recommendations will appear here...</p>"
-            else:
-                recommendations = json.loads(recommendations_json_string)
-                logger.debug(f"Recommendations JSON data loaded: {recommendations}")
-                recommendations = [
-                    Recommendation.model_validate(rec) for rec in recommendations
-                ]
+                    demo_recommendations_status = gr.Markdown()
 
-                logger.debug(f"Validated recommendations data: {recommendations}")
-                cards_html = ""
-                for recommendation in recommendations:
-                    cards_html += f"""<div class="card">
-                        <img class="main-img" src="gradio_api/file=assets/coming_soon.jpg" alt="{recommendation.title}">
-                        <div class="title">{recommendation.title}</div>
-                        <div class="platform">{recommendation.streaming_platform}</div>
-                        <div class="reason">{recommendation.reason}</div>
-                        <div class="card-footer">
-                            <div><a class="link" href="{recommendation.url}" target="_blank">Watch Now</a></div>
-                        </div>
-                    </div>"""
-                start_html = """<div class="recommendations-container"><h1 class="recommendations-title">Your Recommendations</h1><div class="grid" id="recommendationsGrid">"""
-                end_html = """</div></div>"""
-                html = f"{start_html}{cards_html}{end_html}"
-            gr.HTML(html)
+        demo_recommendations_output = gr.HTML(
+            "<p style='color: gray;'>Your personalized recommendations will appear here...</p>"
+        )
 
     with gr.Tab(label="Content Concierge", id="chatbot", elem_classes="form"):
         gr.Markdown("## Content Concierge", elem_classes="blue-text")
@@ -524,30 +472,43 @@ with gr.Blocks(
                     elem_classes="message-input",
                 )
 
+            @traced("ui.chat_user")
             def user(user_message, history: list):
                 return "", history + [{"role": "user", "content": user_message}]
 
-            def bot(history: list):
-                history.append(
-                    {
-                        "role": "assistant",
-                        "content": str(utilities.chat_with_agent(history)),
-                    }
-                )
+            @traced("ui.chat_bot")
+            def bot(history: list, request: gr.Request):
+                tool_messages = []
+                answer = {"role": "assistant", "content": ""}
+                for content, tool_progress in utilities.chat_with_agent(
+                    history, request=request
+                ):
+                    if tool_progress:
+                        tool_messages.append(
+                            {
+                                "role": "assistant",
+                                "content": tool_progress,
+                                "metadata": {"title": "🔧 Searching"},
+                            }
+                        )
+                    answer["content"] = content
+                    yield history + tool_messages + (
+                        [answer] if answer["content"] else []
+                    )
                 logger.debug(f"Chat history updated: {history}")
-                return history
 
     with gr.Tab("System Status", id="system-overview", elem_classes="form"):
         gr.Markdown("## System Status", elem_classes="blue-text")
         with gr.Row():
             with gr.Column(scale=1):
+                # Rendered from the cached health check on each page load
                 model_status_output = gr.Markdown(
-                    value=utilities.check_agent_health(),
+                    value=traced("ui.system_status")(utilities.system_status),
                     elem_id="config-info",
                 )
                 refresh_status_button = gr.Button("Refresh Status", variant="primary")
         refresh_status_button.click(
-            fn=utilities.check_agent_health,
+            fn=traced("ui.check_agent_health")(utilities.check_agent_health),
             inputs=None,
             outputs=model_status_output,
         )
@@ -561,7 +522,9 @@ with gr.Blocks(
     ).then(fn=bot, inputs=[chatbot], outputs=chatbot)
 
     demo_viewer_description_button.click(
-        fn=utilities.retrieve_viewer_description,
+        fn=traced("ui.retrieve_viewer_description")(
+            utilities.retrieve_viewer_description
+        ),
         inputs=[
             viewer_profile_section,
             viewer_information_to_include,
@@ -570,19 +533,43 @@ with gr.Blocks(
             demo_personalization_data_output,
             demo_viewer_description_output,
         ],
+    ).then(
+        fn=traced("ui.retrieve_viewers_like_you")(utilities.retrieve_viewers_like_you),
+        inputs=[viewer_profile_section],
+        outputs=[viewers_like_you_output],
+    )
+
+    # Show saved recommendations, such as those from precompute.py, as soon as a viewer is selected
+    viewer_profile_section.change(
+        fn=traced("ui.retrieve_saved_recommendations")(
+            utilities.retrieve_saved_recommendations
+        ),
+        inputs=[viewer_profile_section],
+        outputs=[
+            demo_recommendations_output,
+            demo_recommendations_status,
+        ],
     )
 
     demo_recommendations_button.click(
-        fn=utilities.retrieve_recommendations_to_grid,
-        inputs=[demo_viewer_description_output, recommendation_count_value],
+        fn=traced("ui.retrieve_recommendations_to_grid")(
+            utilities.retrieve_recommendations_to_grid
+        ),
+        inputs=[
+            demo_viewer_description_output,
+            recommendation_count_value,
+            viewer_profile_section,
+            viewer_information_to_include,
+        ],
         outputs=[
             demo_recommendations_output,
+            demo_recommendations_status,
         ],
         show_progress="full",
     )
 
     save_viewer_profile_button.click(
-        fn=utilities.create_viewer_profile,
+        fn=traced("ui.create_viewer_profile")(utilities.create_viewer_profile),
         inputs=[
             first_name_input,
             last_name_input,
@@ -628,7 +615,7 @@ with gr.Blocks(
     )
 
     demo.load(
-        utilities.generate_welcome_message,
+        traced("ui.generate_welcome_message")(utilities.generate_welcome_message),
         None,
         [
             welcome_message,
@@ -681,10 +668,26 @@ with gr.Blocks(
         ],
     )
 
-demo.queue()
+startup_timer.mark("build_ui")
+
+# With the scheduler on, events are not limited here, so waiting requests reach the scheduler, which
+# admits them by priority and sheds them past their SLA; without it, allow as many as there are pooled agents
+concurrency_limit = (
+    None if utilities.scheduler.enabled else utilities.agent_pool.max_size
+)
+demo.queue(default_concurrency_limit=concurrency_limit)
 demo.launch(
     allowed_paths=["./", "./images/"],
     auth=utilities.authenticate_user,
     auth_message="Please log in to access the Personalized Recommendations Agent.",
     favicon_path="favicon.ico",
+    prevent_thread_lock=True,
 )
+startup_timer.mark("launch")
+startup_timer.finish()
+
+# The first model call happens after the server is up, and warms the agent pool
+utilities.start_background_health_check()
+utilities.trending_feed.start()
+usage_tracker.start_periodic_flush()
+demo.block_thread()
@@ -0,0 +1,269 @@
+"""Load-test the app's request handlers with a stubbed Bedrock model and stubbed search APIs.
+
+Drives utilities.retrieve_viewer_description, retrieve_recommendations_to_grid,
+chat_with_agent, save_viewer_profile and authenticate_user from a thread pool,
+and reports p50/p95/p99 latency, throughput and peak traced memory per
+scenario. Results are saved as JSON, tagged with the git commit, so runs can be
+compared across commits with --compare. Profiles are copied into a temporary
+profile store, so the local viewer_profiles.db is not modified.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_app --concurrency 4 --requests 40
+    python -m benchmarks.benchmark_app --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SCENARIOS = ["description", "grid", "chat", "save", "auth"]
+VIEWER_INFORMATION = [
+    "Demographics",
+    "Viewing Preferences",
+    "Personal Favorites",
+    "Current Conditions",
+    "Viewing History",
+]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_operations(utilities, args) -> dict:
+    """Return one callable per scenario; each makes a single request."""
+    profiles = list(utilities.viewer_profiles)
+    description = "A viewer who enjoys fast-paced sci-fi and thoughtful documentaries."
+
+    def cold_caches():
+        if args.cold_caches:
+            utilities.description_cache.clear()
+            utilities.search_cache.clear()
+
+    def run_description():
+        cold_caches()
+        utilities.retrieve_viewer_description(
+            random.randrange(len(profiles)), VIEWER_INFORMATION
+        )
+
+    def run_grid():
+        cold_caches()
+        for _ in utilities.retrieve_recommendations_to_grid(
+            description,
+            args.recommendations_per_request,
+            random.randrange(len(profiles)),
+            VIEWER_INFORMATION,
+        ):
+            pass
+
+    def run_chat():
+        cold_caches()
+        history = [{"role": "user", "content": "What should I watch tonight?"}]
+        for _ in utilities.chat_with_agent(history, args.recommendations_per_request):
+            pass
+
+    def run_save():
+        profile = random.choice(profiles)
+        season = random.choice(["Spring", "Summer", "Autumn", "Winter"])
+        utilities.save_viewer_profile(
+            profile.model_copy(
+                update={
+                    "current_conditions": profile.current_conditions.model_copy(
+                        update={"season": season}
+                    )
+                }
+            )
+        )
+
+    def run_auth():
+        profile = random.choice(profiles)
+        utilities.authenticate_user(
+            profile.registration_information.username,
+            profile.registration_information.password,
+        )
+
+    return {
+        "description": run_description,
+        "grid": run_grid,
+        "chat": run_chat,
+        "save": run_save,
+        "auth": run_auth,
+    }
+
+
+def run_scenario(
+    operation, requests: int, concurrency: int, trace_memory: bool
+) -> dict:
+    latencies = []
+    errors = []
+
+    def timed_call(_):
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception as e:
+            errors.append(e)
+            print(f"  error: {e}", file=sys.stderr)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_call, range(requests)))
+    elapsed = time.perf_counter() - start
+    peak_memory_kb = None
+    if trace_memory:
+        peak_memory_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1],
+        "throughput_per_s": requests / elapsed,
+        "peak_memory_kb": peak_memory_kb,
+    }
+
+
+def print_results(results: dict, previous: dict | None) -> None:
+    for scenario, result in results["scenarios"].items():
+        line = (
+            f"{scenario:>12}: p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+            f"p99={result['p99_ms']:.1f}ms throughput={result['throughput_per_s']:.1f}/s "
+            f"errors={result['errors']}"
+        )
+        if result["peak_memory_kb"] is not None:
+            line += f" peak_memory={result['peak_memory_kb']:.0f}KB"
+        baseline = (previous or {}).get("scenarios", {}).get(scenario)
+        if baseline:
+            change = (result["p95_ms"] - baseline["p95_ms"]) / baseline["p95_ms"]
+            line += f" (p95 {change:+.0%} vs {previous['commit']})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--requests", type=int, default=40, help="Requests per scenario."
+    )
+    parser.add_argument("--model-latency-ms", type=float, default=200)
+    parser.add_argument("--chunk-latency-ms", type=float, default=5)
+    parser.add_argument("--search-latency-ms", type=float, default=300)
+    parser.add_argument("--search-payload-bytes", type=int, default=4096)
+    parser.add_argument("--tool-calls", type=int, default=2)
+    parser.add_argument("--recommendations-per-request", type=int, default=4)
+    parser.add_argument("--reason-chars", type=int, default=300)
+    parser.add_argument(
+        "--cold-caches",
+        action="store_true",
+        help="Clear the description and search caches before every request.",
+    )
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false")
+    parser.add_argument("--output-dir", default="benchmarks/results")
+    parser.add_argument("--compare", metavar="RESULTS_JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    # Configure the app before it is imported: a throwaway profile store and in-memory caches only
+    temp_dir = tempfile.mkdtemp(prefix="benchmark_app_")
+    os.environ["PROFILE_DB_PATH"] = os.path.join(temp_dir, "viewer_profiles.db")
+    for name in ["DESCRIPTION_CACHE_PATH", "SEARCH_CACHE_PATH", "EMBEDDING_INDEX_DIR"]:
+        os.environ.pop(name, None)
+    os.environ.setdefault("AGENT_POOL_MAX_SIZE", str(args.concurrency))
+    os.environ.setdefault("SEARCH_MODE", "live")
+
+    from benchmarks.stubs import patch_model, patch_search_apis
+
+    patch_model(
+        tool_calls=args.tool_calls,
+        first_token_latency_seconds=args.model_latency_ms / 1000,
+        chunk_latency_seconds=args.chunk_latency_ms / 1000,
+        recommendation_count=args.recommendations_per_request,
+        reason_chars=args.reason_chars,
+    )
+    patch_search_apis(args.search_latency_ms / 1000, args.search_payload_bytes)
+
+    import agent
+    import utilities
+
+    # Silence per-request logging and the agent's streamed output
+    agent.get_custom_tools()
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    def quiet_agent():
+        quiet = agent.create_agent()
+        quiet.callback_handler = lambda **kwargs: None
+        return quiet
+
+    utilities.agent_pool.factory = quiet_agent
+
+    operations = build_operations(utilities, args)
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        results["scenarios"][scenario] = run_scenario(
+            operations[scenario], args.requests, args.concurrency, args.trace_memory
+        )
+
+    previous = None
+    if args.compare:
+        with open(file=args.compare, mode="r", encoding="utf-8") as f:
+            previous = json.load(f)
+    print_results(results, previous)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(
+        args.output_dir,
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json",
+    )
+    with open(file=output_path, mode="w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare rendering the recommendation grid from a JSON string with rendering it from cached card fragments.
+
+Simulates a streamed grid, where the grid is redrawn each time one more card
+is complete, followed by page loads of the trending grid. The "json" path is
+the one the app used before cards.py: serialize the models to indented JSON,
+parse and validate them again, and build every card's HTML. The "cards" path
+renders validated models through cards.CardRenderer. Reports the CPU time and
+the bytes sent to the browser per path.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_cards --cards 8 --repeats 200
+"""
+
+import argparse
+import json
+import time
+
+from cards import CardRenderer
+from data import Recommendation
+
+
+def render_from_json(recommendations_json_string: str) -> str:
+    recommendations = [
+        Recommendation.model_validate(rec)
+        for rec in json.loads(recommendations_json_string)
+    ]
+    cards_html = ""
+    for recommendation in recommendations:
+        cards_html += f"""<div class="card">
+            <img class="main-img" src="gradio_api/file=assets/coming_soon.jpg" alt="{recommendation.title}">
+            <div class="title">{recommendation.title}</div>
+            <div class="platform">{recommendation.streaming_platform}</div>
+            <div class="reason">{recommendation.reason}</div>
+            <div class="card-footer">
+                <div><a class="link" href="{recommendation.url}" target="_blank">Watch Now</a></div>
+            </div>
+        </div>"""
+    return f"""<div class="recommendations-container"><div class="grid" id="recommendationsGrid">{cards_html}</div></div>"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=8, help="Cards per grid.")
+    parser.add_argument("--repeats", type=int, default=200, help="Grids per path.")
+    args = parser.parse_args()
+
+    recommendations = [
+        Recommendation(
+            title=f"Title {idx}",
+            preview_keyframe="",
+            streaming_platform="Netflix",
+            url=f"https://www.example.com/title/{idx}",
+            reason="A witty, fast-paced story that matches the viewer's taste. " * 4,
+        )
+        for idx in range(args.cards)
+    ]
+    # Each streamed update redraws the grid with one more card
+    updates = [recommendations[: count + 1] for count in range(args.cards)]
+
+    def run_json() -> int:
+        sent = 0
+        for shown in updates:
+            payload = json.dumps([r.model_dump() for r in shown], indent=4)
+            sent += len(payload) + len(render_from_json(payload))
+        return sent
+
+    renderer = CardRenderer()
+
+    def run_cards() -> int:
+        return sum(len(renderer.grid(shown)) for shown in updates)
+
+    for name, run in [("json", run_json), ("cards", run_cards)]:
+        start = time.process_time()
+        sent = sum(run() for _ in range(args.repeats))
+        cpu_ms = (time.process_time() - start) * 1000 / args.repeats
+        print(
+            f"{name:>5}: {cpu_ms:.3f}ms CPU and {sent / args.repeats / 1024:.1f}KB "
+            f"sent per streamed grid of {args.cards} card(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare ContentCatalog.top_k with a per-item Python scoring loop as the catalog grows.
+
+The catalog is filled with copies of generic_recommendations.json under unique
+titles, so every item carries realistic tags.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_catalog --sizes 100 10000 100000
+"""
+
+import argparse
+import json
+import time
+
+from catalog import PREFERENCE_WEIGHTS, ContentCatalog
+from data import Recommendation, ViewerProfile
+
+
+def python_top_k(
+    catalog: ContentCatalog, tag_sets: list[set[str]], preferences, k: int
+) -> list[int]:
+    weights = {}
+    for field_name, (category, weight) in PREFERENCE_WEIGHTS.items():
+        for term in getattr(preferences, field_name):
+            tag = f"{category}:{term}"
+            weights[tag] = weights.get(tag, 0.0) + weight
+    scores = [sum(weights.get(tag, 0.0) for tag in tags) for tags in tag_sets]
+    return sorted(range(len(scores)), key=lambda idx: -scores[idx])[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--rankings", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(file="generic_recommendations.json", mode="r", encoding="utf-8") as f:
+        templates = [Recommendation.model_validate(rec) for rec in json.load(f)]
+    with open(file="viewer_profiles.json", mode="r", encoding="utf-8") as f:
+        preferences = ViewerProfile.model_validate(json.load(f)[0]).viewing_preferences
+
+    for size in args.sizes:
+        catalog = ContentCatalog()
+        template_rows = [catalog.tag_recommendation(rec) for rec in templates]
+        tag_sets = []
+        # Reuse the template tag rows; tagging is a one-time cost per item
+        for idx in range(size):
+            template = templates[idx % len(templates)]
+            catalog._titles[f"{template.title} {idx}"] = idx
+            catalog._items.append(template)
+            catalog._sources.append("benchmark")
+            catalog._rows.append(template_rows[idx % len(templates)])
+            tag_sets.append(
+                {
+                    catalog.tags[tag]
+                    for tag in template_rows[idx % len(templates)].nonzero()[0]
+                }
+            )
+        catalog.top_k(preferences, args.k)  # builds the matrix
+
+        start = time.perf_counter()
+        for _ in range(args.rankings):
+            catalog.top_k(preferences, args.k)
+        numpy_ms = (time.perf_counter() - start) / args.rankings * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.rankings):
+            python_top_k(catalog, tag_sets, preferences, args.k)
+        python_ms = (time.perf_counter() - start) / args.rankings * 1000
+
+        print(
+            f"{size:>9,} items: numpy={numpy_ms:.2f}ms python={python_ms:.2f}ms "
+            f"speedup={python_ms / numpy_ms:.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
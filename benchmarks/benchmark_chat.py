@@ -0,0 +1,118 @@
+"""Compare chat prompt tokens per turn with chat history compaction (CHAT_COMPACTION) on and off.
+
+Plays a long chat through utilities.chat_with_agent, one viewer message per
+turn, and reports the prompt tokens of each chat turn and the tokens spent on
+background summaries. Without compaction, the prompt grows with every turn; with
+it, the prompt should stay roughly flat once the first summary is made. Uses the
+stubbed Bedrock model and search APIs from benchmarks.stubs, so no AWS
+credentials are needed.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_chat --turns 20
+"""
+
+import argparse
+import logging
+import os
+import threading
+from types import SimpleNamespace
+
+VIEWER_MESSAGES = [
+    "I'd like something funny to watch tonight, ideally under two hours.",
+    "Not a fan of cringe comedy; I prefer dry, clever humor.",
+    "Something my teenage kids would enjoy too, please.",
+    "We've already seen most of the big Marvel films.",
+    "Animated is fine, as long as it isn't aimed at toddlers.",
+    "Anything on Netflix or Prime Video works for us.",
+    "What about a mystery with a light tone?",
+    "Older titles are fine if they hold up well.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20, help="Viewer messages.")
+    parser.add_argument(
+        "--count", type=int, default=2, help="Recommendations per turn."
+    )
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: in-memory caches only
+    for name in ["DESCRIPTION_CACHE_PATH", "SEARCH_CACHE_PATH", "EMBEDDING_INDEX_DIR"]:
+        os.environ.pop(name, None)
+    os.environ.setdefault("SEARCH_MODE", "live")
+
+    from benchmarks import stubs
+
+    stubs.patch_model(
+        tool_calls=1,
+        first_token_latency_seconds=0,
+        recommendation_count=args.count,
+        reason_chars=200,
+    )
+    stubs.patch_search_apis(latency_seconds=0, payload_bytes=1024)
+
+    import agent
+    import utilities
+    from agent_pool import AgentPool
+    from usage import UsageTracker
+
+    agent.get_custom_tools()
+    # One benchmark user sends every turn back to back; do not rate limit them
+    utilities.scheduler.user_requests_per_minute = 0
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    def quiet_agent():
+        quiet = agent.create_agent()
+        quiet.callback_handler = lambda **kwargs: None
+        return quiet
+
+    for compaction in [False, True]:
+        utilities.CHAT_COMPACTION = compaction
+        utilities.agent_pool = AgentPool(quiet_agent)
+        utilities.usage_tracker = UsageTracker(log_path=None)
+        stubs.clear_prompt_cache()
+        request = SimpleNamespace(
+            session_hash=f"benchmark-{compaction}", username="benchmark"
+        )
+
+        history = []
+        prompt_tokens = []
+        for turn in range(args.turns):
+            history.append(
+                {
+                    "role": "user",
+                    "content": VIEWER_MESSAGES[turn % len(VIEWER_MESSAGES)],
+                }
+            )
+            before = utilities.usage_tracker.totals("feature").get("chat")
+            answer = ""
+            for answer, _ in utilities.chat_with_agent(
+                [dict(message) for message in history], args.count, request
+            ):
+                pass
+            history.append({"role": "assistant", "content": answer})
+            # Let the background summary finish, so each run is deterministic
+            for thread in threading.enumerate():
+                if thread.name == "chat-summary":
+                    thread.join()
+            after = utilities.usage_tracker.totals("feature")["chat"]
+            prompt_tokens.append(
+                after.prompt_tokens - (before.prompt_tokens if before else 0)
+            )
+
+        totals = utilities.usage_tracker.totals("feature")
+        summary_usage = totals.get("chat_summary")
+        print(f"compaction {'on' if compaction else 'off'}:")
+        print(f"  prompt tokens per turn: {prompt_tokens}")
+        print(
+            f"  chat: {totals['chat'].prompt_tokens:,} prompt tokens, ~${totals['chat'].cost:.4f}; "
+            f"summaries: {summary_usage.prompt_tokens if summary_usage else 0:,} prompt tokens "
+            f"in {summary_usage.requests if summary_usage else 0} request(s), "
+            f"~${summary_usage.cost if summary_usage else 0:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
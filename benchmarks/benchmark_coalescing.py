@@ -0,0 +1,157 @@
+"""Load-test bursts of identical recommendation requests with request coalescing (RECOMMENDATION_COALESCING) on and off.
+
+Fires bursts of concurrent utilities.retrieve_recommendations_to_grid requests,
+each for one of a few viewer profiles and descriptions, like a viewer's
+double-click, with a pause between bursts. Each viewer's seen titles are kept
+across bursts, so a re-click within --result-ttl is served from the cache.
+Reports the agent runs, seen-filter refill runs and Bedrock calls made, the
+prompt tokens spent and the p50/p95 request latency per mode. Uses the stubbed
+Bedrock model and search APIs from benchmarks.stubs, so no AWS credentials are
+needed. The stub recommends the same titles on every run, so a request that
+runs the agent again for a viewer who has seen them refills them.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_coalescing --bursts 10 --burst-size 8 --descriptions 2
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DESCRIPTIONS = [
+    "A viewer who enjoys fast-paced sci-fi and thoughtful documentaries.",
+    "A viewer who likes dry, clever comedies and light mysteries.",
+    "A viewer who watches family-friendly animation with their kids.",
+    "A viewer who loves slow-burn crime dramas and true crime.",
+]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=10, help="Bursts of requests.")
+    parser.add_argument(
+        "--burst-size", type=int, default=8, help="Concurrent requests per burst."
+    )
+    parser.add_argument(
+        "--descriptions",
+        type=int,
+        default=2,
+        help=f"Distinct viewers per burst (at most {len(DESCRIPTIONS)}).",
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.5, help="Seconds between bursts."
+    )
+    parser.add_argument(
+        "--result-ttl",
+        type=float,
+        default=0,
+        help="RECOMMENDATION_RESULT_TTL_SECONDS; 0 measures in-flight sharing alone.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Stub model seconds per call."
+    )
+    parser.add_argument("--count", type=int, default=4, help="Recommendations.")
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: in-memory caches only
+    for name in ["DESCRIPTION_CACHE_PATH", "SEARCH_CACHE_PATH", "EMBEDDING_INDEX_DIR"]:
+        os.environ.pop(name, None)
+    os.environ.setdefault("SEARCH_MODE", "live")
+
+    from benchmarks import stubs
+
+    stubs.patch_model(
+        tool_calls=1,
+        first_token_latency_seconds=args.latency,
+        recommendation_count=args.count,
+        reason_chars=200,
+    )
+    stubs.patch_search_apis(latency_seconds=0, payload_bytes=1024)
+
+    # Count the stub model's calls; each stands for one Bedrock ConverseStream call
+    model_calls = itertools.count()
+    stub_stream = stubs.StubModel.stream
+
+    def counted_stream(self, *args, **kwargs):
+        next(model_calls)
+        return stub_stream(self, *args, **kwargs)
+
+    stubs.StubModel.stream = counted_stream
+
+    import agent
+    import utilities
+    from agent_pool import AgentPool
+    from caching import TTLCache
+    from seen import SeenIndex
+    from usage import UsageTracker
+
+    agent.get_custom_tools()
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    def quiet_agent():
+        quiet = agent.create_agent()
+        quiet.callback_handler = lambda **kwargs: None
+        return quiet
+
+    # One viewer per description, so their seen titles are screened like the app's
+    viewers = max(
+        1, min(args.descriptions, len(DESCRIPTIONS), len(utilities.viewer_profiles))
+    )
+    # A viewer's clicks in a burst would otherwise be rate limited
+    utilities.scheduler.user_requests_per_minute = 0
+
+    def run_request(index: int) -> float:
+        start = time.perf_counter()
+        for _ in utilities.retrieve_recommendations_to_grid(
+            DESCRIPTIONS[index % viewers], args.count, index % viewers, []
+        ):
+            pass
+        return time.perf_counter() - start
+
+    for coalescing in [False, True]:
+        utilities.RECOMMENDATION_COALESCING = coalescing
+        utilities.agent_pool = AgentPool(quiet_agent)
+        utilities.usage_tracker = UsageTracker(log_path=None)
+        utilities.seen_index = SeenIndex()
+        utilities.recommendation_results = TTLCache(
+            "recommendation_results", ttl_seconds=args.result_ttl
+        )
+        stubs.clear_prompt_cache()
+        calls_before = next(model_calls)
+
+        latencies = []
+        with ThreadPoolExecutor(max_workers=args.burst_size) as executor:
+            for _ in range(args.bursts):
+                latencies += executor.map(run_request, range(args.burst_size))
+                time.sleep(args.pause)
+        latencies.sort()
+
+        totals = utilities.usage_tracker.totals("feature")
+        usage = totals["recommendations"]
+        refill = totals.get("recommendations_refill")
+        requests = args.bursts * args.burst_size
+        bedrock_calls = next(model_calls) - calls_before - 1
+        print(f"coalescing {'on' if coalescing else 'off'}:")
+        print(
+            f"  {requests} requests: {usage.requests} agent run(s), "
+            f"{refill.requests if refill else 0} refill run(s), "
+            f"{bedrock_calls} Bedrock call(s), "
+            f"{usage.prompt_tokens + (refill.prompt_tokens if refill else 0):,} prompt tokens, "
+            f"~${usage.cost + (refill.cost if refill else 0):.4f}"
+        )
+        print(
+            f"  latency p50 {percentile(latencies, 0.5):.2f}s, "
+            f"p95 {percentile(latencies, 0.95):.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
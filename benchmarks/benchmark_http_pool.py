@@ -0,0 +1,115 @@
+"""Compare per-call search latency with and without the pooled HttpClient against a local mock server.
+
+The mock server answers every POST with a canned JSON body after an optional
+delay, and adds a simulated handshake delay to each new connection, since the
+local server speaks plain HTTP. "unpooled" opens a new connection per call, as
+the search tools did before HttpClient; "pooled" reuses keep-alive connections.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_http_pool --calls 500 --threads 8 --delay-ms 5 --handshake-ms 30
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import HttpClient
+
+RESPONSE_BODY = json.dumps(
+    {
+        "organic": [
+            {"title": f"Result {idx}", "link": "https://example.com"}
+            for idx in range(10)
+        ]
+    }
+).encode("utf-8")
+
+
+class MockSearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay_seconds = 0.0
+    handshake_seconds = 0.0
+
+    def setup(self):
+        # Stands in for the TCP and TLS handshake round trips paid once per connection
+        time.sleep(self.handshake_seconds)
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay_seconds)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def unpooled_call(port: int) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request(
+        "POST",
+        "/search",
+        json.dumps({"q": "benchmark"}),
+        {"Content-Type": "application/json"},
+    )
+    conn.getresponse().read()
+    conn.close()
+
+
+def pooled_call(client: HttpClient, port: int) -> None:
+    client.post_json(f"http://127.0.0.1:{port}/search", {"q": "benchmark"})
+
+
+def run(label: str, call, calls: int, threads: int) -> None:
+    latencies = []
+
+    def timed_call(_):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(timed_call, range(calls)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:>9}: mean={statistics.mean(latencies):.2f}ms "
+        f"p50={latencies[len(latencies) // 2]:.2f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95)]:.2f}ms "
+        f"throughput={calls / elapsed:.0f}/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    MockSearchHandler.delay_seconds = args.delay_ms / 1000
+    MockSearchHandler.handshake_seconds = args.handshake_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockSearchHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = HttpClient(max_connections_per_host=args.threads)
+    run("unpooled", lambda: unpooled_call(port), args.calls, args.threads)
+    run("pooled", lambda: pooled_call(client, port), args.calls, args.threads)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
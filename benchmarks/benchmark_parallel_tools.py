@@ -0,0 +1,61 @@
+"""Measure end-to-end recommendation latency when the model requests several searches in one turn.
+
+Uses the stub model from benchmarks/stubs.py and replaces the Serper and Tavily
+calls with fixed sleeps, so no AWS credentials or API keys are needed. Compares
+concurrent tool execution, the default, with TOOL_EXECUTION=sequential.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_parallel_tools --tool-calls 4 --search-latency-ms 500
+"""
+
+import argparse
+import statistics
+import time
+
+import agent
+import custom_tools
+from benchmarks.stubs import StubModel, patch_search_apis
+from caching import TTLCache
+
+CONFIGURATIONS = [
+    ("concurrent (default)", "concurrent"),
+    ("sequential", "sequential"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tool-calls", type=int, default=4)
+    parser.add_argument("--search-latency-ms", type=float, default=500)
+    parser.add_argument("--model-latency-ms", type=float, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    patch_search_apis(args.search_latency_ms / 1000)
+
+    for label, tool_execution in CONFIGURATIONS:
+        agent.TOOL_EXECUTION = tool_execution
+        # A fresh in-memory cache, so runs never hit results from another configuration
+        custom_tools.search_cache = TTLCache("search_cache")
+        search_agent = agent.create_agent(
+            StubModel(
+                tool_calls=args.tool_calls,
+                first_token_latency_seconds=args.model_latency_ms / 1000,
+            )
+        )
+        search_agent.callback_handler = lambda **kwargs: None
+
+        latencies = []
+        for _ in range(args.runs):
+            search_agent.messages = []
+            start = time.perf_counter()
+            search_agent('Recommend something to watch as {"recommendations": [...]}.')
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{label:>24}: mean={statistics.mean(latencies):.0f}ms "
+            f"min={min(latencies):.0f}ms max={max(latencies):.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
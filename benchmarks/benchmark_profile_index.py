@@ -0,0 +1,76 @@
+"""Compare username lookups through ProfileIndex with a linear scan of the profile list.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_profile_index --sizes 10 1000 100000 1000000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from data import ViewerProfile
+from profile_store import ProfileIndex
+
+
+def build_profiles(template: ViewerProfile, size: int) -> list[ViewerProfile]:
+    # Shallow copies share every section except registration information
+    return [
+        template.model_copy(
+            update={
+                "registration_information": template.registration_information.model_copy(
+                    update={"username": f"viewer{idx}"}
+                )
+            }
+        )
+        for idx in range(size)
+    ]
+
+
+def linear_scan(profiles: list[ViewerProfile], username: str) -> ViewerProfile | None:
+    for profile in profiles:
+        if profile.registration_information.username == username:
+            return profile
+    return None
+
+
+def time_lookups(lookup, usernames: list[str]) -> float:
+    start = time.perf_counter()
+    for username in usernames:
+        lookup(username)
+    return (time.perf_counter() - start) / len(usernames) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument(
+        "--max-scan-size",
+        type=int,
+        default=100_000,
+        help="Skip the linear scan above this many profiles.",
+    )
+    args = parser.parse_args()
+
+    with open(file="viewer_profiles.json", mode="r", encoding="utf-8") as f:
+        template = ViewerProfile.model_validate(json.load(f)[0])
+
+    print(f"{'profiles':>10} {'index (us)':>12} {'scan (us)':>12}")
+    for size in args.sizes:
+        profiles = build_profiles(template, size)
+        index = ProfileIndex(profiles)
+        usernames = [f"viewer{random.randrange(size)}" for _ in range(args.lookups)]
+
+        index_us = time_lookups(index.get, usernames)
+        scan_us = "skipped"
+        if size <= args.max_scan_size:
+            scan_usernames = usernames[: max(1, args.lookups // max(1, size // 100))]
+            scan_us = f"{time_lookups(lambda u: linear_scan(profiles, u), scan_usernames):.3f}"
+        print(f"{size:>10} {index_us:>12.3f} {scan_us:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare prompt cache reads for the legacy and cached prompt layouts (PROMPT_LAYOUT).
+
+For each layout, generates a viewer description and then recommendations for
+each viewer profile in turn, and reports input, cache-read and cache-write
+tokens per feature. With the default stub model, prompt caching is simulated
+(see benchmarks.stubs.StubModel.usage) and no AWS credentials are needed. With
+--live, the requests go to Amazon Bedrock and the search APIs, so they need
+credentials and cost money; cache entries written by the first layout may be
+read by the second, so run one layout per invocation for a clean comparison.
+
+Usage (from the repository root):
+    python -m benchmarks.benchmark_prompt_cache --requests 8
+    python -m benchmarks.benchmark_prompt_cache --live --layouts cached --requests 4
+"""
+
+import argparse
+import logging
+import os
+
+VIEWER_INFORMATION = [
+    "Demographics",
+    "Viewing Preferences",
+    "Personal Favorites",
+    "Current Conditions",
+    "Viewing History",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--layouts",
+        nargs="+",
+        choices=["legacy", "cached"],
+        default=["legacy", "cached"],
+    )
+    parser.add_argument(
+        "--requests", type=int, default=8, help="Viewers to run per layout."
+    )
+    parser.add_argument(
+        "--count", type=int, default=4, help="Recommendations per request."
+    )
+    parser.add_argument(
+        "--min-cache-tokens",
+        type=int,
+        default=1024,
+        help="Shortest cacheable prefix for the stub model; depends on the model.",
+    )
+    parser.add_argument(
+        "--live", action="store_true", help="Use Bedrock, not the stub."
+    )
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: in-memory caches only
+    for name in ["DESCRIPTION_CACHE_PATH", "SEARCH_CACHE_PATH", "EMBEDDING_INDEX_DIR"]:
+        os.environ.pop(name, None)
+
+    from benchmarks import stubs
+
+    if not args.live:
+        os.environ.setdefault("SEARCH_MODE", "live")
+        stubs.patch_model(
+            tool_calls=2,
+            first_token_latency_seconds=0,
+            recommendation_count=args.count,
+            reason_chars=300,
+            min_cache_tokens=args.min_cache_tokens,
+        )
+        stubs.patch_search_apis(latency_seconds=0, payload_bytes=4096)
+
+    import agent
+    import utilities
+    from agent_pool import AgentPool
+    from seen import SeenIndex
+    from usage import UsageTracker
+
+    agent.get_custom_tools()
+    for name in list(logging.root.manager.loggerDict):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    def quiet_agent():
+        quiet = agent.create_agent()
+        quiet.callback_handler = lambda **kwargs: None
+        return quiet
+
+    # Each request must reach the model, rather than reuse an earlier layout's shared result
+    utilities.RECOMMENDATION_COALESCING = False
+    profiles = list(utilities.viewer_profiles)
+    for layout in args.layouts:
+        utilities.PROMPT_LAYOUT = layout
+        utilities.agent_pool = AgentPool(quiet_agent)
+        utilities.usage_tracker = UsageTracker(log_path=None)
+        utilities.seen_index = SeenIndex()
+        utilities.description_cache.clear()
+        stubs.clear_prompt_cache()
+
+        for idx in range(args.requests):
+            position = idx % len(profiles)
+            _, viewer_description = utilities.retrieve_viewer_description(
+                position, VIEWER_INFORMATION
+            )
+            for _ in utilities.retrieve_recommendations_to_grid(
+                viewer_description, args.count, position, VIEWER_INFORMATION
+            ):
+                pass
+
+        print(f"{layout}:")
+        for feature, usage in sorted(utilities.usage_tracker.totals("feature").items()):
+            cache_hit_rate = (
+                usage.cache_read_tokens / usage.prompt_tokens
+                if usage.prompt_tokens
+                else 0.0
+            )
+            print(
+                f"  {feature:>15}: input={usage.input_tokens:,} "
+                f"cache_read={usage.cache_read_tokens:,} cache_write={usage.cache_write_tokens:,} "
+                f"hit_rate={cache_hit_rate:.0%} cost=${usage.cost:.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
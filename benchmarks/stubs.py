@@ -0,0 +1,257 @@
+"""Deterministic local stand-ins for the Bedrock model and the search APIs, for benchmarks that run without AWS or API keys."""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, AsyncGenerator, AsyncIterable
+
+import agent
+import custom_tools
+
+from strands.models import Model
+from strands.types.content import Messages
+from strands.types.streaming import StreamEvent
+from strands.types.tools import ToolSpec
+
+STUB_RECOMMENDATION = {
+    "title": "Stub Title",
+    "preview_keyframe": "",
+    "streaming_platform": "Netflix",
+    "url": "https://www.netflix.com/",
+    "reason": "A deterministic recommendation produced by the benchmark stub model.",
+}
+
+
+# Prompt prefixes "written" to the simulated prompt cache, shared by all stub models like Bedrock's cache
+_prompt_cache: set[str] = set()
+_prompt_cache_lock = threading.Lock()
+
+
+def clear_prompt_cache() -> None:
+    with _prompt_cache_lock:
+        _prompt_cache.clear()
+
+
+def _block_text(block: dict) -> str:
+    if "text" in block:
+        return block["text"]
+    if "cachePoint" in block:
+        return ""
+    return json.dumps(block, default=str)
+
+
+class StubModel(Model):
+    """A strands `Model` that replays a fixed conversation shape with configurable latency and payload size.
+
+    On the first turn of an invocation it requests `tool_calls` searches at once,
+    alternating between `google_search` and `tavily_ai_search`. After the tool
+    results arrive, it streams a `RecommendationList` JSON response with
+    `recommendation_count` items, or `description_chars` of plain text if the
+    prompt does not ask for recommendations.
+
+    Token usage is estimated at four characters per token, with Bedrock prompt
+    caching simulated: see `usage`.
+    """
+
+    def __init__(
+        self,
+        tool_calls: int = 3,
+        first_token_latency_seconds: float = 0.2,
+        chunk_size: int = 16,
+        chunk_latency_seconds: float = 0.0,
+        recommendation_count: int = 1,
+        reason_chars: int = 0,
+        description_chars: int = 600,
+        min_cache_tokens: int = 1024,
+        **config: Any,
+    ):
+        self.config = {
+            "model_id": "stub",
+            "temperature": 0.0,
+            "streaming": True,
+            "cache_prompt": None,
+            "cache_tools": None,
+            "include_tool_result_status": True,
+            **config,
+        }
+        self.tool_calls = tool_calls
+        self.first_token_latency_seconds = first_token_latency_seconds
+        self.chunk_size = chunk_size
+        self.chunk_latency_seconds = chunk_latency_seconds
+        self.recommendation_count = recommendation_count
+        self.reason_chars = reason_chars
+        self.description_chars = description_chars
+        self.min_cache_tokens = min_cache_tokens
+        self.invocations = 0
+
+    def recommendations(self) -> dict:
+        reason = STUB_RECOMMENDATION["reason"]
+        if self.reason_chars:
+            reason = (reason + " ") * (self.reason_chars // (len(reason) + 1) + 1)
+            reason = reason[: self.reason_chars]
+        return {
+            "recommendations": [
+                {**STUB_RECOMMENDATION, "title": f"Stub Title {idx}", "reason": reason}
+                for idx in range(self.recommendation_count)
+            ]
+        }
+
+    def usage(
+        self,
+        messages: Messages,
+        tool_specs: list[ToolSpec] | None,
+        system_prompt: str | None,
+        output_chars: int,
+    ) -> dict:
+        """Estimate token usage for one model call, simulating Bedrock prompt caching.
+
+        The cache checkpoints are after the tool specs, after the system prompt,
+        and at each cache point block in the messages. The longest checkpoint seen
+        before is read from the cache. Longer checkpoints of at least
+        `min_cache_tokens` are written to it.
+        """
+        texts = [json.dumps(tool_specs or []), system_prompt or ""]
+        checkpoints = [1, 2]
+        for message in messages:
+            for block in message["content"]:
+                if "cachePoint" in block:
+                    checkpoints.append(len(texts))
+                texts.append(_block_text(block))
+
+        def tokens(end: int) -> int:
+            return sum(len(text) for text in texts[:end]) // 4
+
+        def prefix_hash(end: int) -> str:
+            return hashlib.sha256("\x00".join(texts[:end]).encode("utf-8")).hexdigest()
+
+        cache_read = cache_write = 0
+        with _prompt_cache_lock:
+            for end in reversed(checkpoints):
+                if prefix_hash(end) in _prompt_cache:
+                    cache_read = tokens(end)
+                    break
+            for end in checkpoints:
+                if tokens(end) > cache_read and tokens(end) >= self.min_cache_tokens:
+                    _prompt_cache.add(prefix_hash(end))
+                    cache_write = tokens(end) - cache_read
+        input_tokens = tokens(len(texts)) - cache_read - cache_write
+        output_tokens = output_chars // 4
+        return {
+            "inputTokens": input_tokens,
+            "outputTokens": output_tokens,
+            "totalTokens": input_tokens + output_tokens + cache_read + cache_write,
+            "cacheReadInputTokens": cache_read,
+            "cacheWriteInputTokens": cache_write,
+        }
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> Any:
+        return self.config
+
+    async def stream(
+        self,
+        messages: Messages,
+        tool_specs: list[ToolSpec] | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[StreamEvent]:
+        self.invocations += 1
+        await asyncio.sleep(self.first_token_latency_seconds)
+        yield {"messageStart": {"role": "assistant"}}
+
+        last_content = messages[-1]["content"] if messages else []
+        tool_names = {spec["name"] for spec in tool_specs or []}
+        answered_tools = any("toolResult" in block for block in last_content)
+        prompt = " ".join(
+            block.get("text", "")
+            for message in messages
+            if message["role"] == "user"
+            for block in message["content"]
+        )
+        wants_recommendations = '{"recommendations"' in prompt
+        output_chars = 0
+        if (
+            self.tool_calls
+            and wants_recommendations
+            and not answered_tools
+            and "google_search" in tool_names
+        ):
+            for idx in range(self.tool_calls):
+                name = "google_search" if idx % 2 == 0 else "tavily_ai_search"
+                yield {
+                    "contentBlockStart": {
+                        "start": {"toolUse": {"toolUseId": f"tool-{idx}", "name": name}}
+                    }
+                }
+                tool_input = {"search_query": f"stub query {idx} {self.invocations}"}
+                output_chars += len(json.dumps(tool_input))
+                yield {
+                    "contentBlockDelta": {
+                        "delta": {"toolUse": {"input": json.dumps(tool_input)}}
+                    }
+                }
+                yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+        else:
+            if wants_recommendations:
+                text = json.dumps(self.recommendations())
+            else:
+                text = ("A viewer who enjoys stub content. " * 100)[
+                    : self.description_chars
+                ]
+            output_chars = len(text)
+            for start in range(0, len(text), self.chunk_size):
+                if self.chunk_latency_seconds:
+                    await asyncio.sleep(self.chunk_latency_seconds)
+                yield {
+                    "contentBlockDelta": {
+                        "delta": {"text": text[start : start + self.chunk_size]}
+                    }
+                }
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+
+        yield {
+            "metadata": {
+                "usage": self.usage(messages, tool_specs, system_prompt, output_chars),
+                "metrics": {"latencyMs": int(self.first_token_latency_seconds * 1000)},
+            }
+        }
+
+    async def structured_output(
+        self, output_model, prompt: Messages, system_prompt: str | None = None, **kwargs
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        await asyncio.sleep(self.first_token_latency_seconds)
+        yield {"output": output_model.model_validate(self.recommendations())}
+
+
+def patch_model(**stub_model_config: Any) -> None:
+    """Build every new agent with a `StubModel` instead of a `BedrockModel`."""
+    agent.create_model = lambda: StubModel(**stub_model_config)
+
+
+def patch_search_apis(latency_seconds: float = 0.3, payload_bytes: int = 4096) -> None:
+    """Replace the Serper and Tavily HTTP calls with a fixed delay and a JSON body of about `payload_bytes`."""
+    snippet = "Stub search result snippet. " * (payload_bytes // 280 + 1)
+
+    def stub_search(self, search_query: str, target_website: str) -> str:
+        time.sleep(latency_seconds)
+        return json.dumps(
+            {
+                "organic": [
+                    {
+                        "title": f"{search_query} {idx}",
+                        "link": "https://example.com",
+                        "snippet": snippet[: payload_bytes // 10],
+                    }
+                    for idx in range(10)
+                ]
+            }
+        )
+
+    custom_tools.CustomTools._google_search = stub_search
+    custom_tools.CustomTools._tavily_ai_search = stub_search
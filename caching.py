@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from metrics import metrics
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+def content_hash(value: Any) -> str:
+    """Return a stable SHA-256 hash of a JSON-serializable value."""
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class TTLCache:
+    """A size-bounded LRU cache with per-entry expiry and an optional SQLite tier.
+
+    The in-memory tier holds up to `max_size` entries. When `disk_path` is set,
+    every entry is also written to SQLite, so it survives restarts and is promoted
+    back to memory on its next hit. Values must be JSON-serializable. Hits and
+    misses are counted as `<name>.hits` and `<name>.misses`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 256,
+        ttl_seconds: float = 3600,
+        disk_path: str | None = None,
+    ):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        if disk_path:
+            self._connection = sqlite3.connect(
+                disk_path, check_same_thread=False, isolation_level=None
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (cache, key)
+                )"""
+            )
+            self._connection.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND expires_at <= ?",
+                (self.name, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.increment(f"{self.name}.hits")
+                return entry[1]
+            if entry:
+                del self._entries[key]
+                metrics.increment(f"{self.name}.expired")
+
+            entry = self._get_from_disk_locked(key, now)
+            if entry:
+                self._set_in_memory_locked(key, entry)
+                metrics.increment(f"{self.name}.hits")
+                metrics.increment(f"{self.name}.disk_hits")
+                return entry[1]
+
+        metrics.increment(f"{self.name}.misses")
+        return None
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        expires_at = time.time() + (
+            ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        )
+        with self._lock:
+            self._set_in_memory_locked(key, (expires_at, value))
+            if self._connection:
+                self._connection.execute(
+                    """INSERT OR REPLACE INTO cache_entries (cache, key, value, expires_at)
+                    VALUES (?, ?, ?, ?)""",
+                    (self.name, key, json.dumps(value), expires_at),
+                )
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every entry whose key starts with `prefix`.
+
+        Returns:
+            int: The number of in-memory entries removed.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            if self._connection:
+                self._connection.execute(
+                    "DELETE FROM cache_entries WHERE cache = ? AND substr(key, 1, ?) = ?",
+                    (self.name, len(prefix), prefix),
+                )
+        metrics.increment(f"{self.name}.invalidations", len(keys))
+        return len(keys)
+
+    def items(self) -> list[tuple[str, Any]]:
+        """Return the unexpired in-memory entries as (key, value) pairs, without counting hits."""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, entry[1])
+                for key, entry in self._entries.items()
+                if entry[0] > now
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._connection:
+                self._connection.execute(
+                    "DELETE FROM cache_entries WHERE cache = ?", (self.name,)
+                )
+
+    def _set_in_memory_locked(self, key: str, entry: tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.increment(f"{self.name}.evictions")
+
+    def _get_from_disk_locked(self, key: str, now: float) -> tuple[float, Any] | None:
+        if not self._connection:
+            return None
+        row = self._connection.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE cache = ? AND key = ?",
+            (self.name, key),
+        ).fetchone()
+        if not row:
+            return None
+        if row[1] <= now:
+            self._connection.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND key = ?",
+                (self.name, key),
+            )
+            return None
+        return row[1], json.loads(row[0])
+
+    def summary(self) -> str:
+        """Render size and hit/miss counts as a Markdown list for the System Status tab."""
+        hits = metrics.counter(f"{self.name}.hits")
+        misses = metrics.counter(f"{self.name}.misses")
+        return "\n".join(
+            [
+                f"- __Entries__: {len(self)} / {self.max_size}",
+                f"- __Hits__: {hits:g} ({metrics.counter(f'{self.name}.disk_hits'):g} from disk)",
+                f"- __Misses__: {misses:g}",
+                f"- __Hit Rate__: {metrics.hit_rate(self.name):.0%}",
+                f"- __Evictions__: {metrics.counter(f'{self.name}.evictions'):g}",
+                f"- __Invalidations__: {metrics.counter(f'{self.name}.invalidations'):g}",
+            ]
+        )
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one call whose result they all share.
+
+    Calls that arrive while the leader is still running wait for its result
+    instead of repeating the work; they are counted as `<name>.shared`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> tuple[Future, bool]:
+        """Join the call in flight for a key, or become its leader.
+
+        A leader must complete the returned future and then call `leave`. This
+        lets a caller that streams its work, e.g., a generator, lead a call that
+        `do` cannot wrap.
+
+        Returns:
+            tuple[Future, bool]: The call's future, and True if the caller is its leader.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            metrics.increment(f"{self.name}.shared")
+        return future, leader
+
+    def leave(self, key: str) -> None:
+        """End the leader's call, so the next call with the key runs again."""
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run `fn` once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identifies identical calls.
+            fn (Callable): The call to make if no identical call is in flight.
+        Returns:
+            tuple[Any, bool]: The result, and True if it was shared from another caller's call.
+        """
+        future, leader = self.join(key)
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self.leave(key)
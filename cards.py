@@ -0,0 +1,104 @@
+import html
+import logging
+import os
+import sys
+from typing import Iterable
+
+from caching import TTLCache, content_hash
+from data import Recommendation
+from metrics import metrics
+
+# Load environment variables
+CARD_CACHE_SIZE = int(os.getenv("CARD_CACHE_SIZE", "1024"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+CARD_FIELDS = ["title", "streaming_platform", "url", "reason"]
+
+CARD_TEMPLATE = """<div class="card">
+    <img class="main-img" src="gradio_api/file=assets/coming_soon.jpg" alt="{title}">
+    <div class="title">{title}</div>
+    <div class="platform">{streaming_platform}</div>
+    <div class="reason">{reason}</div>
+    <div class="card-footer">
+        <div><a class="link" href="{url}" target="_blank" rel="noopener noreferrer">Watch Now</a></div>
+    </div>
+</div>"""
+
+
+def card_fields(recommendation: Recommendation | dict) -> dict[str, str]:
+    """Return the fields a card shows, from a validated model or a plain dict payload."""
+    if isinstance(recommendation, Recommendation):
+        return {name: getattr(recommendation, name) for name in CARD_FIELDS}
+    return {name: str(recommendation.get(name) or "") for name in CARD_FIELDS}
+
+
+def safe_url(url: str) -> str:
+    # Only link to web pages; anything else, e.g., a javascript: URL, becomes a dead link
+    url = url.strip()
+    if not url.lower().startswith(("http://", "https://")):
+        return "#"
+    return html.escape(url, quote=True)
+
+
+class CardRenderer:
+    """Renders recommendation cards as escaped HTML, caching each card's fragment by content hash.
+
+    A grid is rebuilt by joining cached fragments, so while recommendations
+    stream in, or when the same trending titles are shown again, only cards
+    with new content are rendered. Fragment hits and misses are counted as
+    `cards.hits` and `cards.misses`.
+    """
+
+    def __init__(self, max_size: int = CARD_CACHE_SIZE):
+        self._fragments = TTLCache("cards", max_size=max_size, ttl_seconds=86400)
+
+    def card(self, recommendation: Recommendation | dict) -> str:
+        fields = card_fields(recommendation)
+        key = content_hash(fields)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = CARD_TEMPLATE.format(
+                title=html.escape(fields["title"]),
+                streaming_platform=html.escape(fields["streaming_platform"]),
+                reason=html.escape(fields["reason"]),
+                url=safe_url(fields["url"]),
+            )
+            self._fragments.set(key, fragment)
+        return fragment
+
+    def grid(
+        self,
+        recommendations: Iterable[Recommendation | dict],
+        heading: str | None = None,
+        empty_message: str = "No recommendations available.",
+    ) -> str:
+        """Render recommendations as the card grid, or `empty_message` if there are none.
+
+        Args:
+            recommendations (Iterable[Recommendation | dict]): Validated models, or dicts with the card fields.
+            heading (str, optional): A title shown above the grid.
+            empty_message (str): The text shown when there are no recommendations.
+        """
+        cards_html = "".join(
+            self.card(recommendation) for recommendation in recommendations
+        )
+        if not cards_html:
+            return f"<p style='color: gray;'>{html.escape(empty_message)}</p>"
+        metrics.observe("cards.grid_bytes", len(cards_html))
+        heading_html = (
+            f'<h1 class="recommendations-title">{html.escape(heading)}</h1>'
+            if heading
+            else ""
+        )
+        return (
+            f'<div class="recommendations-container">{heading_html}'
+            f'<div class="grid" id="recommendationsGrid">{cards_html}</div></div>'
+        )
+
+
+# Shared renderer for the trending and personalized recommendation grids
+card_renderer = CardRenderer()
@@ -0,0 +1,339 @@
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import numpy as np
+
+from data import Recommendation, ViewingPreferences
+from form_choices import FormChoices
+from metrics import metrics
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+form_choices = FormChoices()
+
+# Tag category, its FormChoices vocabulary, and the text of an item it is matched against
+TAG_VOCABULARIES = {
+    "genre": (form_choices.GENRES, "text"),
+    "narrative": (form_choices.NARRATIVE_ELEMENTS, "text"),
+    "theme": (form_choices.THEMES, "text"),
+    "plot": (form_choices.PLOT_ELEMENTS, "text"),
+    "format": (form_choices.CONTENT_FORMAT, "text"),
+    "platform": (form_choices.STREAMING_SERVICES, "platform"),
+}
+
+# ViewingPreferences field, the tag category it selects, and its weight in the score
+PREFERENCE_WEIGHTS = {
+    "favorite_genres": ("genre", 3.0),
+    "genres_to_avoid": ("genre", -4.0),
+    "preferred_narrative_elements": ("narrative", 1.0),
+    "preferred_themes": ("theme", 2.0),
+    "preferred_plots": ("plot", 1.0),
+    "preferred_formats": ("format", 1.5),
+    "preferred_streaming_services": ("platform", 2.0),
+}
+
+# Extra keywords for terms that are rarely written the way the form spells them
+TAG_SYNONYMS = {
+    "format:Feature film": ["film", "movie"],
+    "format:Episodic series": ["series", "season"],
+    "format:Documentary": ["docuseries", "docu-series"],
+    "format:Animated film": ["animated"],
+    "genre:Sci-Fi/Fantasy": ["science fiction"],
+    "platform:Amazon Prime Video": ["prime video", "amazon"],
+    "platform:HBO Max": ["hbo", "max"],
+}
+
+# Streaming platform domains; search results on other sites are articles, not titles
+PLATFORM_DOMAINS = {
+    "netflix.com": "Netflix",
+    "hulu.com": "Hulu",
+    "primevideo.com": "Amazon Prime Video",
+    "tv.apple.com": "Apple TV+",
+    "disneyplus.com": "Disney+",
+    "max.com": "HBO Max",
+    "hbomax.com": "HBO Max",
+    "paramountplus.com": "Paramount+",
+    "peacocktv.com": "Peacock",
+    "youtube.com": "YouTube",
+    "crunchyroll.com": "Crunchyroll",
+    "tubi.tv": "Tubi",
+    "pluto.tv": "Pluto TV",
+    "fubo.tv": "FuboTV",
+    "sling.com": "Sling TV",
+}
+
+STOPWORDS = {"the", "a", "an", "of", "and", "or", "vs", "to", "with"}
+
+
+def _keywords(term: str) -> list[str]:
+    """Split a form choice such as "Adventure & Exploration" into lowercase keywords."""
+    keywords = []
+    for part in re.split(r"[/&,()]| and | or ", term.lower()):
+        part = part.strip().removeprefix("the ").rstrip("+").strip()
+        if len(part) >= 3 and part not in STOPWORDS:
+            keywords.append(part)
+    return keywords
+
+
+def _keyword_pattern(keywords: list[str]) -> re.Pattern:
+    """Match any keyword as a whole word, including simple plurals."""
+    alternatives = []
+    for keyword in keywords:
+        escaped = re.escape(keyword)
+        if keyword.endswith("y"):
+            escaped = f"{re.escape(keyword[:-1])}(?:y|ies)"
+        alternatives.append(f"{escaped}(?:s|es)?")
+    return re.compile(rf"\b(?:{'|'.join(alternatives)})\b")
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", title.lower()).split())
+
+
+@dataclass
+class CatalogMatch:
+    recommendation: Recommendation
+    score: float
+    matched_tags: list[str] = field(default_factory=list)
+    source: str = ""
+
+
+class ContentCatalog:
+    """A local catalog of titles, tagged with the profile form's vocabularies and ranked with NumPy.
+
+    Each item is a `Recommendation` with a row of 0/1 tag flags. Ranking builds a
+    weight vector from a viewer's `ViewingPreferences` and scores every item with
+    one matrix-vector product, so the cost does not grow with the number of
+    preferences. Items are added incrementally; the matrix is rebuilt on the next
+    ranking after a change.
+    """
+
+    def __init__(self):
+        self.tags: list[str] = []
+        self._patterns: list[tuple[re.Pattern, str]] = []
+        for category, (terms, target) in TAG_VOCABULARIES.items():
+            for term in terms:
+                tag = f"{category}:{term}"
+                keywords = _keywords(term) + TAG_SYNONYMS.get(tag, [])
+                if not keywords or term.lower().startswith("unspecified"):
+                    continue
+                self.tags.append(tag)
+                self._patterns.append((_keyword_pattern(keywords), target))
+        self._tag_positions = {tag: idx for idx, tag in enumerate(self.tags)}
+
+        self._items: list[Recommendation] = []
+        self._sources: list[str] = []
+        self._rows: list[np.ndarray] = []
+        self._titles: dict[str, int] = {}
+        self._search_keys: set[str] = set()
+        self._matrix = np.zeros((0, len(self.tags)), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def tag_recommendation(self, recommendation: Recommendation) -> np.ndarray:
+        """Return the 0/1 tag row for a recommendation."""
+        text = f"{recommendation.title} {recommendation.reason}".lower()
+        platform = f"{recommendation.streaming_platform} {urlparse(recommendation.url).netloc}".lower()
+        return np.array(
+            [
+                (
+                    1.0
+                    if pattern.search(platform if target == "platform" else text)
+                    else 0.0
+                )
+                for pattern, target in self._patterns
+            ],
+            dtype=np.float32,
+        )
+
+    def tag_position(self, tag: str) -> int | None:
+        """Return the column of a tag such as "genre:Horror", or None if it is not in the vocabulary."""
+        return self._tag_positions.get(tag)
+
+    def tag_positions(self, category: str) -> np.ndarray:
+        """Return the columns of every tag in a category, e.g., "platform"."""
+        return np.array(
+            [
+                idx
+                for idx, tag in enumerate(self.tags)
+                if tag.startswith(f"{category}:")
+            ],
+            dtype=np.intp,
+        )
+
+    def tags_for_title(self, title: str) -> np.ndarray | None:
+        """Return the tag row of a catalog item by title, or None if the title is not in the catalog."""
+        with self._lock:
+            idx = self._titles.get(normalize_title(title))
+            return self._rows[idx] if idx is not None else None
+
+    def add_recommendations(
+        self, recommendations: list[Recommendation], source: str
+    ) -> int:
+        """Add recommendations whose titles are not in the catalog yet.
+
+        Args:
+            recommendations (list[Recommendation]): The recommendations to add.
+            source (str): Where they came from, e.g., "generic", "trending", "profile", "agent" or "search".
+        Returns:
+            int: The number of items added.
+        """
+        added = 0
+        for recommendation in recommendations:
+            title = normalize_title(recommendation.title)
+            if not title:
+                continue
+            row = self.tag_recommendation(recommendation)
+            with self._lock:
+                if title in self._titles:
+                    continue
+                self._titles[title] = len(self._items)
+                self._items.append(recommendation)
+                self._sources.append(source)
+                self._rows.append(row)
+            added += 1
+        return added
+
+    def add_search_results(self, cached_results: list[tuple[str, str]]) -> int:
+        """Add titles found on streaming platform pages in cached Serper and Tavily responses.
+
+        Args:
+            cached_results (list[tuple[str, str]]): (cache key, raw JSON response) pairs; keys already seen are skipped.
+        Returns:
+            int: The number of items added.
+        """
+        recommendations = []
+        for key, response_data in cached_results:
+            with self._lock:
+                if key in self._search_keys:
+                    continue
+                self._search_keys.add(key)
+            try:
+                response = json.loads(response_data)
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(response, dict):
+                continue
+            for result in response.get("organic", []) + response.get("results", []):
+                recommendation = self._search_result_to_recommendation(result)
+                if recommendation:
+                    recommendations.append(recommendation)
+        added = self.add_recommendations(recommendations, "search")
+        logger.debug(f"Catalog items added from cached search results: {added}")
+        return added
+
+    @staticmethod
+    def _search_result_to_recommendation(result: dict) -> Recommendation | None:
+        url = result.get("link") or result.get("url") or ""
+        host = urlparse(url).netloc.lower().removeprefix("www.")
+        platform = next(
+            (
+                name
+                for domain, name in PLATFORM_DOMAINS.items()
+                if host == domain or host.endswith(f".{domain}")
+            ),
+            None,
+        )
+        if not platform:
+            return None
+        # e.g., "Watch Wednesday | Netflix Official Site" -> "Wednesday"
+        title = re.split(r" \| | - | – ", result.get("title", ""))[0]
+        title = title.removeprefix("Watch ").strip()
+        if not title:
+            return None
+        return Recommendation(
+            title=title,
+            preview_keyframe="",
+            streaming_platform=platform,
+            url=url,
+            reason=result.get("snippet") or result.get("content") or "",
+        )
+
+    def preference_weights(self, viewing_preferences: ViewingPreferences) -> np.ndarray:
+        """Return the tag weight vector for a viewer's preferences."""
+        weights = np.zeros(len(self.tags), dtype=np.float32)
+        for field_name, (category, weight) in PREFERENCE_WEIGHTS.items():
+            for term in getattr(viewing_preferences, field_name):
+                position = self._tag_positions.get(f"{category}:{term}")
+                if position is not None:
+                    weights[position] += weight
+        return weights
+
+    def top_k(
+        self,
+        viewing_preferences: ViewingPreferences,
+        k: int,
+        exclude_titles: list[str] | None = None,
+    ) -> list[CatalogMatch]:
+        """Return up to k catalog items with a positive score, best first.
+
+        Args:
+            viewing_preferences (ViewingPreferences): The viewer's preferences.
+            k (int): The maximum number of candidates.
+            exclude_titles (list[str], optional): Titles to leave out, e.g., already watched.
+        Returns:
+            list[CatalogMatch]: The candidates, with their scores and matched preference tags.
+        """
+        start = time.monotonic()
+        weights = self.preference_weights(viewing_preferences)
+        with self._lock:
+            if len(self._rows) != self._matrix.shape[0]:
+                self._matrix = np.vstack(self._rows)
+            matrix = self._matrix
+            items = list(self._items)
+            sources = list(self._sources)
+            excluded = [
+                self._titles[title]
+                for title in map(normalize_title, exclude_titles or [])
+                if title in self._titles
+            ]
+        if k <= 0 or not items:
+            return []
+
+        scores = matrix @ weights
+        scores[excluded] = -np.inf
+        k = min(k, len(items))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        matches = []
+        for idx in top:
+            if scores[idx] <= 0:
+                break
+            matched = np.flatnonzero((matrix[idx] > 0) & (weights > 0))
+            matches.append(
+                CatalogMatch(
+                    recommendation=items[idx],
+                    score=float(scores[idx]),
+                    matched_tags=[self.tags[tag] for tag in matched],
+                    source=sources[idx],
+                )
+            )
+        metrics.observe("catalog.rank_ms", (time.monotonic() - start) * 1000)
+        metrics.increment("catalog.candidates", len(matches))
+        return matches
+
+    def summary(self) -> str:
+        """Render the item counts by source as a Markdown list for the System Status tab."""
+        with self._lock:
+            sources = list(self._sources)
+        lines = [f"- __Items__: {len(sources)}"]
+        for source in sorted(set(sources)):
+            lines.append(f"- __{source} Items__: {sources.count(source)}")
+        lines.append(metrics.to_markdown("catalog.rank_ms"))
+        lines.append(
+            f"- __Candidates Offered__: {metrics.counter('catalog.candidates'):g}"
+        )
+        return "\n".join(lines)
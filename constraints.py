@@ -0,0 +1,211 @@
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from caching import TTLCache, content_hash
+from catalog import ContentCatalog
+from data import Recommendation, ViewingPreferences
+from metrics import metrics
+
+# Load environment variables
+CONSTRAINT_FILTER = os.getenv("CONSTRAINT_FILTER", "True").lower() == "true"
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+# TV ratings, mapped to the film rating of the form's ratings_to_avoid they correspond to
+TV_RATINGS = {
+    "TV-MA": "R",
+    "TV-14": "PG-13",
+    "TV-PG": "PG",
+    "TV-G": "G",
+    "TV-Y7": "G",
+    "TV-Y": "G",
+}
+
+# A rating code is only read where the text says it is one, e.g., "rated R", "R-rated", "(PG-13)" or "TV-MA"
+RATING_PATTERN = re.compile(
+    r"(?:(?i:\brated):?\s+|\()(NC-17|PG-13|PG|G|R|TV-MA|TV-14|TV-PG|TV-G|TV-Y7|TV-Y)\b"
+    r"|\b(NC-17|PG-13|PG|G|R)-(?i:rated)\b"
+    r"|\b(NC-17|TV-MA|TV-14|TV-PG|TV-Y7)\b"
+)
+
+
+def rating_code(rating: str) -> str:
+    """Return the code of a form rating, e.g., "R" for "R - Restricted"."""
+    return rating.split(" - ")[0].strip()
+
+
+def find_ratings(text: str) -> set[str]:
+    """Return the film ratings stated in a text, with TV ratings mapped to film ratings."""
+    ratings = set()
+    for match in RATING_PATTERN.finditer(text):
+        code = next(group for group in match.groups() if group)
+        ratings.add(TV_RATINGS.get(code, code))
+    return ratings
+
+
+@dataclass(frozen=True)
+class ProfileConstraints:
+    """A viewer's hard constraints, compiled to catalog tag positions for fast checks."""
+
+    avoid_genre_positions: np.ndarray
+    allowed_platform_positions: np.ndarray
+    platform_positions: np.ndarray
+    avoid_ratings: frozenset[str]
+    avoid_genres: tuple[str, ...]
+    allowed_platforms: tuple[str, ...]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.avoid_genres or self.avoid_ratings or self.allowed_platforms)
+
+    def instructions(self) -> str:
+        """Describe the constraints for a prompt that replaces violating recommendations."""
+        lines = []
+        if self.avoid_genres:
+            lines.append(f"- Do not recommend any {', '.join(self.avoid_genres)}.")
+        if self.avoid_ratings:
+            lines.append(
+                f"- Do not recommend anything rated {', '.join(sorted(self.avoid_ratings))}."
+            )
+        if self.allowed_platforms:
+            lines.append(f"- Prefer titles on {', '.join(self.allowed_platforms)}.")
+        return "\n".join(lines)
+
+
+@dataclass
+class ConstraintResult:
+    """Recommendations sorted by the constraints they break."""
+
+    kept: list[Recommendation] = field(default_factory=list)
+    demoted: list[Recommendation] = field(default_factory=list)
+    dropped: list[Recommendation] = field(default_factory=list)
+
+    @property
+    def ranked(self) -> list[Recommendation]:
+        """The recommendations to show: those that break no constraint, then those that break only soft ones."""
+        return self.kept + self.demoted
+
+
+class ConstraintFilter:
+    """Checks generated recommendations against each viewer's genres, ratings and platforms.
+
+    A viewer's `genres_to_avoid`, `ratings_to_avoid` and `preferred_streaming_services`
+    are compiled once per distinct set of preferences into catalog tag positions.
+    A recommendation's genre and platform tags come from the catalog's tagger, and
+    from its catalog entry when the title is already known; its rating comes from
+    its description. An avoided genre or rating is a hard constraint, and the
+    recommendation is dropped. A platform the viewer does not use is a soft
+    constraint, and the recommendation is moved after the others.
+    """
+
+    def __init__(self, catalog: ContentCatalog):
+        self.catalog = catalog
+        self._compiled = TTLCache(
+            "constraints.compiled", max_size=1024, ttl_seconds=86400
+        )
+
+    def compile(self, viewing_preferences: ViewingPreferences) -> ProfileConstraints:
+        key = content_hash(
+            [
+                viewing_preferences.genres_to_avoid,
+                viewing_preferences.ratings_to_avoid,
+                viewing_preferences.preferred_streaming_services,
+            ]
+        )
+        constraints = self._compiled.get(key)
+        if constraints is not None:
+            return constraints
+        avoid_genres = [
+            genre
+            for genre in viewing_preferences.genres_to_avoid
+            if self.catalog.tag_position(f"genre:{genre}") is not None
+        ]
+        allowed_platforms = [
+            platform
+            for platform in viewing_preferences.preferred_streaming_services
+            if self.catalog.tag_position(f"platform:{platform}") is not None
+        ]
+        constraints = ProfileConstraints(
+            avoid_genre_positions=np.array(
+                [self.catalog.tag_position(f"genre:{genre}") for genre in avoid_genres],
+                dtype=np.intp,
+            ),
+            allowed_platform_positions=np.array(
+                [
+                    self.catalog.tag_position(f"platform:{platform}")
+                    for platform in allowed_platforms
+                ],
+                dtype=np.intp,
+            ),
+            platform_positions=self.catalog.tag_positions("platform"),
+            avoid_ratings=frozenset(
+                rating_code(rating) for rating in viewing_preferences.ratings_to_avoid
+            ),
+            avoid_genres=tuple(avoid_genres),
+            allowed_platforms=tuple(allowed_platforms),
+        )
+        self._compiled.set(key, constraints)
+        return constraints
+
+    def violations(
+        self, constraints: ProfileConstraints, recommendation: Recommendation
+    ) -> tuple[list[str], list[str]]:
+        """Return the hard and the soft constraints a recommendation breaks, e.g., "genre:Horror"."""
+        row = self.catalog.tag_recommendation(recommendation)
+        known_row = self.catalog.tags_for_title(recommendation.title)
+        if known_row is not None:
+            row = np.maximum(row, known_row)
+
+        hard = [
+            self.catalog.tags[position]
+            for position in constraints.avoid_genre_positions
+            if row[position] > 0
+        ]
+        hard += [
+            f"rating:{rating}"
+            for rating in find_ratings(recommendation.reason)
+            if rating in constraints.avoid_ratings
+        ]
+        soft = []
+        if (
+            len(constraints.allowed_platform_positions)
+            and not row[constraints.allowed_platform_positions].any()
+        ):
+            # Only a platform that is recognized and not one of the viewer's counts as a violation
+            if row[constraints.platform_positions].any():
+                soft.append(f"platform:{recommendation.streaming_platform}")
+        return hard, soft
+
+    def apply(
+        self,
+        viewing_preferences: ViewingPreferences,
+        recommendations: list[Recommendation],
+    ) -> ConstraintResult:
+        """Sort recommendations into kept, demoted and dropped by the viewer's constraints."""
+        constraints = self.compile(viewing_preferences)
+        result = ConstraintResult()
+        if constraints.empty:
+            result.kept = list(recommendations)
+            return result
+        for recommendation in recommendations:
+            hard, soft = self.violations(constraints, recommendation)
+            if hard:
+                result.dropped.append(recommendation)
+                logger.info(f"Dropped '{recommendation.title}': {hard}")
+            elif soft:
+                result.demoted.append(recommendation)
+                logger.info(f"Demoted '{recommendation.title}': {soft}")
+            else:
+                result.kept.append(recommendation)
+        metrics.increment("constraints.checked", len(recommendations))
+        metrics.increment("constraints.dropped", len(result.dropped))
+        metrics.increment("constraints.demoted", len(result.demoted))
+        return result
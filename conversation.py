@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from caching import TTLCache
+from catalog import normalize_title
+from metrics import metrics
+
+# Load environment variables
+CHAT_COMPACTION = os.getenv("CHAT_COMPACTION", "True").lower() == "true"
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "4"))
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "1500"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "7200"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a viewer and a streaming media recommendation assistant, using the new messages below. Keep the viewer's stated preferences, dislikes, moods, constraints and feedback on earlier recommendations; leave out the recommendations themselves. Use at most 120 words. Do not use any tools. Only return the updated summary, with no preamble.
+
+<summary>
+{summary}
+</summary>
+
+<new_messages>
+{messages}
+</new_messages>"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the tokens in a text, at four characters per token."""
+    return len(text) // 4
+
+
+def message_text(message: dict) -> str:
+    """Return the text of a Gradio chat message, whose content may be a string or a list of parts."""
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return str(content)
+
+
+@dataclass
+class CompactedChat:
+    """The parts of a chat that go into the next prompt."""
+
+    summary: str
+    recent_messages: list[dict]
+    shown_titles: list[str]
+    prompt_tokens: int
+
+
+@dataclass
+class ChatState:
+    summary: str = ""
+    summarized_messages: int = 0
+    shown_titles: list[str] = field(default_factory=list)
+    summarizing: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ChatCompactor:
+    """Keeps each chat's prompt within a token budget as the conversation grows.
+
+    The newest `recent_messages` are sent verbatim. Older messages are folded
+    into a running summary, `summary_batch` messages at a time, by a model call
+    made in a background thread after a turn, so no turn waits for it. Messages
+    that are older than the recent ones but not yet summarized are sent verbatim
+    until they are. The titles recommended so far are remembered, so they can be
+    excluded from later recommendations. If the prompt parts still exceed
+    `token_budget`, the oldest verbatim messages are dropped first.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, str | None], str],
+        recent_messages: int = CHAT_RECENT_MESSAGES,
+        summary_batch: int = CHAT_SUMMARY_BATCH,
+        token_budget: int = CHAT_TOKEN_BUDGET,
+    ):
+        self.summarize = summarize
+        self.recent_messages = max(1, recent_messages)
+        self.summary_batch = max(1, summary_batch)
+        self.token_budget = token_budget
+        self._sessions = TTLCache(
+            "chat_sessions", max_size=1024, ttl_seconds=CHAT_SESSION_TTL_SECONDS
+        )
+        self._sessions_lock = threading.Lock()
+
+    def _state(self, session_key: str | None, history: list[dict]) -> ChatState:
+        if session_key is None:
+            return ChatState()
+        with self._sessions_lock:
+            state = self._sessions.get(session_key)
+            # A shorter history means the chat was cleared or edited; start over
+            if state is None or state.summarized_messages > len(history):
+                state = ChatState()
+            self._sessions.set(session_key, state)
+        return state
+
+    def compact(self, session_key: str | None, history: list[dict]) -> CompactedChat:
+        """Return the summary, the messages to send verbatim and the titles already shown.
+
+        Args:
+            session_key (str, optional): The Gradio session hash; without it, nothing is remembered between turns.
+            history (list[dict]): The full Gradio chat history, newest message last.
+        """
+        state = self._state(session_key, history)
+        with state.lock:
+            summary = state.summary
+            verbatim = list(history[state.summarized_messages :])
+            shown_titles = list(state.shown_titles)
+
+        def tokens() -> int:
+            return estimate_tokens(
+                summary + json.dumps(verbatim) + json.dumps(shown_titles)
+            )
+
+        dropped = 0
+        while len(verbatim) > 1 and tokens() > self.token_budget:
+            verbatim.pop(0)
+            dropped += 1
+        if dropped:
+            metrics.increment("chat.dropped_messages", dropped)
+        prompt_tokens = tokens()
+        logger.info(
+            f"Chat prompt: {len(history)} message(s), {len(verbatim)} verbatim, "
+            f"summary of {len(summary)} chars, ~{prompt_tokens} tokens"
+        )
+        return CompactedChat(summary, verbatim, shown_titles, prompt_tokens)
+
+    def record_turn(
+        self,
+        session_key: str | None,
+        history: list[dict],
+        recommended_titles: list[str],
+        username: str | None = None,
+    ) -> threading.Thread | None:
+        """Remember the titles just recommended, and summarize older messages in the background when enough have built up.
+
+        Returns:
+            threading.Thread | None: The summarization thread, if one was started.
+        """
+        if session_key is None:
+            return None
+        state = self._state(session_key, history)
+        with state.lock:
+            known = {normalize_title(title) for title in state.shown_titles}
+            state.shown_titles += [
+                title
+                for title in recommended_titles
+                if normalize_title(title) not in known
+            ]
+            older = len(history) - self.recent_messages - state.summarized_messages
+            if state.summarizing or older < self.summary_batch:
+                return None
+            state.summarizing = True
+            start, end = state.summarized_messages, len(history) - self.recent_messages
+            summary = state.summary
+
+        def run():
+            try:
+                messages = "\n".join(
+                    f"{message.get('role')}: {message_text(message)}"
+                    for message in history[start:end]
+                )
+                updated_summary = self.summarize(
+                    SUMMARY_PROMPT.format(summary=summary, messages=messages),
+                    username,
+                ).strip()
+                with state.lock:
+                    state.summary = updated_summary
+                    state.summarized_messages = end
+                metrics.increment("chat.summaries")
+            except Exception as e:
+                logger.error(f"Error summarizing chat history: {e}")
+            finally:
+                with state.lock:
+                    state.summarizing = False
+
+        thread = threading.Thread(target=run, name="chat-summary", daemon=True)
+        thread.start()
+        return thread
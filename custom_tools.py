@@ -1,16 +1,69 @@
-import http.client
 import json
 import logging
 import os
+import re
 import sys
-import urllib.error
-import urllib.request
+import threading
+from typing import Callable
 
 import boto3
+import urllib3
 from strands import tool
 
+from caching import SingleFlight, TTLCache, content_hash
+from http_client import HttpClient
+from metrics import metrics
+from scheduler import scheduler
+
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
+# "live" calls the search APIs, "record" also saves responses as fixtures, "fixture" only replays saved fixtures (offline)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "live").lower()
+SEARCH_FIXTURES_DIR = os.getenv("SEARCH_FIXTURES_DIR", "fixtures/search")
+
+# Per-tool cache TTLs and the approximate API cost of one query, used to report saved spend
+SEARCH_CACHE_TTL_SECONDS = {
+    "google_search": float(os.getenv("GOOGLE_SEARCH_CACHE_TTL_SECONDS", "900")),
+    "tavily_ai_search": float(os.getenv("TAVILY_SEARCH_CACHE_TTL_SECONDS", "3600")),
+}
+SEARCH_COST_PER_QUERY = {
+    "google_search": float(os.getenv("SERPER_COST_PER_QUERY", "0.001")),
+    "tavily_ai_search": float(os.getenv("TAVILY_COST_PER_QUERY", "0.016")),
+}
+
+# Shared by all CustomTools instances, and so by all pooled agents
+search_cache = TTLCache(
+    "search_cache",
+    max_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+    disk_path=os.getenv("SEARCH_CACHE_PATH") or None,
+)
+search_flight = SingleFlight("search_cache")
+
+# Keep-alive connections to Serper and Tavily, shared by all CustomTools instances
+http_client = HttpClient()
+
+
+def search_cache_key(tool_name: str, search_query: str, target_website: str) -> str:
+    """Return the cache key for a search, ignoring case, punctuation and extra whitespace."""
+    normalized_query = " ".join(
+        re.sub(r"[^\w\s:.'-]", " ", search_query.lower()).split()
+    )
+    normalized_website = target_website.strip().lower().removeprefix("https://")
+    return f"{tool_name}:{content_hash([normalized_query, normalized_website])}"
+
+
+def search_cache_summary() -> str:
+    summary = search_cache.summary()
+    summary += (
+        f"\n- __Shared In-Flight Searches__: {metrics.counter('search_cache.shared'):g}"
+    )
+    for tool_name in SEARCH_COST_PER_QUERY:
+        summary += f"\n- __{tool_name} API Calls__: {metrics.counter(f'search.{tool_name}.api_calls'):g}"
+    summary += (
+        f"\n- __Saved API Spend__: ${metrics.counter('search_cache.saved_usd'):.3f}"
+    )
+    return summary
+
 
 class CustomTools:
     """A collection of tools for interacting with AWS services and performing operations."""
@@ -22,15 +75,34 @@ class CustomTools:
         logger.addHandler(logging.StreamHandler(sys.stdout))
         self.logger = logger
 
-        secrets = self.get_secret("PersonalizedRecommendationAgent")
-        if not secrets:
-            self.logger.fatal(
-                "Failed to retrieve secrets. Please check your AWS Secrets Manager configuration."
+        self.serper_api_key = None
+        self.tavily_api_key = None
+        self._secrets_loaded = False
+        self._secrets_lock = threading.Lock()
+        if SEARCH_MODE == "fixture":
+            self.logger.info(
+                f"Search fixture mode: replaying responses from {SEARCH_FIXTURES_DIR}"
             )
-            sys.exit(1)
-        if secrets:
+
+    def _load_secrets(self) -> None:
+        """Fetch the search API keys from Secrets Manager on first use, so startup makes no network calls.
+
+        Raises:
+            RuntimeError: If the secrets cannot be retrieved; the next search tries again.
+        """
+        if self._secrets_loaded:
+            return
+        with self._secrets_lock:
+            if self._secrets_loaded:
+                return
+            secrets = self.get_secret("PersonalizedRecommendationAgent")
+            if not secrets:
+                raise RuntimeError(
+                    "Failed to retrieve secrets. Please check your AWS Secrets Manager configuration."
+                )
             self.serper_api_key = secrets.get("serper_api_key")
             self.tavily_api_key = secrets.get("tavily_api_key")
+            self._secrets_loaded = True
 
     @tool(
         name="google_search",
@@ -47,33 +119,43 @@ class CustomTools:
         Returns:
             str: The JSON response from the Serper API containing search results.
         """
+        if not search_query:
+            raise ValueError("Search query cannot be empty.")
+
+        return self._cached_search(
+            "google_search", search_query, target_website, self._google_search
+        )
+
+    def _google_search(self, search_query: str, target_website: str) -> str:
+        self._load_secrets()
         if self.serper_api_key is None:
             raise ValueError(
                 "serper_api_key is not set. Please set the environment variable."
             )
-        if not search_query:
-            raise ValueError("Search query cannot be empty.")
 
         self.logger.info(f"Performing Google search with query: {search_query}")
 
         if target_website:
             search_query += f" site:{target_website}"
 
-        conn = http.client.HTTPSConnection("google.serper.dev")
-        payload = json.dumps({"q": search_query})
-        headers = {"X-API-KEY": self.serper_api_key, "Content-Type": "application/json"}
+        payload = {"q": search_query}
+        headers = {"X-API-KEY": self.serper_api_key}
 
         try:
-            conn.request("POST", "/search", payload, headers)
-            response = conn.getresponse()
-            response_data = response.read().decode("utf-8")
-            return response_data
-        except http.client.HTTPException as e:
+            response = http_client.post_json(
+                "https://google.serper.dev/search", payload, headers
+            )
+        except urllib3.exceptions.HTTPError as e:
             self.logger.error(
                 f"Failed to retrieve search results from Serper API, error: {e}"
             )
-
-        return ""
+            return ""
+        if response.status >= 400:
+            self.logger.error(
+                f"Failed to retrieve search results from Serper API, error: {response.status}"
+            )
+            return ""
+        return response.data.decode("utf-8")
 
     @tool(
         name="tavily_ai_search",
@@ -90,17 +172,24 @@ class CustomTools:
         Returns:
             str: The JSON response from the Tavily AI Search API containing search results.
         """
+        if not search_query:
+            raise ValueError("Search query cannot be empty.")
+
+        return self._cached_search(
+            "tavily_ai_search", search_query, target_website, self._tavily_ai_search
+        )
+
+    def _tavily_ai_search(self, search_query: str, target_website: str) -> str:
+        self._load_secrets()
         if self.tavily_api_key is None:
             raise ValueError(
                 "tavily_api_key is not set. Please set the environment variable."
             )
-        if not search_query:
-            raise ValueError("Search query cannot be empty.")
 
         self.logger.info(f"Performing Tavily AI search with query: {search_query}")
 
         base_url = "https://api.tavily.com/search"
-        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        headers = {"Accept": "application/json"}
         payload = {
             "api_key": self.tavily_api_key,
             "query": search_query,
@@ -113,19 +202,76 @@ class CustomTools:
             "exclude_domains": [],
         }
 
-        data = json.dumps(payload).encode("utf-8")
-        request = urllib.request.Request(base_url, data=data, headers=headers)
-
         try:
-            response = urllib.request.urlopen(request)
-            response_data = response.read().decode("utf-8")
-            return response_data
-        except urllib.error.HTTPError as e:
+            response = http_client.post_json(base_url, payload, headers)
+        except urllib3.exceptions.HTTPError as e:
+            self.logger.error(
+                f"Failed to retrieve search results from Tavily AI Search, error: {e}"
+            )
+            return ""
+        if response.status >= 400:
             self.logger.error(
-                f"Failed to retrieve search results from Tavily AI Search, error: {e.code}"
+                f"Failed to retrieve search results from Tavily AI Search, error: {response.status}"
             )
+            return ""
+        return response.data.decode("utf-8")
+
+    def _cached_search(
+        self,
+        tool_name: str,
+        search_query: str,
+        target_website: str,
+        search: Callable[[str, str], str],
+    ) -> str:
+        """Serve a search from the shared cache, sharing one API call between concurrent identical searches."""
+        key = search_cache_key(tool_name, search_query, target_website)
+        response_data = search_cache.get(key)
+        if response_data is None:
+            response_data, shared = search_flight.do(
+                key,
+                lambda: self._search_uncached(
+                    tool_name, key, search_query, target_website, search
+                ),
+            )
+            if not shared:
+                return response_data
+        metrics.increment("search_cache.saved_usd", SEARCH_COST_PER_QUERY[tool_name])
+        self.logger.info(f"Search cache hit ({tool_name}): {search_query}")
+        return response_data
+
+    def _search_uncached(
+        self,
+        tool_name: str,
+        key: str,
+        search_query: str,
+        target_website: str,
+        search: Callable[[str, str], str],
+    ) -> str:
+        fixture_path = os.path.join(
+            SEARCH_FIXTURES_DIR, f"{key.replace(':', '-')}.json"
+        )
+        if SEARCH_MODE == "fixture":
+            if not os.path.exists(fixture_path):
+                self.logger.warning(
+                    f"No search fixture for {tool_name} query: {search_query}"
+                )
+                return ""
+            with open(file=fixture_path, mode="r", encoding="utf-8") as f:
+                return f.read()
+
+        metrics.increment(f"search.{tool_name}.api_calls")
+        # A search runs within an agent call that was already admitted, so it waits rather than being shed
+        with scheduler.slot("search", "grid", shed=False):
+            response_data = search(search_query, target_website)
+        if not response_data:
+            return response_data
+        search_cache.set(key, response_data, SEARCH_CACHE_TTL_SECONDS[tool_name])
 
-        return ""
+        if SEARCH_MODE == "record":
+            os.makedirs(SEARCH_FIXTURES_DIR, exist_ok=True)
+            with open(file=fixture_path, mode="w", encoding="utf-8") as f:
+                f.write(response_data)
+        return response_data
 
     def get_secret(self, secret_name) -> dict:
         region_name = AWS_REGION  # Adjust if your secret is in another region
@@ -0,0 +1,317 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+import boto3
+import numpy as np
+
+from caching import TTLCache, content_hash
+from metrics import metrics
+
+# Load environment variables
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing").lower()
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+# Seconds a save waits before writing, so the saves of a burst of requests are written once; 0 writes at once
+EMBEDDING_SAVE_DELAY_SECONDS = float(os.getenv("EMBEDDING_SAVE_DELAY_SECONDS", "5"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class HashingEmbedder:
+    """A deterministic, offline embedder that hashes words and word pairs into a fixed-size vector.
+
+    It captures lexical overlap, not meaning, but needs no model, network or
+    credentials, and gives the same vectors in every process.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return one L2-normalized float32 row per text."""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8)
+                value = int.from_bytes(digest.digest(), "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dimensions] += sign
+        return _normalize(vectors)
+
+
+class BedrockEmbedder:
+    """Embeds text with an Amazon Bedrock embedding model, caching vectors by text hash."""
+
+    def __init__(
+        self,
+        model_id: str = EMBEDDING_MODEL_ID,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+    ):
+        self.model_id = model_id
+        self.dimensions = dimensions
+        self._client = None
+        self._cache = TTLCache(
+            "embedding_cache", max_size=4096, ttl_seconds=30 * 24 * 3600
+        )
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return one L2-normalized float32 row per text."""
+        if self._client is None:
+            self._client = boto3.client("bedrock-runtime", region_name=AWS_REGION)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            key = content_hash([self.model_id, self.dimensions, text])
+            vector = self._cache.get(key)
+            if vector is None:
+                start = time.monotonic()
+                response = self._client.invoke_model(
+                    modelId=self.model_id,
+                    body=json.dumps(
+                        {
+                            "inputText": text,
+                            "dimensions": self.dimensions,
+                            "normalize": True,
+                        }
+                    ),
+                )
+                vector = json.loads(response["body"].read())["embedding"]
+                metrics.observe(
+                    "embeddings.bedrock_latency_ms", (time.monotonic() - start) * 1000
+                )
+                self._cache.set(key, vector)
+            vectors[row] = vector
+        return _normalize(vectors)
+
+
+def create_embedder() -> HashingEmbedder | BedrockEmbedder:
+    """Return the embedder selected by EMBEDDING_BACKEND ("hashing" or "bedrock")."""
+    if EMBEDDING_BACKEND == "bedrock":
+        return BedrockEmbedder()
+    return HashingEmbedder()
+
+
+class VectorIndex:
+    """An in-process nearest-neighbour index over normalized vectors, with optional on-disk persistence.
+
+    Search is an exact brute-force cosine similarity, a single matrix-vector
+    product, which is fast for tens of thousands of items. Items are inserted or
+    replaced by id. When `path` is set, `flush` writes the vectors to `<path>.npy`
+    and the ids and metadata to `<path>.json`; on restart the vectors are
+    memory-mapped rather than read, and copied into memory on the next insert.
+    `save` schedules a flush in a background thread, so requests do not wait
+    for the write, and the saves made within `save_delay_seconds` are written
+    once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        dimensions: int,
+        path: str | None = None,
+        save_delay_seconds: float = EMBEDDING_SAVE_DELAY_SECONDS,
+    ):
+        self.name = name
+        self.dimensions = dimensions
+        self.path = path
+        self.save_delay_seconds = save_delay_seconds
+        self._vectors = np.zeros((16, dimensions), dtype=np.float32)
+        self._count = 0
+        self._ids: dict[str, int] = {}
+        self._metadata: list[dict] = []
+        self._lock = threading.Lock()
+        # Held from copying the index through renaming its files, so flushes never interleave
+        self._save_lock = threading.Lock()
+        self._version = 0
+        self._saved_version = 0
+        self._flush_timer: threading.Timer | None = None
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def get_metadata(self, item_id: str) -> dict | None:
+        with self._lock:
+            position = self._ids.get(item_id)
+            return self._metadata[position] if position is not None else None
+
+    def get_vector(self, item_id: str) -> np.ndarray | None:
+        with self._lock:
+            position = self._ids.get(item_id)
+            return np.array(self._vectors[position]) if position is not None else None
+
+    def add(self, item_id: str, vector: np.ndarray, metadata: dict) -> None:
+        """Insert an item, or replace the item with the same id."""
+        with self._lock:
+            position = self._ids.get(item_id)
+            if position is None:
+                position = self._count
+                if position == len(self._vectors) or not self._vectors.flags.writeable:
+                    self._grow_locked(max(16, 2 * position))
+                self._ids[item_id] = position
+                self._metadata.append(metadata)
+                self._count += 1
+            elif not self._vectors.flags.writeable:
+                self._grow_locked(len(self._vectors))
+            self._vectors[position] = vector
+            self._metadata[position] = metadata
+            self._version += 1
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int,
+        exclude_ids: set[str] | None = None,
+    ) -> list[tuple[str, dict, float]]:
+        """Return up to k (id, metadata, cosine similarity) tuples, most similar first."""
+        start = time.monotonic()
+        with self._lock:
+            vectors = self._vectors[: self._count]
+            ids = list(self._ids)
+            metadata = list(self._metadata)
+            excluded = [
+                self._ids[item_id]
+                for item_id in exclude_ids or ()
+                if item_id in self._ids
+            ]
+        if k <= 0 or not ids:
+            return []
+
+        similarities = vectors @ vector
+        similarities[excluded] = -np.inf
+        k = min(k, len(ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        metrics.observe(f"{self.name}.search_ms", (time.monotonic() - start) * 1000)
+        return [
+            (ids[idx], metadata[idx], float(similarities[idx]))
+            for idx in top
+            if similarities[idx] > -np.inf
+        ]
+
+    def save(self) -> None:
+        """Schedule a flush of the index to disk, after `save_delay_seconds`, without waiting for it."""
+        if not self.path:
+            return
+        if self.save_delay_seconds <= 0:
+            self.flush()
+            return
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(
+                self.save_delay_seconds, self._flush_scheduled
+            )
+            self._flush_timer.name = f"{self.name}-flush"
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_scheduled(self) -> None:
+        # Cleared before the write, so a change made during it schedules another flush
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except OSError as e:
+            logger.error(f"Error saving vector index {self.path}: {e}")
+
+    def flush(self) -> None:
+        """Write the index to `<path>.npy` and `<path>.json` if it changed, replacing the previous files atomically."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if self._version == self._saved_version:
+                    return
+                vectors = np.array(self._vectors[: self._count])
+                state = {"ids": list(self._ids), "metadata": list(self._metadata)}
+                version = self._version
+            start = time.monotonic()
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            for suffix, write in [
+                (".npy", lambda f: np.save(f, vectors)),
+                (".json", lambda f: f.write(json.dumps(state).encode("utf-8"))),
+            ]:
+                # A unique temporary file in the same directory, so the rename is atomic
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=directory, prefix=f"{os.path.basename(self.path)}{suffix}."
+                )
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        write(f)
+                    os.replace(tmp_path, f"{self.path}{suffix}")
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            self._saved_version = version
+        metrics.increment(f"{self.name}.flushes")
+        metrics.observe(f"{self.name}.flush_ms", (time.monotonic() - start) * 1000)
+
+    def _load(self) -> None:
+        if not (
+            os.path.exists(f"{self.path}.npy") and os.path.exists(f"{self.path}.json")
+        ):
+            return
+        try:
+            vectors = np.load(f"{self.path}.npy", mmap_mode="r")
+            with open(file=f"{self.path}.json", mode="r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading vector index {self.path}: {e}")
+            return
+        if vectors.shape != (len(state["ids"]), self.dimensions):
+            logger.warning(
+                f"Ignoring vector index {self.path}: shape {vectors.shape} does not match {self.dimensions} dimensions"
+            )
+            return
+        self._vectors = vectors
+        self._count = len(state["ids"])
+        self._ids = {item_id: idx for idx, item_id in enumerate(state["ids"])}
+        self._metadata = state["metadata"]
+        logger.info(f"Vector index loaded: {self.path} ({self._count} items)")
+
+    def _grow_locked(self, capacity: int) -> None:
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[: self._count] = self._vectors[: self._count]
+        self._vectors = vectors
+
+
+def find_duplicates(vectors: np.ndarray, threshold: float) -> list[int]:
+    """Return the rows that are at least `threshold` similar to an earlier row.
+
+    Args:
+        vectors (np.ndarray): Normalized vectors, one per row, in priority order.
+        threshold (float): The cosine similarity at which two rows are duplicates.
+    Returns:
+        list[int]: The positions of the duplicate rows; the first of each group is kept.
+    """
+    similarities = vectors @ vectors.T
+    kept: list[int] = []
+    duplicates = []
+    for idx in range(len(vectors)):
+        if kept and similarities[idx, kept].max() >= threshold:
+            duplicates.append(idx)
+        else:
+            kept.append(idx)
+    return duplicates
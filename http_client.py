@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import sys
+import time
+
+import urllib3
+
+from metrics import metrics
+
+# Load environment variables
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "8"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+class HttpClient:
+    """A keep-alive HTTP client with connection pooling, timeouts and bounded retries.
+
+    Connections to each host are reused across calls, so a search pays TCP and TLS
+    setup once per pooled connection instead of once per call. At most
+    `max_connections_per_host` requests run against a host at once; further
+    requests wait up to the connect timeout for a free connection. Failed
+    connections and 429/5xx responses are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+    ):
+        self.connect_timeout = connect_timeout
+        self._pool_manager = urllib3.PoolManager(
+            num_pools=10,
+            maxsize=max_connections_per_host,
+            block=True,
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+        )
+        self._retries = urllib3.Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,  # search requests are POSTs, but safe to repeat
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+
+    def post_json(
+        self, url: str, payload: dict, headers: dict | None = None
+    ) -> urllib3.BaseHTTPResponse:
+        """POST a JSON payload and return the response.
+
+        Args:
+            url (str): The URL to post to.
+            payload (dict): The request body, serialized as JSON.
+            headers (dict, optional): Additional request headers.
+        Returns:
+            urllib3.BaseHTTPResponse: The response, with its body already read.
+        Raises:
+            urllib3.exceptions.HTTPError: If the request fails after all retries or times out.
+        """
+        host = urllib3.util.parse_url(url).host
+        start = time.monotonic()
+        try:
+            return self._pool_manager.request(
+                "POST",
+                url,
+                body=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json", **(headers or {})},
+                retries=self._retries,
+                pool_timeout=self.connect_timeout,
+            )
+        finally:
+            metrics.observe(
+                f"http.{host}.latency_ms", (time.monotonic() - start) * 1000
+            )
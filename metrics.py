@@ -0,0 +1,141 @@
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process counters, gauges and timing summaries for the System Status tab."""
+
+    def __init__(self, reservoir_size: int = 1024):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._observations: dict[str, deque] = defaultdict(
+            lambda: deque(maxlen=reservoir_size)
+        )
+        self._observation_totals: dict[str, list[float]] = defaultdict(
+            lambda: [0, 0.0, 0.0]
+        )
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a single measurement (e.g., a latency in milliseconds)."""
+        with self._lock:
+            self._observations[name].append(value)
+            totals = self._observation_totals[name]
+            totals[0] += 1
+            totals[1] += value
+            totals[2] = max(totals[2], value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> float:
+        with self._lock:
+            return self._gauges.get(name, 0)
+
+    def summary(self, name: str) -> dict:
+        """Return count, mean, max and p50/p95 for an observed measurement."""
+        with self._lock:
+            values = sorted(self._observations.get(name, ()))
+            count, total, maximum = self._observation_totals.get(name, (0, 0.0, 0.0))
+        if not values:
+            return {"count": 0, "mean": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0}
+        return {
+            "count": int(count),
+            "mean": total / count,
+            "max": maximum,
+            "p50": values[int(0.50 * (len(values) - 1))],
+            "p95": values[int(0.95 * (len(values) - 1))],
+        }
+
+    def hit_rate(self, prefix: str) -> float:
+        """Return hits / (hits + misses) for counters named `<prefix>.hits` and `<prefix>.misses`."""
+        hits = self.counter(f"{prefix}.hits")
+        misses = self.counter(f"{prefix}.misses")
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            observed = list(self._observations)
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "observations": {name: self.summary(name) for name in observed},
+        }
+
+    def to_markdown(self, prefix: str = "") -> str:
+        """Render the metrics whose names start with `prefix` as a Markdown list."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["gauges"].items()):
+            if name.startswith(prefix):
+                lines.append(f"- __{name}__: {value:g}")
+        for name, value in sorted(snapshot["counters"].items()):
+            if name.startswith(prefix):
+                lines.append(f"- __{name}__: {value:g}")
+        for name, summary in sorted(snapshot["observations"].items()):
+            if name.startswith(prefix):
+                lines.append(
+                    f"- __{name}__: count={summary['count']}, mean={summary['mean']:.1f}, "
+                    f"p50={summary['p50']:.1f}, p95={summary['p95']:.1f}, max={summary['max']:.1f}"
+                )
+        return "\n".join(lines)
+
+
+class StartupTimer:
+    """Log how long each startup phase takes and record it as a `startup.<phase>_ms` gauge.
+
+    Each call to `mark` measures the time since the previous mark, or since the
+    timer was created for the first phase.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self._registry = registry
+        self._started = self._last_mark = time.monotonic()
+
+    def mark(self, phase: str) -> float:
+        """Record the end of a startup phase.
+
+        Args:
+            phase (str): The name of the phase that just finished.
+        Returns:
+            float: The duration of the phase in milliseconds.
+        """
+        now = time.monotonic()
+        elapsed_ms = (now - self._last_mark) * 1000
+        self._last_mark = now
+        self._registry.set_gauge(f"startup.{phase}_ms", elapsed_ms)
+        logger.info(f"Startup phase '{phase}' took {elapsed_ms:.0f}ms")
+        return elapsed_ms
+
+    def finish(self) -> float:
+        """Record and log the total time since the timer was created, in milliseconds."""
+        total_ms = (time.monotonic() - self._started) * 1000
+        self._registry.set_gauge("startup.total_ms", total_ms)
+        logger.info(f"Startup took {total_ms:.0f}ms")
+        return total_ms
+
+
+# Shared registry used by all modules
+metrics = MetricsRegistry()
+
+# Started when metrics is first imported, which is early in every entry point
+startup_timer = StartupTimer(metrics)
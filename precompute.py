@@ -0,0 +1,225 @@
+"""Precompute viewer descriptions and recommendations for every viewer profile, outside the UI.
+
+Each profile's recommendations are replaced with freshly generated ones and
+saved to the profile store, so the Recommendations tab shows them as soon as
+the viewer is selected. Progress is checkpointed after every profile; a rerun
+skips profiles whose inputs have not changed since they were last completed.
+
+Usage (from the repository root):
+    python precompute.py --workers 2 --runs-per-minute 20 --count 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import utilities
+from caching import content_hash
+from data import ViewerProfile
+from metrics import metrics
+from rate_limit import TokenBucket
+from usage import usage_tracker
+
+# Load environment variables
+PRECOMPUTE_CHECKPOINT_PATH = os.getenv(
+    "PRECOMPUTE_CHECKPOINT_PATH", "precompute_checkpoint.json"
+)
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+VIEWER_INFORMATION = [
+    "Demographics",
+    "Viewing Preferences",
+    "Personal Favorites",
+    "Current Conditions",
+    "Viewing History",
+]
+
+
+class Checkpoint:
+    """Completed profiles and the hash of the inputs they were computed from, saved as JSON after every update."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(file=path, mode="r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def is_current(self, username: str, inputs_hash: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(username)
+        return bool(
+            entry and entry["status"] == "done" and entry["hash"] == inputs_hash
+        )
+
+    def record(
+        self, username: str, inputs_hash: str, status: str, error: str = ""
+    ) -> None:
+        with self._lock:
+            self._entries[username] = {
+                "hash": inputs_hash,
+                "status": status,
+                "error": error,
+                "updated_at": time.time(),
+            }
+            with open(file=f"{self.path}.tmp", mode="w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=4)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+def inputs_hash(
+    viewer_profile: ViewerProfile,
+    viewer_information_to_include: list[str],
+    recommendation_count: int,
+) -> str:
+    """Hash everything that the generated recommendations depend on."""
+    return content_hash(
+        {
+            "profile": {
+                section: viewer_profile.model_dump(include={section})
+                for section in utilities.DESCRIPTION_SECTIONS
+            },
+            "viewer_information": viewer_information_to_include,
+            "recommendation_count": recommendation_count,
+        }
+    )
+
+
+def precompute_profile(
+    viewer_profile: ViewerProfile,
+    viewer_information_to_include: list[str],
+    recommendation_count: int,
+    rate_limiter: TokenBucket,
+) -> int:
+    """Generate and save recommendations for one viewer.
+
+    Returns:
+        int: The number of recommendations saved.
+    """
+    start = time.monotonic()
+    rate_limiter.acquire()
+    # A batch job waits behind interactive requests for the model and is never shed
+    _, viewer_description = utilities.generate_viewer_description(
+        viewer_profile, viewer_information_to_include, priority="background"
+    )
+
+    candidates = []
+    if "Viewing Preferences" in viewer_information_to_include:
+        candidates = utilities.catalog_candidates(viewer_profile)
+    rate_limiter.acquire()
+    recommendations = utilities.generate_recommendations(
+        viewer_description,
+        recommendation_count,
+        candidates=candidates,
+        username=viewer_profile.registration_information.username,
+        viewing_preferences=(
+            viewer_profile.viewing_preferences
+            if "Viewing Preferences" in viewer_information_to_include
+            else None
+        ),
+        priority="background",
+    ).recommendations
+    if not recommendations:
+        raise ValueError("The agent returned no recommendations.")
+
+    utilities.save_viewer_profile(
+        viewer_profile.model_copy(update={"recommendations": recommendations})
+    )
+    metrics.observe("precompute.profile_ms", (time.monotonic() - start) * 1000)
+    return len(recommendations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--runs-per-minute",
+        type=float,
+        default=20,
+        help="Maximum agent runs started per minute; each profile takes two.",
+    )
+    parser.add_argument(
+        "--count", type=int, default=4, help="Recommendations per profile."
+    )
+    parser.add_argument(
+        "--viewer-information",
+        nargs="+",
+        choices=VIEWER_INFORMATION,
+        default=VIEWER_INFORMATION,
+    )
+    parser.add_argument("--usernames", nargs="+", help="Only these viewers.")
+    parser.add_argument("--checkpoint", default=PRECOMPUTE_CHECKPOINT_PATH)
+    parser.add_argument(
+        "--force", action="store_true", help="Recompute unchanged profiles too."
+    )
+    parser.add_argument(
+        "--export",
+        metavar="FILE_PATH",
+        help="Also export all profiles to this JSON file.",
+    )
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint)
+    rate_limiter = TokenBucket(
+        "precompute.rate_limit", args.runs_per_minute / 60, capacity=args.workers
+    )
+
+    pending = []
+    for viewer_profile in list(utilities.viewer_profiles):
+        username = viewer_profile.registration_information.username
+        if args.usernames and username not in args.usernames:
+            continue
+        profile_hash = inputs_hash(viewer_profile, args.viewer_information, args.count)
+        if not args.force and checkpoint.is_current(username, profile_hash):
+            logger.info(f"Skipping {username}: unchanged since last run")
+            continue
+        pending.append((viewer_profile, profile_hash))
+    logger.info(f"Precomputing recommendations for {len(pending)} profile(s)")
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                precompute_profile,
+                viewer_profile,
+                args.viewer_information,
+                args.count,
+                rate_limiter,
+            ): (viewer_profile.registration_information.username, profile_hash)
+            for viewer_profile, profile_hash in pending
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            username, profile_hash = futures[future]
+            try:
+                saved = future.result()
+                checkpoint.record(username, profile_hash, "done")
+                logger.info(
+                    f"[{completed}/{len(pending)}] {username}: {saved} recommendation(s) saved"
+                )
+            except Exception as e:
+                failures += 1
+                checkpoint.record(username, profile_hash, "failed", str(e))
+                logger.error(f"[{completed}/{len(pending)}] {username}: failed: {e}")
+
+    if args.export:
+        utilities.profile_store.export_json(args.export)
+    usage_tracker.flush()
+    logger.info(
+        f"Precompute finished: {len(pending) - failures} succeeded, {failures} failed\n"
+        f"{metrics.to_markdown('precompute.')}"
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
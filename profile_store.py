@@ -0,0 +1,227 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from data import ViewerProfile
+
+# Load environment variables
+PROFILE_DB_PATH = os.getenv("PROFILE_DB_PATH", "viewer_profiles.db")
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+class ProfileStore:
+    """SQLite storage for viewer profiles, keyed by username.
+
+    Saves are single-row upserts committed atomically through SQLite's write-ahead
+    log, so a save no longer re-reads, re-validates and rewrites every profile.
+    An upsert can replace only the profile sections that changed, so processes
+    that share the store, e.g., the app and precompute.py, do not overwrite each
+    other's sections. `viewer_profiles.json` remains the import and export format.
+    """
+
+    def __init__(self, db_path: str = PROFILE_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS viewer_profiles (
+                username TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                profile TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM viewer_profiles"
+            ).fetchone()[0]
+
+    def load(self) -> list[ViewerProfile]:
+        """Return all viewer profiles in their original insertion order."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT profile FROM viewer_profiles ORDER BY position"
+            ).fetchall()
+        return [ViewerProfile.model_validate_json(row[0]) for row in rows]
+
+    def get(self, username: str) -> ViewerProfile | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT profile FROM viewer_profiles WHERE username = ?", (username,)
+            ).fetchone()
+        return ViewerProfile.model_validate_json(row[0]) if row else None
+
+    def upsert(
+        self, viewer_profile: ViewerProfile, sections: set[str] | None = None
+    ) -> ViewerProfile:
+        """Insert a viewer profile, or update it, in one atomic transaction.
+
+        Args:
+            viewer_profile (ViewerProfile): The viewer profile to save.
+            sections (set[str], optional): The top-level sections to update in an existing
+                profile, e.g., {"recommendations"}; None to replace the whole profile.
+        Returns:
+            ViewerProfile: The profile as stored, including sections saved by other writers.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._upsert(viewer_profile, sections)
+            row = self._connection.execute(
+                "SELECT profile FROM viewer_profiles WHERE username = ?",
+                (viewer_profile.registration_information.username,),
+            ).fetchone()
+        return ViewerProfile.model_validate_json(row[0])
+
+    def _upsert(
+        self, viewer_profile: ViewerProfile, sections: set[str] | None = None
+    ) -> None:
+        if sections is not None:
+            self._update_sections(viewer_profile, sections)
+            return
+        self._connection.execute(
+            """INSERT INTO viewer_profiles (username, position, profile, updated_at)
+            VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM viewer_profiles), ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                profile = excluded.profile,
+                updated_at = excluded.updated_at""",
+            (
+                viewer_profile.registration_information.username,
+                viewer_profile.model_dump_json(),
+                time.time(),
+            ),
+        )
+
+    def _update_sections(
+        self, viewer_profile: ViewerProfile, sections: set[str]
+    ) -> None:
+        # Section names come from the model, never from input, so they are safe to put in the SQL
+        sections = [name for name in ViewerProfile.model_fields if name in sections]
+        if not sections:
+            return
+        data = viewer_profile.model_dump(mode="json")
+        self._connection.execute(
+            f"""INSERT INTO viewer_profiles (username, position, profile, updated_at)
+            VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM viewer_profiles), ?, ?)
+            ON CONFLICT(username) DO UPDATE SET
+                profile = json_set(profile, {", ".join(f"'$.{name}', json(?)" for name in sections)}),
+                updated_at = excluded.updated_at""",
+            (
+                viewer_profile.registration_information.username,
+                viewer_profile.model_dump_json(),
+                time.time(),
+                *(json.dumps(data[name]) for name in sections),
+            ),
+        )
+
+    def import_json(self, file_path: str) -> int:
+        """Upsert every profile in a `viewer_profiles.json`-style file in one transaction.
+
+        Args:
+            file_path (str): Path to the JSON file to import.
+        Returns:
+            int: The number of profiles imported.
+        """
+        with open(file=file_path, mode="r", encoding="utf-8") as f:
+            data = json.load(f)
+        profiles = [ViewerProfile.model_validate(profile) for profile in data]
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            for profile in profiles:
+                self._upsert(profile)
+        logger.info(f"Imported {len(profiles)} viewer profiles from {file_path}.")
+        return len(profiles)
+
+    def export_json(self, file_path: str) -> int:
+        """Write all profiles to a `viewer_profiles.json`-style file, replacing it atomically.
+
+        Args:
+            file_path (str): Path to the JSON file to write.
+        Returns:
+            int: The number of profiles exported.
+        """
+        profiles = self.load()
+        temp_path = f"{file_path}.tmp"
+        with open(file=temp_path, mode="w", encoding="utf-8") as f:
+            json.dump([profile.model_dump() for profile in profiles], f, indent=4)
+        os.replace(temp_path, file_path)
+        logger.info(f"Exported {len(profiles)} viewer profiles to {file_path}.")
+        return len(profiles)
+
+
+class ProfileIndex:
+    """In-memory viewer profiles with constant-time lookups by username.
+
+    `profiles` keeps the store's order, which is also the order of the viewer
+    dropdown, and is updated in place so references to it stay current.
+    """
+
+    def __init__(self, profiles: list[ViewerProfile] | None = None):
+        self.profiles: list[ViewerProfile] = []
+        self._positions: dict[str, int] = {}
+        self.reset(profiles or [])
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def reset(self, profiles: list[ViewerProfile]) -> None:
+        """Replace the indexed profiles, e.g., after loading them from the profile store."""
+        self.profiles[:] = profiles
+        self._positions = {
+            profile.registration_information.username: idx
+            for idx, profile in enumerate(self.profiles)
+        }
+
+    def get(self, username: str) -> ViewerProfile | None:
+        position = self._positions.get(username)
+        return self.profiles[position] if position is not None else None
+
+    def position(self, username: str) -> int | None:
+        return self._positions.get(username)
+
+    def upsert(self, viewer_profile: ViewerProfile) -> bool:
+        """Replace the profile with the same username, or append it.
+
+        Args:
+            viewer_profile (ViewerProfile): The viewer profile to index.
+        Returns:
+            bool: True if the profile was new, False if it replaced an existing one.
+        """
+        username = viewer_profile.registration_information.username
+        position = self._positions.get(username)
+        if position is not None:
+            self.profiles[position] = viewer_profile
+            return False
+        self._positions[username] = len(self.profiles)
+        self.profiles.append(viewer_profile)
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import or export viewer profiles between the profile store and JSON."
+    )
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file_path", nargs="?", default="viewer_profiles.json")
+    parser.add_argument("--db-path", default=PROFILE_DB_PATH)
+    args = parser.parse_args()
+
+    store = ProfileStore(args.db_path)
+    if args.command == "import":
+        store.import_json(args.file_path)
+    else:
+        store.export_json(args.file_path)
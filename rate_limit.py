@@ -0,0 +1,62 @@
+import threading
+import time
+
+from metrics import metrics
+
+
+class TokenBucket:
+    """A thread-safe token bucket that allows bursts of up to `capacity` calls, refilled at `rate_per_second`.
+
+    Time spent waiting for a token is recorded as `<name>.wait_ms`.
+    """
+
+    def __init__(
+        self, name: str, rate_per_second: float, capacity: float | None = None
+    ):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive.")
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.rate_per_second,
+        )
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if they are available now, without waiting."""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """Wait until tokens are available and take them.
+
+        Args:
+            tokens (float): The number of tokens to take.
+            timeout (float, optional): The longest time to wait, in seconds; waits indefinitely if None.
+        Returns:
+            bool: True if the tokens were taken, False if the timeout passed first.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill_locked(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    metrics.observe(f"{self.name}.wait_ms", (now - start) * 1000)
+                    return True
+                wait_seconds = (tokens - self._tokens) / self.rate_per_second
+            if timeout is not None and now + wait_seconds - start > timeout:
+                return False
+            time.sleep(wait_seconds)
@@ -0,0 +1,230 @@
+import heapq
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from metrics import metrics
+from rate_limit import TokenBucket
+
+# Load environment variables
+SCHEDULER = os.getenv("SCHEDULER", "True").lower() == "true"
+USER_REQUESTS_PER_MINUTE = float(os.getenv("USER_REQUESTS_PER_MINUTE", "12"))
+USER_REQUEST_BURST = float(os.getenv("USER_REQUEST_BURST", "4"))
+BEDROCK_MAX_CONCURRENCY = int(
+    os.getenv("BEDROCK_MAX_CONCURRENCY", os.getenv("AGENT_POOL_MAX_SIZE", "4"))
+)
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "8"))
+# The longest a request of each priority class may wait for a slot before it is shed
+SLA_SECONDS = {
+    "chat": float(os.getenv("CHAT_SLA_SECONDS", "15")),
+    "grid": float(os.getenv("GRID_SLA_SECONDS", "30")),
+    "health": float(os.getenv("HEALTH_SLA_SECONDS", "10")),
+}
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+# Priority classes, highest first; background work, e.g., chat summaries, waits behind all of them
+PRIORITIES = ["chat", "grid", "health", "background"]
+
+
+class RequestRejected(Exception):
+    """A request that was refused admission, with a message that can be shown to the user."""
+
+
+class Backend:
+    """A global cap on concurrent calls to one backend, with waiting calls admitted by priority.
+
+    Calls of a higher priority class are admitted first; calls of the same class
+    in arrival order. The mean call duration is tracked, so a call whose estimated
+    wait already exceeds its class's SLA is shed at once rather than after waiting.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.in_use = 0
+        self.mean_seconds: float | None = None
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _estimated_wait_locked(self, rank: int) -> float:
+        ahead = sum(1 for waiting in self._waiting if waiting[0] <= rank)
+        if self.in_use < self.max_concurrency and not ahead:
+            return 0.0
+        return (ahead + 1) / self.max_concurrency * (self.mean_seconds or 0.0)
+
+    def acquire(self, priority: str, sla_seconds: float | None) -> None:
+        """Wait for a slot, in priority order.
+
+        Args:
+            priority (str): One of PRIORITIES.
+            sla_seconds (float, optional): The longest wait before the call is shed; None to wait indefinitely.
+        Raises:
+            RequestRejected: If the call would wait longer than `sla_seconds`.
+        """
+        start = time.monotonic()
+        ticket = (PRIORITIES.index(priority), next(self._sequence))
+        with self._condition:
+            if (
+                sla_seconds is not None
+                and self._estimated_wait_locked(ticket[0]) > sla_seconds
+            ):
+                self._shed_locked(priority)
+            heapq.heappush(self._waiting, ticket)
+            while self._waiting[0] != ticket or self.in_use >= self.max_concurrency:
+                remaining = (
+                    start + sla_seconds - time.monotonic()
+                    if sla_seconds is not None
+                    else None
+                )
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._condition.notify_all()
+                    self._shed_locked(priority)
+                self._condition.wait(remaining)
+            heapq.heappop(self._waiting)
+            self.in_use += 1
+            # The next call in line may fit in another free slot
+            self._condition.notify_all()
+            self._publish_gauges_locked()
+        metrics.increment(f"scheduler.{self.name}.admitted")
+        metrics.observe(
+            f"scheduler.{self.name}.{priority}.wait_ms",
+            (time.monotonic() - start) * 1000,
+        )
+
+    def release(self, duration_seconds: float) -> None:
+        with self._condition:
+            self.in_use -= 1
+            self.mean_seconds = (
+                duration_seconds
+                if self.mean_seconds is None
+                else 0.8 * self.mean_seconds + 0.2 * duration_seconds
+            )
+            self._condition.notify_all()
+            self._publish_gauges_locked()
+
+    def _shed_locked(self, priority: str) -> None:
+        metrics.increment(f"scheduler.{self.name}.shed")
+        metrics.increment(f"scheduler.{priority}.shed")
+        logger.warning(
+            f"Shed a {priority} call to {self.name}: {self.in_use} running, {len(self._waiting)} waiting"
+        )
+        raise RequestRejected(
+            "The recommendations service is busy right now. Please try again in a minute."
+        )
+
+    def _publish_gauges_locked(self) -> None:
+        metrics.set_gauge(f"scheduler.{self.name}.in_use", self.in_use)
+        metrics.set_gauge(f"scheduler.{self.name}.waiting", len(self._waiting))
+
+
+class Scheduler:
+    """Admission control in front of the agent and search calls.
+
+    Each user's requests are limited by a token bucket of `user_burst` requests,
+    refilled at `user_requests_per_minute`, so one user cannot starve the others.
+    Calls to each backend are limited to its concurrency cap, and waiting calls
+    are admitted in priority order: chat, then the recommendations grid, then
+    the health check, then background work. A call that would wait longer than
+    its class's SLA is shed with a message for the user; background work is
+    never shed.
+    """
+
+    def __init__(
+        self,
+        backends: dict[str, int],
+        user_requests_per_minute: float = USER_REQUESTS_PER_MINUTE,
+        user_burst: float = USER_REQUEST_BURST,
+        sla_seconds: dict[str, float] = SLA_SECONDS,
+        enabled: bool = SCHEDULER,
+    ):
+        self.backends = {
+            name: Backend(name, max_concurrency)
+            for name, max_concurrency in backends.items()
+        }
+        self.user_requests_per_minute = user_requests_per_minute
+        self.user_burst = user_burst
+        self.sla_seconds = sla_seconds
+        self.enabled = enabled
+        self._user_buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def admit_user(self, username: str | None, priority: str) -> None:
+        """Take one request from a user's token bucket.
+
+        Raises:
+            RequestRejected: If the user has no requests left; anonymous requests are not limited.
+        """
+        if not self.enabled or not username or self.user_requests_per_minute <= 0:
+            return
+        with self._lock:
+            bucket = self._user_buckets.get(username)
+            if bucket is None:
+                bucket = TokenBucket(
+                    "scheduler.user",
+                    self.user_requests_per_minute / 60,
+                    capacity=self.user_burst,
+                )
+                self._user_buckets[username] = bucket
+        if not bucket.try_acquire():
+            metrics.increment("scheduler.user_limited")
+            metrics.increment(f"scheduler.{priority}.user_limited")
+            logger.warning(f"Rate limited a {priority} request from {username}")
+            raise RequestRejected(
+                "You are sending requests faster than they can be served. "
+                f"Please wait {60 / self.user_requests_per_minute:.0f} seconds and try again."
+            )
+
+    @contextmanager
+    def slot(self, backend: str, priority: str, shed: bool = True) -> Iterator[None]:
+        """Hold one of a backend's slots for the duration of the `with` block.
+
+        Args:
+            backend (str): "bedrock" or "search".
+            priority (str): One of PRIORITIES.
+            shed (bool): Whether the call may be shed when it would exceed its class's SLA.
+        Raises:
+            RequestRejected: If the call is shed.
+        """
+        if not self.enabled:
+            yield
+            return
+        limiter = self.backends[backend]
+        limiter.acquire(priority, self.sla_seconds.get(priority) if shed else None)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - start)
+
+    def summary(self) -> str:
+        if not self.enabled:
+            return "- __Scheduler__: off"
+        lines = [
+            f"- __User Limit__: {self.user_requests_per_minute:g} request(s)/minute, "
+            f"bursts of {self.user_burst:g}; {metrics.counter('scheduler.user_limited'):g} limited"
+        ]
+        for limiter in self.backends.values():
+            lines.append(
+                f"- __{limiter.name}__: {limiter.in_use} / {limiter.max_concurrency} running, "
+                f"{metrics.counter(f'scheduler.{limiter.name}.admitted'):g} admitted, "
+                f"{metrics.counter(f'scheduler.{limiter.name}.shed'):g} shed"
+            )
+        return "\n".join(lines)
+
+
+# Shared by the app's agent calls and the search tools
+scheduler = Scheduler(
+    {"bedrock": BEDROCK_MAX_CONCURRENCY, "search": SEARCH_MAX_CONCURRENCY}
+)
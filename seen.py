@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+from collections import deque
+
+from catalog import normalize_title
+from data import Recommendation, ViewerProfile
+from metrics import metrics
+
+# Load environment variables
+SEEN_FILTER = os.getenv("SEEN_FILTER", "True").lower() == "true"
+SEEN_PROMPT_TITLES = int(os.getenv("SEEN_PROMPT_TITLES", "30"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+def title_hash(title: str) -> int:
+    """Return a 64-bit hash of a title's normalized form, so "Alien: Earth" and "alien earth" match."""
+    return int.from_bytes(
+        hashlib.blake2b(normalize_title(title).encode("utf-8"), digest_size=8).digest(),
+        "big",
+    )
+
+
+class SeenTitles:
+    """The titles one viewer has watched, favorited or been recommended.
+
+    Membership is kept as a set of 64-bit title hashes, so checking a title costs
+    one hash and a set lookup, and the set stays small however long the titles
+    are. The most recent `prompt_titles` titles are also kept as text, to list in
+    prompts. A title added from a recommendations result keeps that result's id
+    as its origin, so showing the same result again, e.g., from the result cache
+    after a double-click, does not count its own titles as repeats.
+    """
+
+    def __init__(self, prompt_titles: int = SEEN_PROMPT_TITLES):
+        self._hashes: set[int] = set()
+        self._origins: dict[int, str] = {}
+        self._recent: deque[str] = deque(maxlen=max(0, prompt_titles))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hashes)
+
+    def __contains__(self, title: str) -> bool:
+        key = title_hash(title)
+        with self._lock:
+            return key in self._hashes
+
+    def add(self, titles: list[str], origin: str | None = None) -> None:
+        for title in titles:
+            if not normalize_title(title):
+                continue
+            key = title_hash(title)
+            with self._lock:
+                if key in self._hashes:
+                    continue
+                self._hashes.add(key)
+                if origin is not None:
+                    self._origins[key] = origin
+                self._recent.append(title)
+
+    def is_repeat(self, title: str, origin: str | None = None) -> bool:
+        """Whether a title was seen before, other than as part of the result `origin` itself."""
+        key = title_hash(title)
+        with self._lock:
+            return key in self._hashes and (
+                origin is None or self._origins.get(key) != origin
+            )
+
+    def recent(self) -> list[str]:
+        """Return the most recently added titles, newest first, for a prompt's exclusion list."""
+        with self._lock:
+            return list(reversed(self._recent))
+
+
+class SeenIndex:
+    """Keeps a SeenTitles per viewer, loaded with the profiles and added to as recommendations are shown.
+
+    Each check of an agent's recommendations counts how many repeat a seen title,
+    before filtering (`seen.agent_repeats` of `seen.agent_checked`) and among those
+    finally shown (`seen.shown_repeats` of `seen.shown`).
+    """
+
+    def __init__(self):
+        self._viewers: dict[str, SeenTitles] = {}
+        self._lock = threading.Lock()
+
+    def get(self, username: str | None) -> SeenTitles | None:
+        if not username:
+            return None
+        with self._lock:
+            return self._viewers.setdefault(username, SeenTitles())
+
+    def load(self, viewer_profile: ViewerProfile) -> SeenTitles:
+        """Add a profile's viewing history, personal favorites and saved recommendations to its viewer's titles."""
+        seen = self.get(viewer_profile.registration_information.username)
+        seen.add([history.title for history in viewer_profile.viewing_history])
+        seen.add([favorite.title for favorite in viewer_profile.personal_favorites])
+        seen.add(
+            [recommendation.title for recommendation in viewer_profile.recommendations]
+        )
+        return seen
+
+    @staticmethod
+    def split(
+        seen: SeenTitles,
+        recommendations: list[Recommendation],
+        origin: str | None = None,
+    ) -> tuple[list[Recommendation], list[Recommendation]]:
+        """Split an agent's recommendations into new titles and repeats of seen titles.
+
+        Args:
+            origin (str, optional): The id of the result the recommendations come from, whose own titles are not repeats.
+        """
+        fresh, repeats = [], []
+        for recommendation in recommendations:
+            (repeats if seen.is_repeat(recommendation.title, origin) else fresh).append(
+                recommendation
+            )
+        metrics.increment("seen.agent_checked", len(recommendations))
+        metrics.increment("seen.agent_repeats", len(repeats))
+        return fresh, repeats
+
+    @staticmethod
+    def record_shown(
+        seen: SeenTitles,
+        recommendations: list[Recommendation],
+        origin: str | None = None,
+    ) -> None:
+        """Count repeats among the recommendations finally shown, then add them to the seen titles."""
+        metrics.increment("seen.shown", len(recommendations))
+        metrics.increment(
+            "seen.shown_repeats",
+            sum(
+                seen.is_repeat(recommendation.title, origin)
+                for recommendation in recommendations
+            ),
+        )
+        seen.add([recommendation.title for recommendation in recommendations], origin)
+
+    def summary(self) -> str:
+        agent_checked = metrics.counter("seen.agent_checked")
+        shown = metrics.counter("seen.shown")
+        with self._lock:
+            viewers = len(self._viewers)
+        return "\n".join(
+            [
+                f"- __Viewers__: {viewers}",
+                f"- __Repeat Rate Before Filtering__: "
+                f"{metrics.counter('seen.agent_repeats') / agent_checked if agent_checked else 0:.0%} "
+                f"of {agent_checked:g} agent recommendation(s)",
+                f"- __Repeat Rate Shown__: "
+                f"{metrics.counter('seen.shown_repeats') / shown if shown else 0:.0%} "
+                f"of {shown:g} recommendation(s)",
+            ]
+        )
@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Any, Iterator
+
+from pydantic import ValidationError
+from strands import Agent
+
+from data import Recommendation, RecommendationList
+from metrics import metrics
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+_STREAM_DONE = object()
+
+
+def stream_agent(agent: Agent, prompt: Any, feature: str) -> Iterator[dict]:
+    """Run the agent and yield its stream events from a synchronous generator.
+
+    The agent runs on its own event loop in a worker thread, so Gradio's
+    synchronous generator handlers can forward events as they arrive. Closing the
+    generator cancels the agent run and waits for it to stop, so the caller can
+    safely return the agent to the pool.
+
+    Args:
+        agent (Agent): The agent to invoke.
+        prompt: The prompt passed to `Agent.stream_async`.
+        feature (str): Metric name prefix, e.g., "recommendations" or "chat".
+    Returns:
+        Iterator[dict]: Strands stream events, e.g., {"data": ...}, {"current_tool_use": ...}, {"result": ...}.
+    """
+    events: queue.Queue = queue.Queue()
+    cancel_signal = threading.Event()
+
+    async def consume():
+        async for event in agent.stream_async(prompt, cancel_signal=cancel_signal):
+            events.put(event)
+
+    def run():
+        try:
+            asyncio.run(consume())
+        except Exception as e:
+            events.put(e)
+        finally:
+            events.put(_STREAM_DONE)
+
+    start = time.monotonic()
+    first_token = True
+    # Run in a copy of the caller's context, so the agent's spans are children of the current span
+    worker = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(run,),
+        name=f"{feature}-stream",
+        daemon=True,
+    )
+    worker.start()
+    try:
+        while (event := events.get()) is not _STREAM_DONE:
+            if isinstance(event, Exception):
+                raise event
+            if first_token and "data" in event:
+                first_token = False
+                time_to_first_token = (time.monotonic() - start) * 1000
+                metrics.observe(
+                    f"{feature}.time_to_first_token_ms", time_to_first_token
+                )
+                logger.info(
+                    f"Time to first token ({feature}): {time_to_first_token:.0f}ms"
+                )
+            yield event
+    finally:
+        cancel_signal.set()
+        worker.join()
+        metrics.observe(
+            f"{feature}.stream_duration_ms", (time.monotonic() - start) * 1000
+        )
+
+
+class RecommendationStreamParser:
+    """Incrementally extract complete `Recommendation` objects from streamed JSON text.
+
+    Expects text shaped like `{"recommendations": [{...}, {...}]}`, possibly with
+    surrounding prose or code fences. Each object that is a direct element of an
+    array is validated as a `Recommendation` as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._position = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start: int | None = None
+
+    def feed(self, chunk: str) -> list[Recommendation]:
+        """Add streamed text and return any recommendations completed by it."""
+        self.text += chunk
+        completed = []
+        for position in range(self._position, len(self.text)):
+            char = self.text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._stack:
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._stack and self._stack[-1] == "[":
+                    self._object_start = position
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._object_start is not None:
+                    if self._stack and self._stack[-1] == "[":
+                        recommendation = self._validate(
+                            self.text[self._object_start : position + 1]
+                        )
+                        if recommendation:
+                            completed.append(recommendation)
+                        self._object_start = None
+        self._position = len(self.text)
+        return completed
+
+    @staticmethod
+    def _validate(candidate: str) -> Recommendation | None:
+        try:
+            return Recommendation.model_validate_json(candidate)
+        except ValidationError as e:
+            logger.debug(f"Skipping incomplete or invalid recommendation: {e}")
+            return None
+
+
+def parse_recommendation_list(text: str) -> RecommendationList | None:
+    """Validate the JSON object in an agent response as a `RecommendationList`.
+
+    Args:
+        text (str): The agent's final response, possibly wrapped in prose or code fences.
+    Returns:
+        RecommendationList | None: The recommendations, or None if the response does not validate.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        return RecommendationList.model_validate_json(text[start : end + 1])
+    except ValidationError as e:
+        logger.warning(f"Agent response did not validate as RecommendationList: {e}")
+        return None
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import numpy as np
+
+from embeddings import VectorIndex
+
+
+def vector(seed: int, dimensions: int = 8) -> np.ndarray:
+    values = np.random.default_rng(seed).random(dimensions).astype(np.float32)
+    return values / np.linalg.norm(values)
+
+
+def test_concurrent_saves_do_not_race(tmp_path):
+    path = str(tmp_path / "viewers")
+    index = VectorIndex("test_index", 8, path, save_delay_seconds=0)
+    errors = []
+
+    def save_many(thread: int):
+        for idx in range(20):
+            index.add(f"{thread}-{idx}", vector(thread * 100 + idx), {"idx": idx})
+            try:
+                index.save()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=save_many, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "viewers.json",
+        "viewers.npy",
+    ]
+    assert len(VectorIndex("test_index", 8, path)) == 80
+
+
+def test_saves_are_debounced_into_one_flush(tmp_path):
+    path = str(tmp_path / "viewers")
+    index = VectorIndex("test_debounce", 8, path, save_delay_seconds=0.2)
+    for idx in range(10):
+        index.add(str(idx), vector(idx), {})
+        index.save()
+    assert not (tmp_path / "viewers.npy").exists()
+
+    time.sleep(0.5)
+    reloaded = VectorIndex("test_debounce", 8, path)
+    assert len(reloaded) == 10
@@ -0,0 +1,163 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Sequence
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import Status, StatusCode
+from strands.telemetry import StrandsTelemetry
+
+# Load environment variables
+# "none", "jsonl", "console" or "otlp" (requires opentelemetry-exporter-otlp and OTEL_EXPORTER_OTLP_ENDPOINT)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_PATH = os.getenv("TRACING_PATH", "traces.jsonl")
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends each finished span to a file as one JSON object per line.
+
+    Spans of one request share a `trace_id`; `parent_span_id` links each span to
+    the span it was started in, so a request can be rebuilt as a tree.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [json.dumps(self.span_to_dict(span), default=str) for span in spans]
+        try:
+            with self._lock, open(file=self.path, mode="a", encoding="utf-8") as f:
+                f.writelines(f"{line}\n" for line in lines)
+        except OSError as e:
+            logger.error(f"Error writing spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    @staticmethod
+    def span_to_dict(span: ReadableSpan) -> dict:
+        return {
+            "name": span.name,
+            "trace_id": f"{span.context.trace_id:032x}",
+            "span_id": f"{span.context.span_id:016x}",
+            "parent_span_id": f"{span.parent.span_id:016x}" if span.parent else None,
+            "start_time_ns": span.start_time,
+            "duration_ms": (span.end_time - span.start_time) / 1e6,
+            "status": span.status.status_code.name,
+            "attributes": dict(span.attributes or {}),
+            "events": [
+                {"name": event.name, "attributes": dict(event.attributes or {})}
+                for event in span.events
+            ],
+        }
+
+
+def setup_tracing(exporter: str = TRACING_EXPORTER) -> None:
+    """Install a global tracer provider for the app's spans and the Strands agent, model and tool spans.
+
+    Args:
+        exporter (str): "jsonl", "console", "otlp", or "none" to leave tracing disabled.
+    """
+    if exporter == "none":
+        return
+    telemetry = StrandsTelemetry()
+    if exporter == "jsonl":
+        telemetry.tracer_provider.add_span_processor(
+            BatchSpanProcessor(JsonlSpanExporter(TRACING_PATH))
+        )
+    elif exporter == "console":
+        telemetry.setup_console_exporter()
+    elif exporter == "otlp":
+        telemetry.setup_otlp_exporter()
+    else:
+        logger.warning(f"Unknown TRACING_EXPORTER '{exporter}'; spans are not exported")
+        return
+    logger.info(f"Tracing enabled: {exporter} exporter")
+
+
+setup_tracing()
+tracer = trace.get_tracer("personalization-agent")
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[trace.Span]:
+    """Record the `with` block as a child span of the current span."""
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def annotate(**attributes) -> None:
+    """Set attributes on the current span, e.g., whether a cache was hit."""
+    trace.get_current_span().set_attributes(attributes)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorate a Gradio event handler so each call is recorded as a root span named `name`.
+
+    Generator handlers keep the span open until the generator is exhausted or
+    closed. Each step runs with the span as the current span, so work done on
+    Gradio's worker threads between yields is still recorded under it.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isgeneratorfunction(fn):
+
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                handler_span = tracer.start_span(name)
+                handler_context = trace.set_span_in_context(handler_span)
+                generator = fn(*args, **kwargs)
+                updates = 0
+                try:
+                    while True:
+                        token = context.attach(handler_context)
+                        try:
+                            value = next(generator)
+                        except StopIteration:
+                            return
+                        finally:
+                            context.detach(token)
+                        updates += 1
+                        if updates == 1:
+                            handler_span.add_event("first_update")
+                        yield value
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        handler_span.record_exception(e)
+                        handler_span.set_status(Status(StatusCode.ERROR, str(e)))
+                    raise
+                finally:
+                    token = context.attach(handler_context)
+                    try:
+                        generator.close()
+                    finally:
+                        context.detach(token)
+                    handler_span.set_attribute("updates", updates)
+                    handler_span.end()
+
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
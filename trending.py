@@ -0,0 +1,158 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from cards import card_renderer
+from data import Recommendation
+from metrics import metrics
+
+# Load environment variables
+# Seconds between refreshes from the search tools; 0 serves the trending file only
+TRENDING_REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "21600"))
+TRENDING_RETRY_SECONDS = float(os.getenv("TRENDING_RETRY_SECONDS", "900"))
+TRENDING_COUNT = int(os.getenv("TRENDING_COUNT", "16"))
+TRENDING_SAMPLE_SIZE = int(os.getenv("TRENDING_SAMPLE_SIZE", "8"))
+TRENDING_VARIANTS = int(os.getenv("TRENDING_VARIANTS", "12"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+TRENDING_EMPTY_MESSAGE = "No current recommendations available."
+
+
+@dataclass(frozen=True)
+class TrendingSnapshot:
+    """One version of the feed: its recommendations and the grid HTML of each random sample of them."""
+
+    recommendations: tuple[Recommendation, ...]
+    variants: tuple[str, ...]
+    source: str
+    refreshed_at: float
+
+
+class TrendingFeed:
+    """Serves the "Start Watching" grid from a snapshot that is refreshed in the background.
+
+    Each snapshot holds `variants` random samples of `sample_size` recommendations,
+    already rendered as grid HTML, so serving a page is a random choice of a
+    string. A refresh builds a complete new snapshot and then swaps it in with a
+    single assignment, so readers never see a partial feed. If a refresh fails
+    or returns nothing, the current snapshot keeps being served, stale, and the
+    refresh is retried after `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int], list[Recommendation]],
+        initial: list[Recommendation],
+        refresh_seconds: float = TRENDING_REFRESH_SECONDS,
+        retry_seconds: float = TRENDING_RETRY_SECONDS,
+        count: int = TRENDING_COUNT,
+        sample_size: int = TRENDING_SAMPLE_SIZE,
+        variants: int = TRENDING_VARIANTS,
+    ):
+        self.fetch = fetch
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.count = count
+        self.sample_size = max(1, sample_size)
+        self.variant_count = max(1, variants)
+        self.last_error: str | None = None
+        self._snapshot = self._build(initial, "file")
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: threading.Thread | None = None
+
+    def _build(
+        self, recommendations: list[Recommendation], source: str
+    ) -> TrendingSnapshot:
+        sample_size = min(self.sample_size, len(recommendations))
+        variants = tuple(
+            card_renderer.grid(
+                random.sample(recommendations, sample_size),
+                empty_message=TRENDING_EMPTY_MESSAGE,
+            )
+            for _ in range(self.variant_count if recommendations else 1)
+        )
+        return TrendingSnapshot(tuple(recommendations), variants, source, time.time())
+
+    @property
+    def recommendations(self) -> list[Recommendation]:
+        return list(self._snapshot.recommendations)
+
+    def serve(self) -> str:
+        """Return the grid HTML of one pre-rendered sample of the current feed."""
+        snapshot = self._snapshot
+        metrics.increment("trending.served")
+        return random.choice(snapshot.variants)
+
+    def refresh(self) -> bool:
+        """Fetch a new feed and swap it in; on failure, keep serving the current one.
+
+        Returns:
+            bool: Whether the feed was replaced.
+        """
+        # One refresh at a time; a caller that finds one running keeps the current feed
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.monotonic()
+            recommendations = self.fetch(self.count)
+            metrics.observe("trending.refresh_ms", (time.monotonic() - start) * 1000)
+            if not recommendations:
+                raise ValueError("the refresh returned no recommendations")
+            self._snapshot = self._build(recommendations, "search")
+            self.last_error = None
+            metrics.increment("trending.refreshes")
+            logger.info(
+                f"Trending feed refreshed: {len(recommendations)} recommendations"
+            )
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            metrics.increment("trending.refresh_errors")
+            logger.error(
+                f"Error refreshing trending feed, serving the previous one: {e}"
+            )
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def start(self) -> threading.Thread | None:
+        """Refresh now and then every `refresh_seconds` in a daemon thread; sooner after a failure."""
+        if self.refresh_seconds <= 0 or self._refresh_thread is not None:
+            return None
+
+        def run():
+            while True:
+                refreshed = self.refresh()
+                time.sleep(self.refresh_seconds if refreshed else self.retry_seconds)
+
+        self._refresh_thread = threading.Thread(
+            target=run, name="trending-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+        return self._refresh_thread
+
+    def summary(self) -> str:
+        snapshot = self._snapshot
+        age_minutes = (time.time() - snapshot.refreshed_at) / 60
+        lines = [
+            f"- __Source__: {snapshot.source}, {len(snapshot.recommendations)} recommendations, "
+            f"{len(snapshot.variants)} pre-rendered sample(s)",
+            f"- __Age__: {age_minutes:.0f} minute(s)",
+            (
+                f"- __Refresh__: every {self.refresh_seconds / 3600:g}h"
+                if self.refresh_seconds > 0
+                else "- __Refresh__: off"
+            ),
+        ]
+        if self.last_error:
+            lines.append(f"- __Last Refresh Error__: {self.last_error}")
+        return "\n".join(lines)
@@ -0,0 +1,261 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from strands import Agent
+
+from metrics import metrics
+
+# Load environment variables
+USAGE_WINDOW_SECONDS = float(os.getenv("USAGE_WINDOW_SECONDS", "86400"))
+USAGE_MAX_RECORDS = int(os.getenv("USAGE_MAX_RECORDS", "100000"))
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "60"))
+USAGE_LOG_PATH = os.getenv("USAGE_LOG_PATH") or None
+# USD per million tokens, for cost estimates only; defaults are Claude Haiku 4.5 on Amazon Bedrock
+PRICE_INPUT_PER_MTOK = float(os.getenv("PRICE_INPUT_PER_MTOK", "1.0"))
+PRICE_OUTPUT_PER_MTOK = float(os.getenv("PRICE_OUTPUT_PER_MTOK", "5.0"))
+PRICE_CACHE_READ_PER_MTOK = float(os.getenv("PRICE_CACHE_READ_PER_MTOK", "0.1"))
+PRICE_CACHE_WRITE_PER_MTOK = float(os.getenv("PRICE_CACHE_WRITE_PER_MTOK", "1.25"))
+
+# Basic logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+
+
+@dataclass
+class UsageRecord:
+    """Token usage, tool calls and latency of the agent invocations made for one request."""
+
+    timestamp: float
+    username: str
+    feature: str
+    requests: int = 1
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    tool_calls: int = 0
+    model_latency_ms: float = 0.0
+    latency_ms: float = 0.0
+    errors: int = 0
+
+    @property
+    def prompt_tokens(self) -> int:
+        """All prompt tokens, whether read from the prompt cache, written to it, or not cached."""
+        return self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @property
+    def cost(self) -> float:
+        """Estimated cost in USD."""
+        return (
+            self.input_tokens * PRICE_INPUT_PER_MTOK
+            + self.output_tokens * PRICE_OUTPUT_PER_MTOK
+            + self.cache_read_tokens * PRICE_CACHE_READ_PER_MTOK
+            + self.cache_write_tokens * PRICE_CACHE_WRITE_PER_MTOK
+        ) / 1_000_000
+
+    def add(self, other: "UsageRecord") -> None:
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+        self.tool_calls += other.tool_calls
+        self.model_latency_ms += other.model_latency_ms
+        self.latency_ms += other.latency_ms
+        self.errors += other.errors
+
+
+def _agent_counters(agent: Agent) -> dict[str, float]:
+    # Strands accumulates these over the agent's lifetime, and pooled agents serve many requests
+    event_loop_metrics = agent.event_loop_metrics
+    usage = event_loop_metrics.accumulated_usage
+    input_tokens = usage.get("inputTokens", 0)
+    cache_read_tokens = usage.get("cacheReadInputTokens", 0)
+    cache_write_tokens = usage.get("cacheWriteInputTokens", 0)
+    # Some providers include cached tokens in inputTokens; count them only once
+    if input_tokens + usage.get("outputTokens", 0) == usage.get("totalTokens", 0):
+        input_tokens -= cache_read_tokens + cache_write_tokens
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": usage.get("outputTokens", 0),
+        "cache_read_tokens": cache_read_tokens,
+        "cache_write_tokens": cache_write_tokens,
+        "tool_calls": sum(
+            tool_metrics.call_count
+            for tool_metrics in event_loop_metrics.tool_metrics.values()
+        ),
+        "model_latency_ms": event_loop_metrics.accumulated_metrics.get("latencyMs", 0),
+    }
+
+
+class UsageTracker:
+    """Records the token usage of agent requests, tagged by username and feature.
+
+    Records are kept in memory for `window_seconds` and aggregated on demand for
+    the System Status tab. A background thread periodically flushes new records
+    to a JSON Lines file, when `log_path` is set, and logs a one-line summary.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = USAGE_WINDOW_SECONDS,
+        max_records: int = USAGE_MAX_RECORDS,
+        log_path: str | None = USAGE_LOG_PATH,
+    ):
+        self.window_seconds = window_seconds
+        self.log_path = log_path
+        self._records: deque[UsageRecord] = deque(maxlen=max_records)
+        self._pending: list[UsageRecord] = []
+        self._lock = threading.Lock()
+        self._flush_thread: threading.Thread | None = None
+
+    @contextmanager
+    def track(
+        self, agent: Agent, username: str | None, feature: str
+    ) -> Iterator[UsageRecord]:
+        """Record the usage of every agent invocation made inside the `with` block as one record.
+
+        Args:
+            agent (Agent): The agent that is invoked inside the block.
+            username (str, optional): The user the request is made for.
+            feature (str): The feature making the request, e.g., "description" or "chat".
+        Returns:
+            Iterator[UsageRecord]: The record, whose counts are filled in when the block exits.
+        """
+        usage_record = UsageRecord(
+            timestamp=time.time(), username=username or "anonymous", feature=feature
+        )
+        before = _agent_counters(agent)
+        start = time.monotonic()
+        try:
+            yield usage_record
+        except BaseException:
+            usage_record.errors = 1
+            raise
+        finally:
+            after = _agent_counters(agent)
+            for name in after:
+                setattr(usage_record, name, after[name] - before[name])
+            usage_record.timestamp = time.time()
+            usage_record.latency_ms = (time.monotonic() - start) * 1000
+            self.record(usage_record)
+
+    def record(self, usage_record: UsageRecord) -> None:
+        with self._lock:
+            self._records.append(usage_record)
+            self._pending.append(usage_record)
+        metrics.increment(
+            f"usage.{usage_record.feature}.tokens", usage_record.total_tokens
+        )
+
+    def _recent(self) -> list[UsageRecord]:
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            while self._records and self._records[0].timestamp < cutoff:
+                self._records.popleft()
+            return list(self._records)
+
+    def totals(self, group_by: str) -> dict[str, UsageRecord]:
+        """Aggregate the records in the window by "username" or "feature"."""
+        totals: dict[str, UsageRecord] = defaultdict(
+            lambda: UsageRecord(timestamp=0, username="", feature="", requests=0)
+        )
+        for usage_record in self._recent():
+            totals[getattr(usage_record, group_by)].add(usage_record)
+        return dict(totals)
+
+    def top_consumers(self, count: int = 5) -> list[tuple[str, UsageRecord]]:
+        """Return the usernames with the most tokens in the window, most first."""
+        return sorted(
+            self.totals("username").items(), key=lambda item: -item[1].total_tokens
+        )[:count]
+
+    def summary(self) -> str:
+        """Render usage by feature, the prompt cache hit rate and the top consumers as Markdown."""
+        by_feature = self.totals("feature")
+        if not by_feature:
+            return "- No agent invocations recorded yet."
+        lines = [f"- __Window__: {self.window_seconds / 3600:g}h"]
+        for feature, usage_record in sorted(by_feature.items()):
+            cache_hit_rate = (
+                usage_record.cache_read_tokens / usage_record.prompt_tokens
+                if usage_record.prompt_tokens
+                else 0.0
+            )
+            lines.append(
+                f"- __{feature}__: {usage_record.requests} request(s), "
+                f"{usage_record.input_tokens:,} input / {usage_record.output_tokens:,} output / "
+                f"{usage_record.cache_read_tokens:,} cache read / {usage_record.cache_write_tokens:,} cache write tokens, "
+                f"prompt cache hit rate {cache_hit_rate:.0%}, {usage_record.tool_calls} tool call(s), "
+                f"mean latency {usage_record.latency_ms / usage_record.requests:.0f}ms, "
+                f"~${usage_record.cost:.4f}"
+            )
+        lines.append("- __Top Consumers__:")
+        for username, usage_record in self.top_consumers():
+            lines.append(
+                f"  - {username}: {usage_record.total_tokens:,} tokens in "
+                f"{usage_record.requests} request(s), ~${usage_record.cost:.4f}"
+            )
+        return "\n".join(lines)
+
+    def flush(self) -> int:
+        """Write the records made since the last flush to `log_path`, if set, and log a summary.
+
+        Returns:
+            int: The number of records flushed.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        if self.log_path:
+            try:
+                with open(file=self.log_path, mode="a", encoding="utf-8") as f:
+                    f.writelines(
+                        f"{json.dumps(asdict(usage_record))}\n"
+                        for usage_record in pending
+                    )
+            except OSError as e:
+                logger.error(f"Error writing usage records to {self.log_path}: {e}")
+        total = UsageRecord(timestamp=0, username="", feature="", requests=0)
+        for usage_record in pending:
+            total.add(usage_record)
+        logger.info(
+            f"Usage: {total.requests} request(s), {total.total_tokens:,} tokens "
+            f"({total.cache_read_tokens:,} from the prompt cache), ~${total.cost:.4f}"
+        )
+        return len(pending)
+
+    def start_periodic_flush(self, interval_seconds: float = USAGE_FLUSH_SECONDS):
+        """Flush every `interval_seconds` in a daemon thread, and once more at exit."""
+        if self._flush_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                self.flush()
+
+        self._flush_thread = threading.Thread(
+            target=run, name="usage-flush", daemon=True
+        )
+        self._flush_thread.start()
+        atexit.register(self.flush)
+
+
+# Shared tracker used by all agent invocations
+usage_tracker = UsageTracker()
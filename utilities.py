@@ -1,13 +1,25 @@
 import json
 import logging
-import random
+import os
 import sys
-from typing import List
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List
 
 import gradio as gr
 from pydantic import ValidationError
+from strands import Agent
 
 import agent
+from agent_pool import AgentPool
+from caching import SingleFlight, TTLCache, content_hash
+from cards import card_renderer
+from catalog import CatalogMatch, ContentCatalog, normalize_title
+from constraints import CONSTRAINT_FILTER, ConstraintFilter, ConstraintResult
+from conversation import CHAT_COMPACTION, ChatCompactor, CompactedChat, estimate_tokens
+from custom_tools import search_cache, search_cache_summary
 from data import (
     CurrentConditions,
     DemographicInformation,
@@ -18,62 +30,472 @@ from data import (
     ViewerProfile,
     ViewingPreferences,
 )
+from embeddings import VectorIndex, create_embedder, find_duplicates
+from metrics import metrics, startup_timer
+from profile_store import ProfileIndex, ProfileStore
+from scheduler import RequestRejected, scheduler
+from seen import SEEN_FILTER, SeenIndex, SeenTitles
+from streaming import (
+    RecommendationStreamParser,
+    parse_recommendation_list,
+    stream_agent,
+)
+from tracing import annotate, span
+from trending import TrendingFeed
+from usage import UsageRecord, usage_tracker
 
 # Basic logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 
-personalization_agent = agent.create_agent()
+agent_pool = AgentPool(agent.create_agent)
+
+profile_store = ProfileStore()
+
+# "direct" validates the agent's JSON response; "reparse" always makes a second structured_output call
+STRUCTURED_OUTPUT_MODE = os.getenv("STRUCTURED_OUTPUT_MODE", "direct").lower()
+
+RECOMMENDATION_JSON_FORMAT = """Return the recommendations as a single JSON object, without code fences, in exactly this format, so each recommendation can be shown as soon as it is written:
+{"recommendations": [{"title": "...", "preview_keyframe": "URL of a preview image, or an empty string", "streaming_platform": "...", "url": "...", "reason": "..."}]}"""
+
+# "cached" sends each prompt as static instructions, a cache point, then the request's data, so the
+# instructions are read from the prompt cache; "legacy" sends one string with the data in the middle
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "cached").lower()
+
+VIEWER_DESCRIPTION_INSTRUCTIONS = """Based directly on the following information about the streaming media viewer information below and th guide to the sections of the viewer information, write a description of this viewer. The goal is to use the description to make personalized content recommendations for this viewer. The description should focus on the viewer's preferences, interests, and demographic information. The description should be written in a way that is easy to understand and captures the essence of the viewer's personality and viewing habits.
+# Important Notes:
+- Only return the description with no additional text, preamble, explanation, thinking, or reflection on the viewer's information.
+- Don't focus on which streaming platforms the viewer watched content previously, but rather the type of content they prefer to watch.
+- Include personal favorites as part of the description to help inform the recommendations.
+
+# Section Guide
+Guide to possible sections in the viewer_information data object:
+1. demographic_information: Information about the viewer's background, such as age, gender, and location.
+2. viewing_preferences: Information about the viewer's content preferences, such as favorite genres and themes.
+3. personal_favorites: Information about the viewer's favorite content.
+4. current_conditions: Information about the current context, such as season, holiday, or weather.
+5. viewing_history: Information about the viewer's past viewing behavior."""
+
+RECOMMENDATIONS_INSTRUCTIONS = f"""Make personalized recommendations for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.), based directly on the description of the viewer in the <viewer_description> tags at the end of this message. Make exactly as many recommendations as the number in the <recommendation_count> tags.
+
+Using the structured format provided, return a list of recommendations. Include the title, streaming platform on which the content can be viewed, URL of content, and brief description of the reason why you are recommending it to me.
+
+Important Notes:
+- Get the current date and time using the current_time tool before making recommendations.
+- Only return the recommendations in the structured format with no additional text, preamble, or explanation.
+- If there are candidates in <catalog_candidates> tags, they are ranked by how well they match the viewer's preferences. Prefer the catalog candidates. Confirm that each one you choose is still available at its URL and explain why it fits the viewer. Only search the Internet for other content if too few candidates fit, and validate that those URLs actually work.
+- If there are no catalog candidates, search the Internet for relevant content and validate that the URLs actually work.
+- Do not recommend any title in the <exclude_titles> tags, if present; the viewer has already watched or been recommended them.
+- Always refer to the viewer in first person: "you," "your," and "yours."
+
+{RECOMMENDATION_JSON_FORMAT}"""
+
+CHAT_RECOMMENDATIONS_INSTRUCTIONS = f"""Make personalized recommendations for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.), based directly on the chat history in the <chat_history> tags at the end of this message. Make exactly as many recommendations as the number in the <recommendation_count> tags.
+
+Using the structured format provided, return a list of recommendations. Include the title, streaming platform on which the content can be viewed, URL of content, and brief description of the content.
+
+Important Notes:
+- Get the current date and time using the current_time tool before making recommendations.
+- Only return the answer with no additional text, preamble, or explanation.
+- Search the Internet for relevant content and validate that the URLs actually work.
+- The <conversation_summary> tags, if present, summarize the earlier part of the conversation; the <chat_history> tags hold the most recent messages.
+- Do not recommend any title in the <already_recommended> tags, if present; those have already been shown to the viewer.
+
+{RECOMMENDATION_JSON_FORMAT}"""
+
+
+# Viewer descriptions keyed by username and a hash of the selected profile sections
+description_cache = TTLCache(
+    "description_cache",
+    max_size=int(os.getenv("DESCRIPTION_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("DESCRIPTION_CACHE_TTL_SECONDS", "86400")),
+    disk_path=os.getenv("DESCRIPTION_CACHE_PATH") or None,
+)
+
+# Local catalog candidates offered to the agent with each recommendations request (0 disables)
+CATALOG_CANDIDATES = int(os.getenv("CATALOG_CANDIDATES", "8"))
+# Show local picks in the grid at once, then replace them with the agent's recommendations as they stream in
+HYBRID_RECOMMENDATIONS = os.getenv("HYBRID_RECOMMENDATIONS", "True").lower() == "true"
+content_catalog = ContentCatalog()
+# Checks generated recommendations against the viewer's genres, ratings and platforms
+constraint_filter = ConstraintFilter(content_catalog)
+# Titles each viewer has watched, favorited or been recommended, to exclude from new recommendations
+seen_index = SeenIndex()
+
+# Identical recommendation requests in flight share one agent run, whose result is reused for a short time
+RECOMMENDATION_COALESCING = (
+    os.getenv("RECOMMENDATION_COALESCING", "True").lower() == "true"
+)
+RECOMMENDATION_RESULT_TTL_SECONDS = float(
+    os.getenv("RECOMMENDATION_RESULT_TTL_SECONDS", "60")
+)
+# How long a request waits for an identical one's result before running the agent itself
+RECOMMENDATION_SHARED_WAIT_SECONDS = float(
+    os.getenv("RECOMMENDATION_SHARED_WAIT_SECONDS", "120")
+)
+recommendation_flight = SingleFlight("recommendation_flight")
+recommendation_results = TTLCache(
+    "recommendation_results",
+    max_size=int(os.getenv("RECOMMENDATION_RESULT_CACHE_SIZE", "256")),
+    ttl_seconds=RECOMMENDATION_RESULT_TTL_SECONDS,
+)
+
+# Embedding indexes of viewers and their liked recommendations, for "viewers like you" and de-duplication
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR") or None
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.8"))
+SIMILAR_VIEWERS = int(os.getenv("SIMILAR_VIEWERS", "3"))
+embedder = create_embedder()
+viewer_index = VectorIndex(
+    "viewer_index",
+    embedder.dimensions,
+    os.path.join(EMBEDDING_INDEX_DIR, "viewers") if EMBEDDING_INDEX_DIR else None,
+)
+recommendation_index = VectorIndex(
+    "recommendation_index",
+    embedder.dimensions,
+    (
+        os.path.join(EMBEDDING_INDEX_DIR, "recommendations")
+        if EMBEDDING_INDEX_DIR
+        else None
+    ),
+)
+
+# Profile sections that can be included in a viewer description
+DESCRIPTION_SECTIONS = [
+    "demographic_information",
+    "viewing_preferences",
+    "personal_favorites",
+    "current_conditions",
+    "viewing_history",
+]
+
+# Username index over viewer_profiles, which is updated in place on load and save
+viewer_profile_index = ProfileIndex()
+viewer_profiles: List[ViewerProfile] = viewer_profile_index.profiles
+viewer_profiles_lock = threading.Lock()
+
+
+def _session_key(request: gr.Request | None) -> str | None:
+    return getattr(request, "session_hash", None) if request else None
+
+
+# The scheduler's priority class of each agent feature; anything else is background work
+FEATURE_PRIORITIES = {
+    "chat": "chat",
+    "description": "grid",
+    "recommendations": "grid",
+    "recommendations_refill": "grid",
+    "health": "health",
+}
+
+
+def admit_request(request: gr.Request | None, priority: str) -> None:
+    """Take one request from the user's rate limit, or tell them to slow down."""
+    try:
+        scheduler.admit_user(getattr(request, "username", None), priority)
+    except RequestRejected as e:
+        raise gr.Error(str(e)) from e
+
 
-viewer_profiles: List[ViewerProfile] = []
+@contextmanager
+def scheduled_checkout(
+    feature: str, session_key: str | None = None, priority: str | None = None
+) -> Iterator[Agent]:
+    """Check out a pooled agent once the scheduler admits a Bedrock call of the feature's priority class.
 
+    Args:
+        priority (str, optional): A priority class that overrides the feature's, e.g., "background" for batch jobs.
 
-def check_agent_health() -> str:
-    config_info = f""" 
+    Raises:
+        gr.Error: If the call is shed because it would wait longer than its class's SLA.
+    """
+    try:
+        with scheduler.slot(
+            "bedrock", priority or FEATURE_PRIORITIES.get(feature, "background")
+        ):
+            with agent_pool.checkout(session_key) as personalization_agent:
+                yield personalization_agent
+    except RequestRejected as e:
+        raise gr.Error(str(e)) from e
+
+
+# Result of the last agent health check, which is a full model round trip
+agent_health = {"report": None, "checked_at": None}
+agent_health_lock = threading.Lock()
+
+
+def check_agent_health(request: gr.Request = None) -> str:
+    """Run the agent health check, cache its result, and return the full system status."""
+    admit_request(request, "health")
+    start = time.monotonic()
+    with scheduled_checkout("health") as personalization_agent:
+        config_info = f""" 
 - __Model Host__: Bedrock
 - __Model__: {personalization_agent.model.config['model_id']}
 - __Includes Tool Result Status__: {personalization_agent.model.config['include_tool_result_status']}
 - __Temperature__: {personalization_agent.model.config['temperature']}
+- __Prompt Layout__: {PROMPT_LAYOUT}
 - __Cache Prompt__: {personalization_agent.model.config['cache_prompt']}
 - __Cache Tools__: {personalization_agent.model.config['cache_tools']}
 - __Streaming__: {personalization_agent.model.config['streaming']}
 """  # type: ignore
 
-    try:
-        prompt_health = "Just return the word 'Healthy'. No additional text, preamble, explanation, tools, formatting, reasoning, or reflection."
-        response = personalization_agent(prompt_health)
-        response_health = response.message.get("content", "No response received.")[
-            0
-        ].get("text", "No response received.")
-        response_latency = response.metrics.accumulated_metrics.get(
-            "latencyMs", "No response received."
-        )
-        total_tokens = response.metrics.accumulated_usage.get(
-            "totalTokens", "No response received."
-        )
-        logger.debug(f"Agent health check response: {response}")
-        config_info += f"\n- __Agent Health Check Status__:\n{response_health}"
-        config_info += f"\n- __Accumulated Latency__:\n{response_latency}ms"
-        config_info += f"\n- __Accumulated Tokens__:\n{total_tokens}"
-    except Exception as e:
-        logger.error(f"Agent health check failed: {e}")
-        config_info += f"\n- __Agent Health Check Error__:\n{e}"
+        try:
+            prompt_health = "Just return the word 'Healthy'. No additional text, preamble, explanation, tools, formatting, reasoning, or reflection."
+            with usage_tracker.track(personalization_agent, "system", "health"):
+                response = personalization_agent(prompt_health)
+            response_health = response.message.get("content", "No response received.")[
+                0
+            ].get("text", "No response received.")
+            response_latency = response.metrics.accumulated_metrics.get(
+                "latencyMs", "No response received."
+            )
+            total_tokens = response.metrics.accumulated_usage.get(
+                "totalTokens", "No response received."
+            )
+            logger.debug(f"Agent health check response: {response}")
+            config_info += f"\n- __Agent Health Check Status__:\n{response_health}"
+            config_info += f"\n- __Accumulated Latency__:\n{response_latency}ms"
+            config_info += f"\n- __Accumulated Tokens__:\n{total_tokens}"
+        except Exception as e:
+            logger.error(f"Agent health check failed: {e}")
+            config_info += f"\n- __Agent Health Check Error__:\n{e}"
+    metrics.observe("health_check.duration_ms", (time.monotonic() - start) * 1000)
+    with agent_health_lock:
+        agent_health["report"] = config_info
+        agent_health["checked_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    return system_status()
+
+
+def system_status() -> str:
+    """Return the cached agent health check and the current metrics, without calling the model."""
+    with agent_health_lock:
+        config_info = agent_health["report"]
+        checked_at = agent_health["checked_at"]
+    if config_info is None:
+        config_info = (
+            "\n- __Agent Health Check Status__:\nPending, refresh in a few seconds."
+        )
+    else:
+        config_info += f"\n- __Checked At__:\n{checked_at}"
+    config_info += f"\n\n### Agent Pool\n{metrics.to_markdown('agent_pool.')}"
+    config_info += (
+        f"\n\n### Scheduler\n{scheduler.summary()}\n{metrics.to_markdown('scheduler.')}"
+    )
+    config_info += f"\n\n### Viewer Description Cache\n{description_cache.summary()}"
+    config_info += f"\n\n### Search Cache\n{search_cache_summary()}"
+    config_info += f"\n\n### Content Catalog\n{content_catalog.summary()}"
+    config_info += f"\n\n### Embedding Index\n{embedding_index_summary()}"
+    config_info += f"\n\n### Structured Output\n{structured_output_summary()}"
+    config_info += f"\n\n### Token Usage\n{usage_tracker.summary()}"
+    config_info += f"\n\n### Trending Feed\n{trending_feed.summary()}\n{metrics.to_markdown('trending.')}"
+    config_info += f"\n\n### Constraints\n{metrics.to_markdown('constraints.')}"
+    config_info += f"\n\n### Seen Titles\n{seen_index.summary()}"
+    config_info += f"\n\n### Request Coalescing\n{recommendation_coalescing_summary()}"
+    config_info += f"\n\n### Card Rendering\n{metrics.to_markdown('cards.')}"
+    config_info += f"\n\n### Response Streaming\n{metrics.to_markdown('recommendations.')}\n{metrics.to_markdown('chat.')}"
+    config_info += f"\n\n### Startup\n{metrics.to_markdown('startup.')}\n{metrics.to_markdown('health_check.')}"
     return config_info
 
 
+def start_background_health_check() -> threading.Thread:
+    """Run the agent health check in a daemon thread, so it does not delay startup."""
+
+    def run_health_check():
+        try:
+            check_agent_health()
+        except Exception as e:
+            logger.error(f"Background agent health check failed: {e}")
+            with agent_health_lock:
+                agent_health["report"] = f"\n- __Agent Health Check Error__:\n{e}"
+                agent_health["checked_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    thread = threading.Thread(
+        target=run_health_check, name="agent-health-check", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def structured_output_summary() -> str:
+    summary = f"- __Mode__: {STRUCTURED_OUTPUT_MODE}"
+    for feature in ["recommendations", "chat"]:
+        direct = metrics.counter(f"{feature}.structured_output.direct")
+        fallback = metrics.counter(f"{feature}.structured_output.fallback")
+        total = direct + fallback
+        fallback_rate = fallback / total if total else 0.0
+        summary += f"\n- __{feature}__: {total:g} request(s), {fallback:g} reparse fallback(s) ({fallback_rate:.0%})"
+    return summary
+
+
+def embedding_index_summary() -> str:
+    summary = (
+        f"- __Backend__: {type(embedder).__name__} ({embedder.dimensions} dimensions)"
+    )
+    summary += f"\n- __Indexed Viewers__: {len(viewer_index)}"
+    summary += f"\n- __Indexed Recommendations__: {len(recommendation_index)}"
+    for feature in ["recommendations", "chat"]:
+        summary += f"\n- __{feature} Semantic Duplicates Removed__: {metrics.counter(f'{feature}.semantic_duplicates'):g}"
+    return summary
+
+
+def viewer_profile_text(viewer_profile: ViewerProfile) -> str:
+    """Summarize a profile's preferences and favorites as text, for viewers without a generated description."""
+    preferences = viewer_profile.viewing_preferences
+    favorites = [favorite.title for favorite in viewer_profile.personal_favorites]
+    return " ".join(
+        preferences.favorite_genres
+        + preferences.preferred_themes
+        + preferences.preferred_narrative_elements
+        + preferences.preferred_plots
+        + preferences.preferred_formats
+        + favorites
+    )
+
+
+def index_viewer_text(username: str, text: str, kind: str, profile_hash: str) -> None:
+    """Embed a viewer's description or profile summary, skipping text that is already indexed.
+
+    Args:
+        username (str): The viewer.
+        text (str): The generated description or profile summary.
+        kind (str): "description" or "profile".
+        profile_hash (str): Hash of the profile summary the text was derived from.
+    """
+    text_hash = content_hash(text)
+    metadata = viewer_index.get_metadata(username)
+    if metadata and metadata["hash"] == text_hash:
+        return
+    vector = embedder.embed([text])[0]
+    viewer_index.add(
+        username,
+        vector,
+        {"kind": kind, "hash": text_hash, "profile_hash": profile_hash},
+    )
+
+
+def index_viewer_profile(viewer_profile: ViewerProfile) -> None:
+    """Index a viewer and their liked recommendations.
+
+    A generated description stays indexed for the viewer until their profile summary changes.
+    """
+    username = viewer_profile.registration_information.username
+    text = viewer_profile_text(viewer_profile)
+    profile_hash = content_hash(text)
+    metadata = viewer_index.get_metadata(username)
+    if not (
+        metadata
+        and metadata["kind"] == "description"
+        and metadata["profile_hash"] == profile_hash
+    ):
+        index_viewer_text(username, text, "profile", profile_hash)
+
+    recommendations = [
+        recommendation
+        for recommendation in viewer_profile.recommendations
+        if recommendation.liked
+        and not recommendation_index.get_metadata(f"{username}:{recommendation.title}")
+    ]
+    if not recommendations:
+        return
+    vectors = embedder.embed([f"{rec.title} {rec.reason}" for rec in recommendations])
+    for recommendation, vector in zip(recommendations, vectors):
+        recommendation_index.add(
+            f"{username}:{recommendation.title}",
+            vector,
+            {"username": username, **recommendation.model_dump()},
+        )
+
+
+def deduplicate_recommendations(
+    recommendations: list[Recommendation], feature: str | None = None
+) -> list[Recommendation]:
+    """Drop recommendations whose titles are semantically the same as an earlier one's, e.g., "Alien: Earth" and "Alien Earth"."""
+    if len(recommendations) < 2:
+        return recommendations
+    vectors = embedder.embed(
+        [recommendation.title for recommendation in recommendations]
+    )
+    duplicates = set(find_duplicates(vectors, DEDUP_SIMILARITY))
+    if duplicates and feature:
+        metrics.increment(f"{feature}.semantic_duplicates", len(duplicates))
+    return [
+        recommendation
+        for idx, recommendation in enumerate(recommendations)
+        if idx not in duplicates
+    ]
+
+
+def viewers_like_you(
+    viewer_profile: ViewerProfile, count: int = 4
+) -> list[Recommendation]:
+    """Return recommendations liked by the most similar viewers that this viewer has not seen.
+
+    Args:
+        viewer_profile (ViewerProfile): The viewer.
+        count (int): The maximum number of recommendations to return.
+    Returns:
+        list[Recommendation]: Recommendations ranked by viewer similarity and by similarity to the viewer.
+    """
+    username = viewer_profile.registration_information.username
+    viewer_vector = viewer_index.get_vector(username)
+    if viewer_vector is None:
+        viewer_vector = embedder.embed([viewer_profile_text(viewer_profile)])[0]
+    similar_viewers = {
+        similar_username: similarity
+        for similar_username, _, similarity in viewer_index.search(
+            viewer_vector, SIMILAR_VIEWERS, {username}
+        )
+        if similarity > 0
+    }
+    seen_titles = {
+        recommendation.title for recommendation in viewer_profile.recommendations
+    }
+    seen_titles |= {history.title for history in viewer_profile.viewing_history}
+
+    candidates = []
+    for item_id, metadata, similarity in recommendation_index.search(
+        viewer_vector, len(recommendation_index)
+    ):
+        if (
+            metadata["username"] in similar_viewers
+            and metadata["title"] not in seen_titles
+        ):
+            score = similar_viewers[metadata["username"]] + similarity
+            candidates.append((score, Recommendation.model_validate(metadata)))
+    candidates.sort(key=lambda candidate: -candidate[0])
+    return deduplicate_recommendations(
+        [recommendation for _, recommendation in candidates]
+    )[:count]
+
+
 def fetch_viewer_profiles(file_path: str) -> None:
-    with open(file=file_path, mode="r", encoding="utf-8") as file:
-        data = json.load(file)
+    """Load viewer profiles from the profile store, importing the JSON file on first run.
+
+    Args:
+        file_path (str): The JSON file to import when the profile store is empty.
+    """
     try:
-        global viewer_profiles
-        viewer_profiles = [ViewerProfile.model_validate(user) for user in data]
+        if profile_store.count() == 0:
+            profile_store.import_json(file_path)
+        viewer_profile_index.reset(profile_store.load())
+        for viewer_profile in viewer_profiles:
+            content_catalog.add_recommendations(
+                viewer_profile.recommendations, "profile"
+            )
+            index_viewer_profile(viewer_profile)
+            seen_index.load(viewer_profile)
+        viewer_index.save()
+        recommendation_index.save()
         logger.info(f"Fetched viewer profiles: {len(viewer_profiles)} profiles loaded.")
     except ValidationError as e:
         logger.error(f"Error loading viewer profiles: {e}")
 
 
+startup_timer.mark("imports")
 fetch_viewer_profiles("viewer_profiles.json")
+startup_timer.mark("load_profiles")
 
 
 def fetch_generic_recommendations(file_path: str) -> None:
@@ -82,6 +504,7 @@ def fetch_generic_recommendations(file_path: str) -> None:
     try:
         global generic_recommendations
         generic_recommendations = [Recommendation.model_validate(rec) for rec in data]
+        content_catalog.add_recommendations(generic_recommendations, "generic")
         logger.info(
             f"Fetched generic recommendations: {len(generic_recommendations)} recommendations loaded."
         )
@@ -92,52 +515,110 @@ def fetch_generic_recommendations(file_path: str) -> None:
 fetch_generic_recommendations("generic_recommendations.json")
 
 
-def retrieve_generic_recommendations() -> str:
-    # recommendations = generic_recommendations.model_dump_json(indent=4)
-    recommendations = random.sample(generic_recommendations, 8)
+TRENDING_PROMPT = """Search the Internet for the movies and shows that are trending right now on the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, Disney+, Max, Apple TV+, etc.), and return {{count}} of them, from several platforms.
 
-    return json.dumps(
-        [recommendation.model_dump() for recommendation in recommendations], indent=4
-    )
+Important Notes:
+- Get the current date and time using the current_time tool before searching.
+- For each title, the reason is a one or two sentence description of what it is and why it is popular now.
+- Only return the answer with no additional text, preamble, or explanation.
+- Validate that the URLs actually work."""
+
+
+def fetch_trending_recommendations(count: int) -> list[Recommendation]:
+    """Ask an agent from the pool to find currently trending titles with the search tools."""
+    with (
+        scheduled_checkout("trending") as personalization_agent,
+        usage_tracker.track(personalization_agent, "system", "trending"),
+    ):
+        drop_cache_points(personalization_agent.messages)
+        response = str(
+            personalization_agent(
+                f"{TRENDING_PROMPT.format(count=count)}\n\n{RECOMMENDATION_JSON_FORMAT}"
+            )
+        )
+        trending = parse_recommendation_list(response)
+        if trending is None:
+            trending = personalization_agent.structured_output(
+                RecommendationList, response
+            )
+    recommendations = deduplicate_recommendations(trending.recommendations)
+    content_catalog.add_recommendations(recommendations, "trending")
+    return recommendations
+
+
+# The "Start Watching" grid starts from the trending file and is refreshed in the background
+trending_feed = TrendingFeed(fetch_trending_recommendations, generic_recommendations)
+
+
+def retrieve_generic_recommendations() -> str:
+    """Return a pre-rendered random sample of the trending feed as the card grid HTML."""
+    with span("render.current_trending"):
+        return trending_feed.serve()
 
 
 def save_viewer_profile(viewer_profile: ViewerProfile):
-    """Load viewer profiles from the JSON file and replace or add the given viewer profile.
+    """Upsert the given viewer profile in the profile store and the in-memory profile list.
+
+    Only the sections that differ from the in-memory profile are written, so a
+    section saved meanwhile by another process, e.g., precomputed
+    recommendations, is kept rather than overwritten with a stale copy.
 
     Args:
         viewer_profile (UserProfile): The viewer profile to save.
     """
 
-    with open(file="viewer_profiles.json", mode="r", encoding="utf-8") as f:
-        viewer_profiles = json.load(f)
-        viewer_profiles = [
-            ViewerProfile.model_validate(profile) for profile in viewer_profiles
-        ]
+    with viewer_profiles_lock:
+        previous_profile = viewer_profile_index.get(
+            viewer_profile.registration_information.username
+        )
+        changed_sections = (
+            {
+                section
+                for section in ViewerProfile.model_fields
+                if getattr(previous_profile, section)
+                != getattr(viewer_profile, section)
+            }
+            if previous_profile is not None
+            else None
+        )
+        viewer_profile = profile_store.upsert(viewer_profile, changed_sections)
+        invalidate_viewer_descriptions(previous_profile, viewer_profile)
 
-    for idx, profile in enumerate(viewer_profiles):
-        if (
-            profile.registration_information.username
-            == viewer_profile.registration_information.username
-        ):
-            viewer_profiles[idx] = viewer_profile
+        content_catalog.add_recommendations(viewer_profile.recommendations, "profile")
+        if viewer_profile_index.upsert(viewer_profile):
+            logger.info(
+                f"New viewer profile created: {viewer_profile.registration_information.username}"
+            )
+        else:
             logger.info(
                 f"Viewer profile updated: {viewer_profile.registration_information.username}"
             )
-            break
-    else:
-        viewer_profiles.append(viewer_profile)
-        logger.info(
-            f"New viewer profile created: {viewer_profile.registration_information.username}"
-        )
 
-    with open(file="viewer_profiles.json", mode="w", encoding="utf-8") as f:
-        json.dump([profile.model_dump() for profile in viewer_profiles], f, indent=4)
+    index_viewer_profile(viewer_profile)
+    seen_index.load(viewer_profile)
+    viewer_index.save()
+    recommendation_index.save()
 
     logger.info(
         f"Viewer profile saved: {viewer_profile.registration_information.username}"
     )
 
 
+def invalidate_viewer_descriptions(
+    previous_profile: ViewerProfile | None, viewer_profile: ViewerProfile
+) -> None:
+    """Drop cached descriptions for a viewer if any section used in descriptions has changed."""
+    if previous_profile is None:
+        return
+    if any(
+        getattr(previous_profile, section) != getattr(viewer_profile, section)
+        for section in DESCRIPTION_SECTIONS
+    ):
+        username = viewer_profile.registration_information.username
+        description_cache.delete_prefix(f"{username}:")
+        logger.info(f"Viewer description cache invalidated: {username}")
+
+
 def create_viewer_profile(
     first_name,
     last_name,
@@ -293,19 +774,10 @@ def create_viewer_profile(
         weather=weather_input,
     )
 
-    # get the viewing history section from the existing profile if it exists, otherwise create an empty list
-    viewing_history = []
-    for profile in viewer_profiles:
-        if profile.registration_information.username == username:
-            viewing_history = profile.viewing_history
-            break
-
-    # get the recommendations section from the existing profile if it exists, otherwise create an empty list
-    recommendations = []
-    for profile in viewer_profiles:
-        if profile.registration_information.username == username:
-            recommendations = profile.recommendations
-            break
+    # get the viewing history and recommendations sections from the existing profile if it exists, otherwise create empty lists
+    existing_profile = viewer_profile_index.get(username)
+    viewing_history = existing_profile.viewing_history if existing_profile else []
+    recommendations = existing_profile.recommendations if existing_profile else []
 
     viewer_profile = ViewerProfile(
         registration_information=registration,
@@ -322,10 +794,35 @@ def create_viewer_profile(
     return viewer_profile.model_dump_json(indent=4)
 
 
-def generate_viewer_description(
-    viewer_profile: ViewerProfile, viewer_information_to_include: list[str]
-) -> tuple[str, str]:
+def layout_prompt(instructions: str, request_data: str) -> str | list[dict]:
+    """Combine static instructions with the data for one request, as PROMPT_LAYOUT specifies.
 
+    Returns:
+        str | list[dict]: Content blocks with a cache point between the instructions and the data, or one string in the legacy layout.
+    """
+    if PROMPT_LAYOUT == "legacy":
+        return f"{instructions}\n\n{request_data}"
+    return [
+        {"text": instructions},
+        {"cachePoint": {"type": "default"}},
+        {"text": request_data},
+    ]
+
+
+def drop_cache_points(agent_messages: list[dict]) -> None:
+    """Remove the cache points from a session agent's earlier turns, before the next prompt adds its own.
+
+    Bedrock allows four cache points per request, and the system prompt and tools already use two.
+    """
+    for message in agent_messages:
+        message["content"] = [
+            block for block in message["content"] if "cachePoint" not in block
+        ]
+
+
+def build_viewer_description_prompt(
+    viewer_profile: ViewerProfile, viewer_information_to_include: list[str]
+) -> tuple[dict, str | list[dict]]:
     personalization_data = {}
     for info in viewer_information_to_include:
         if info == "Demographics":
@@ -350,69 +847,550 @@ def generate_viewer_description(
                 history.model_dump_json() for history in viewer_profile.viewing_history
             ]
 
-    viewer_description_prompt_template = f"""Based directly on the following information about the streaming media viewer information below and th guide to the sections of the viewer information, write a description of this viewer. The goal is to use the description to make personalized content recommendations for this viewer. The description should focus on the viewer's preferences, interests, and demographic information. The description should be written in a way that is easy to understand and captures the essence of the viewer's personality and viewing habits.
-    # Important Notes:
-    - Only return the description with no additional text, preamble, explanation, thinking, or reflection on the viewer's information.
-    - Don't focus on which streaming platforms the viewer watched content previously, but rather the type of content they prefer to watch.
-    - Include personal favorites as part of the description to help inform the recommendations.
-
-    # Section Guide
-    Guide to possible sections in the viewer_information data object:
-    1. demographic_information: Information about the viewer's background, such as age, gender, and location.
-    2. viewing_preferences: Information about the viewer's content preferences, such as favorite genres and themes.
-    3. personal_favorites: Information about the viewer's favorite content.
-    4. current_conditions: Information about the current context, such as season, holiday, or weather.
-    5. viewing_history: Information about the viewer's past viewing behavior.
-
-    # Viewer Information:
-    {personalization_data}
-"""
+    viewer_description_prompt_template = layout_prompt(
+        VIEWER_DESCRIPTION_INSTRUCTIONS,
+        f"# Viewer Information:\n{personalization_data}",
+    )
+    return personalization_data, viewer_description_prompt_template
+
+
+def generate_viewer_description(
+    viewer_profile: ViewerProfile,
+    viewer_information_to_include: list[str],
+    session_key: str | None = None,
+    priority: str | None = None,
+) -> tuple[str, str]:
+    with span("prompt.viewer_description"):
+        personalization_data, viewer_description_prompt_template = (
+            build_viewer_description_prompt(
+                viewer_profile, viewer_information_to_include
+            )
+        )
+
+    cache_key = f"{viewer_profile.registration_information.username}:{content_hash(personalization_data)}"
+    viewer_description = description_cache.get(cache_key)
+    annotate(description_cache_hit=viewer_description is not None)
+    if viewer_description is not None:
+        logger.info(f"Viewer description cache hit: {cache_key}")
+        return personalization_data, viewer_description
 
     logger.info(
         f"Viewer Description Prompt Template: {json.dumps(viewer_description_prompt_template)}"
     )
-    viewer_description = personalization_agent(viewer_description_prompt_template)
-    return personalization_data, str(viewer_description)
+    username = viewer_profile.registration_information.username
+    with (
+        scheduled_checkout(
+            "description", session_key, priority
+        ) as personalization_agent,
+        usage_tracker.track(personalization_agent, username, "description"),
+    ):
+        drop_cache_points(personalization_agent.messages)
+        viewer_description = str(
+            personalization_agent(viewer_description_prompt_template)
+        )
+    description_cache.set(cache_key, viewer_description)
+    index_viewer_text(
+        viewer_profile.registration_information.username,
+        viewer_description,
+        "description",
+        content_hash(viewer_profile_text(viewer_profile)),
+    )
+    viewer_index.save()
+    return personalization_data, viewer_description
 
 
-def generate_recommendations(
-    viewer_description: str, recommendation_count: int
+def catalog_candidates(viewer_profile: ViewerProfile) -> list[CatalogMatch]:
+    """Rank the local catalog against a viewer's preferences, leaving out titles they have watched."""
+    content_catalog.add_search_results(search_cache.items())
+    watched_titles = [history.title for history in viewer_profile.viewing_history]
+    watched_titles += [favorite.title for favorite in viewer_profile.personal_favorites]
+    return content_catalog.top_k(
+        viewer_profile.viewing_preferences, CATALOG_CANDIDATES, watched_titles
+    )
+
+
+def local_recommendations(
+    viewer_profile: ViewerProfile, candidates: list[CatalogMatch], count: int
 ) -> list[Recommendation]:
-    recommendations_prompt_template = f"""Based directly on the following description of the viewer in the <viewer_description> tags below, make {recommendation_count} personalized recommendation(s) for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.):
+    """Return picks for the grid that need no agent call: catalog candidates, then similar viewers' favorites.
+
+    Both leave out the titles in the viewer's viewing history and personal favorites.
+    """
+    picks = [candidate.recommendation for candidate in candidates]
+    picks += viewers_like_you(viewer_profile, count)
+    return deduplicate_recommendations(picks)[:count]
+
+
+def merge_recommendations(
+    agent_recommendations: list[Recommendation],
+    local_picks: list[Recommendation],
+    count: int,
+) -> list[Recommendation]:
+    """Fill the grid with the agent's recommendations first and local picks in the remaining slots."""
+    agent_titles = {normalize_title(r.title) for r in agent_recommendations}
+    remaining = [r for r in local_picks if normalize_title(r.title) not in agent_titles]
+    return (agent_recommendations + remaining)[: max(count, len(agent_recommendations))]
+
+
+def add_request_notes(prompt: str | list[dict], notes: str) -> str | list[dict]:
+    """Append notes that apply to this request only, after the cache point of a cached layout prompt."""
+    if isinstance(prompt, list):
+        return prompt + [{"text": notes}]
+    return f"{prompt}\n\n{notes}"
+
+
+def screen_recommendations(
+    recommendations: list[Recommendation],
+    viewing_preferences: ViewingPreferences | None,
+    seen: SeenTitles | None,
+    viewer_description: str,
+    recommendation_count: int,
+    candidates: list[CatalogMatch] | None = None,
+    username: str | None = None,
+    first_pass_tokens: int = 0,
+    priority: str | None = None,
+    origin: str | None = None,
+) -> Iterator[tuple[list[Recommendation], str | None]]:
+    """Drop recommendations that break the viewer's constraints or repeat a title they have seen, and ask the agent only for the missing slots.
+
+    Recommendations on a platform the viewer does not use are demoted rather than
+    dropped. Yields nothing when every recommendation passes. The recommendations
+    finally shown are added to the viewer's seen titles. The tokens saved, compared
+    with running the whole request again, are counted as `constraints.tokens_saved`.
+
+    Args:
+        viewing_preferences (ViewingPreferences, optional): The viewer's constraints; None to skip them.
+        seen (SeenTitles, optional): The viewer's seen titles; None to skip them.
+        origin (str, optional): The id of the shared result being screened, whose own titles are not repeats.
+    Returns:
+        Iterator[tuple[list[Recommendation], str | None]]: The recommendations so far, and a status message, if any.
+    """
+
+    def screen(
+        batch: list[Recommendation], batch_origin: str | None = None
+    ) -> ConstraintResult:
+        with span("constraints.filter", recommendations=len(batch)):
+            if viewing_preferences is not None:
+                result = constraint_filter.apply(viewing_preferences, batch)
+            else:
+                result = ConstraintResult(kept=list(batch))
+            if seen is not None:
+                kept, repeats = seen_index.split(seen, result.kept, batch_origin)
+                demoted, demoted_repeats = seen_index.split(
+                    seen, result.demoted, batch_origin
+                )
+                if SEEN_FILTER:
+                    result.kept, result.demoted = kept, demoted
+                    result.dropped += repeats + demoted_repeats
+        return result
+
+    result = screen(recommendations, origin)
+    if not result.dropped and not result.demoted:
+        if seen is not None:
+            seen_index.record_shown(seen, recommendations, origin)
+        return
+
+    missing = recommendation_count - len(result.ranked)
+    refill_tokens = 0
+    if missing > 0:
+        yield result.ranked, (
+            f"Replacing {len(result.dropped)} recommendation(s) that conflict with the viewer's preferences or were already seen..."
+        )
+        shown_titles = [recommendation.title for recommendation in recommendations]
+        shown = {normalize_title(title) for title in shown_titles}
+        remaining_candidates = [
+            candidate
+            for candidate in candidates or []
+            if normalize_title(candidate.recommendation.title) not in shown
+            and (seen is None or candidate.recommendation.title not in seen)
+        ]
+        with span("prompt.recommendations_refill", missing=missing):
+            refill_prompt = build_recommendations_prompt(
+                viewer_description,
+                missing,
+                remaining_candidates,
+                shown_titles + (seen.recent() if seen is not None else []),
+            )
+            if viewing_preferences is not None:
+                refill_prompt = add_request_notes(
+                    refill_prompt,
+                    constraint_filter.compile(viewing_preferences).instructions(),
+                )
+        usage_records: list[UsageRecord] = []
+        refilled = []
+        for refilled, tool_progress in stream_recommendations(
+            refill_prompt,
+            "recommendations_refill",
+            username=username,
+            usage_records=usage_records,
+            priority=priority,
+        ):
+            yield (result.kept + refilled + result.demoted)[
+                :recommendation_count
+            ], tool_progress
+        content_catalog.add_recommendations(refilled, "agent")
+        # A refilled title that repeats one of the first pass is dropped like any other repeat
+        refill_result = screen(
+            [
+                recommendation
+                for recommendation in refilled
+                if normalize_title(recommendation.title) not in shown
+            ]
+        )
+        result.kept += refill_result.kept
+        result.demoted += refill_result.demoted
+        refill_tokens = sum(usage.total_tokens for usage in usage_records)
+
+    tokens_saved = max(0, first_pass_tokens - refill_tokens)
+    metrics.increment("constraints.tokens_saved", tokens_saved)
+    logger.info(
+        f"Screened recommendations: dropped {len(result.dropped)}, demoted {len(result.demoted)}, "
+        f"refilled {max(missing, 0)} slot(s) with {refill_tokens:,} tokens, "
+        f"~{tokens_saved:,} tokens saved over a full rerun"
+    )
+    final_recommendations = result.ranked[:recommendation_count]
+    if seen is not None:
+        seen_index.record_shown(seen, final_recommendations, origin)
+    yield final_recommendations, None
+
+
+def build_recommendations_prompt(
+    viewer_description: str,
+    recommendation_count: int,
+    candidates: list[CatalogMatch] | None = None,
+    exclude_titles: list[str] | None = None,
+) -> str | list[dict]:
+    candidates_json = "\n".join(
+        json.dumps(
+            {
+                "title": candidate.recommendation.title,
+                "streaming_platform": candidate.recommendation.streaming_platform,
+                "url": candidate.recommendation.url,
+                "preview_keyframe": (
+                    candidate.recommendation.preview_keyframe
+                    if candidate.recommendation.preview_keyframe.startswith("http")
+                    else ""
+                ),
+                "matches": candidate.matched_tags,
+            }
+        )
+        for candidate in candidates or []
+    )
+    exclude_json = json.dumps(exclude_titles) if exclude_titles else ""
+    if PROMPT_LAYOUT == "legacy":
+        prompt = build_legacy_recommendations_prompt(
+            viewer_description, recommendation_count, candidates_json
+        )
+        if exclude_json:
+            prompt += f"\nDo not recommend any of these titles; the viewer has already watched or been recommended them:\n<exclude_titles>\n{exclude_json}\n</exclude_titles>\n"
+        return prompt
+
+    request_data = (
+        f"<recommendation_count>{recommendation_count}</recommendation_count>\n\n"
+        f"<viewer_description>\n{viewer_description}\n</viewer_description>"
+    )
+    if candidates_json:
+        request_data += (
+            f"\n\n<catalog_candidates>\n{candidates_json}\n</catalog_candidates>"
+        )
+    if exclude_json:
+        request_data += f"\n\n<exclude_titles>\n{exclude_json}\n</exclude_titles>"
+    return layout_prompt(RECOMMENDATIONS_INSTRUCTIONS, request_data)
+
+
+def build_legacy_recommendations_prompt(
+    viewer_description: str, recommendation_count: int, candidates_json: str
+) -> str:
+    """The recommendations prompt before PROMPT_LAYOUT, with the request's data between the instructions."""
+    candidates_section = ""
+    search_note = "- Search the Internet for relevant content and validate that the URLs actually work."
+    if candidates_json:
+        candidates_json = candidates_json.replace("\n", "\n    ")
+        candidates_section = f"""
+    The candidates in the <catalog_candidates> tags below are ranked by how well they match the viewer's preferences:
+
+    <catalog_candidates>
+    {candidates_json}
+    </catalog_candidates>
+"""
+        search_note = "- Prefer the catalog candidates. Confirm that each one you choose is still available at its URL and explain why it fits the viewer. Only search the Internet for other content if too few candidates fit, and validate that those URLs actually work."
+
+    return f"""Based directly on the following description of the viewer in the <viewer_description> tags below, make {recommendation_count} personalized recommendation(s) for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.):
 
     <viewer_description>
     {viewer_description}
     </viewer_description>
-
+    {candidates_section}
     Using the structured format provided, return a list of recommendations. Include the title, streaming platform on which the content can be viewed, URL of content, and brief description of the reason why you are recommending it to me.
     
     Important Notes:
     - Get the current date and time using the current_time tool before making recommendations.
     - Only return the recommendations in the structured format with no additional text, preamble, or explanation.
-    - Search the Internet for relevant content and validate that the URLs actually work.
+    {search_note}
     - Always refer to the viewer in first person: "you," "your," and "yours."
+
+    {RECOMMENDATION_JSON_FORMAT}
     """
-    logger.debug(f"Recommendations Prompt Template: {recommendations_prompt_template}")
 
-    personalized_recommendations = personalization_agent(
-        recommendations_prompt_template
-    )
-    logger.debug(f"Raw Recommendations from Agent: {personalized_recommendations}")
 
-    personalized_recommendations = personalization_agent.structured_output(
-        RecommendationList, str(personalized_recommendations)
-    )
+def stream_recommendations(
+    prompt: str | list[dict],
+    feature: str,
+    session_key: str | None = None,
+    username: str | None = None,
+    usage_records: list[UsageRecord] | None = None,
+    priority: str | None = None,
+) -> Iterator[tuple[list[Recommendation], str | None]]:
+    """Run the agent and yield recommendations as each one is completed in the response stream.
+
+    Args:
+        prompt (str | list[dict]): The recommendations prompt, as a string or content blocks.
+        feature (str): Metric name prefix, e.g., "recommendations" or "chat".
+        session_key (str, optional): The Gradio session hash, to reuse the session's conversation.
+        username (str, optional): The user the request is made for, for token usage accounting.
+        usage_records (list[UsageRecord], optional): Receives the token usage of the run, complete once the iterator is exhausted.
+        priority (str, optional): The scheduler priority class, if not the feature's.
+    Returns:
+        Iterator[tuple[list[Recommendation], str | None]]: The recommendations so far, and a tool-call progress message, if any.
+    """
+    parser = RecommendationStreamParser()
+    recommendations: list[Recommendation] = []
+    tool_use_ids = set()
+    response = None
+
+    with (
+        scheduled_checkout(feature, session_key, priority) as personalization_agent,
+        usage_tracker.track(personalization_agent, username, feature) as usage_record,
+    ):
+        if usage_records is not None:
+            usage_records.append(usage_record)
+        drop_cache_points(personalization_agent.messages)
+        for event in stream_agent(personalization_agent, prompt, feature):
+            if "data" in event:
+                completed = parser.feed(event["data"])
+                if completed:
+                    # Keep the cards already shown; skip new ones that repeat an earlier title
+                    kept = deduplicate_recommendations(recommendations + completed)
+                    if len(kept) > len(recommendations):
+                        recommendations = kept
+                        yield list(recommendations), None
+            elif "current_tool_use" in event:
+                tool_use = event["current_tool_use"]
+                if tool_use.get("toolUseId") not in tool_use_ids:
+                    tool_use_ids.add(tool_use.get("toolUseId"))
+                    yield list(recommendations), f"Calling `{tool_use.get('name')}`..."
+            elif "result" in event:
+                response = event["result"]
+        logger.debug(f"Raw Recommendations from Agent: {response}")
+
+        # Use the agent's own JSON when it validates; only reparse it with a second model call when it does not
+        with span("structured_output", mode=STRUCTURED_OUTPUT_MODE):
+            personalized_recommendations = None
+            if STRUCTURED_OUTPUT_MODE == "direct":
+                personalized_recommendations = parse_recommendation_list(str(response))
+            if personalized_recommendations is not None:
+                metrics.increment(f"{feature}.structured_output.direct")
+            else:
+                metrics.increment(f"{feature}.structured_output.fallback")
+                annotate(fallback=True)
+                personalized_recommendations = personalization_agent.structured_output(
+                    RecommendationList, str(response)
+                )
     logger.debug(
         f"Structured Recommendations: {personalized_recommendations.model_dump_json(indent=4)}"
     )
+    yield deduplicate_recommendations(
+        personalized_recommendations.recommendations, feature
+    ), None
+
+
+def recommendations_key(
+    viewer_description: str,
+    recommendation_count: int,
+    candidates: list[CatalogMatch] | None = None,
+) -> str:
+    """Return the key of a recommendations request, ignoring case and whitespace in the description."""
+    return content_hash(
+        [
+            " ".join(viewer_description.lower().split()),
+            recommendation_count,
+            [normalize_title(c.recommendation.title) for c in candidates or []],
+        ]
+    )
+
+
+def shared_recommendations(
+    key: str | None,
+    prompt: str | list[dict],
+    username: str | None = None,
+    usage_records: list[UsageRecord] | None = None,
+    result_ids: list[str] | None = None,
+) -> Iterator[tuple[list[Recommendation], str | None]]:
+    """Yield the recommendations for a request, sharing one agent run between identical requests.
+
+    A request whose result was cached less than `RECOMMENDATION_RESULT_TTL_SECONDS`
+    ago gets it at once. A request identical to one in flight waits for that one's
+    result instead of running the agent. Otherwise, the request leads: it streams
+    like `stream_recommendations` and then shares its result. If the leader fails
+    or is abandoned, the waiting requests run the agent themselves. The prompt of
+    the request that leads is used for all of them, so per-viewer exclusions are
+    applied afterward by `screen_recommendations`.
+
+    Each shared result has an id, so that showing it again to a viewer who has
+    already seen it, e.g., after a double-click, does not count its titles as
+    repeats of themselves in `screen_recommendations`.
+
+    Args:
+        key (str, optional): The request's `recommendations_key`; None to run the agent without sharing.
+        result_ids (list[str], optional): Receives the id of the shared result served, if any.
+    Returns:
+        Iterator[tuple[list[Recommendation], str | None]]: The recommendations so far, and a progress message, if any.
+    """
+    if not RECOMMENDATION_COALESCING or key is None:
+        yield from stream_recommendations(
+            prompt, "recommendations", username=username, usage_records=usage_records
+        )
+        return
+
+    cached = recommendation_results.get(key)
+    if cached is not None:
+        annotate(shared="cache")
+        result_id, recommendations = cached
+        if result_ids is not None:
+            result_ids.append(result_id)
+        yield list(recommendations), None
+        return
+
+    future, leader = recommendation_flight.join(key)
+    if not leader:
+        annotate(shared="in_flight")
+        yield [], "Sharing the results of an identical request already in progress..."
+        try:
+            result_id, recommendations = future.result(
+                timeout=RECOMMENDATION_SHARED_WAIT_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Identical request did not finish, running the agent: {e}")
+            yield from stream_recommendations(
+                prompt,
+                "recommendations",
+                username=username,
+                usage_records=usage_records,
+            )
+            return
+        if result_ids is not None:
+            result_ids.append(result_id)
+        yield list(recommendations), None
+        return
+
+    metrics.increment("recommendation_flight.runs")
+    result_id = uuid.uuid4().hex
+    if result_ids is not None:
+        result_ids.append(result_id)
+    recommendations: list[Recommendation] = []
+    try:
+        for recommendations, tool_progress in stream_recommendations(
+            prompt, "recommendations", username=username, usage_records=usage_records
+        ):
+            yield recommendations, tool_progress
+    except BaseException as e:
+        # A closed generator raises GeneratorExit; the waiting requests get an ordinary error
+        future.set_exception(
+            e if isinstance(e, Exception) else RuntimeError("the request was cancelled")
+        )
+        raise
+    else:
+        if recommendations:
+            recommendation_results.set(key, (result_id, tuple(recommendations)))
+        future.set_result((result_id, recommendations))
+    finally:
+        recommendation_flight.leave(key)
+
+
+def recommendation_coalescing_summary() -> str:
+    return (
+        f"- __Agent Runs__: {metrics.counter('recommendation_flight.runs'):g}\n"
+        f"- __Shared In-Flight Requests__: {metrics.counter('recommendation_flight.shared'):g}\n"
+        f"- __Result Cache Hits__: {metrics.counter('recommendation_results.hits'):g} "
+        f"(TTL {RECOMMENDATION_RESULT_TTL_SECONDS:g}s)"
+    )
 
-    return personalized_recommendations
+
+def generate_recommendations(
+    viewer_description: str,
+    recommendation_count: int,
+    session_key: str | None = None,
+    candidates: list[CatalogMatch] | None = None,
+    username: str | None = None,
+    viewing_preferences: ViewingPreferences | None = None,
+    priority: str | None = None,
+) -> RecommendationList:
+    """Generate recommendations without streaming them, e.g., for precompute.py.
+
+    Args:
+        priority (str, optional): The scheduler priority class, e.g., "background" for batch jobs,
+            which run on their own rather than sharing interactive requests' agent runs.
+    """
+    seen = seen_index.get(username)
+    with span("prompt.recommendations", candidates=len(candidates or [])):
+        recommendations_prompt_template = build_recommendations_prompt(
+            viewer_description,
+            recommendation_count,
+            candidates,
+            seen.recent() if SEEN_FILTER and seen is not None else None,
+        )
+    logger.debug(f"Recommendations Prompt Template: {recommendations_prompt_template}")
+
+    recommendations: list[Recommendation] = []
+    usage_records: list[UsageRecord] = []
+    result_ids: list[str] = []
+    if session_key is not None or priority is not None:
+        # A session's conversation is its own, and batch jobs should not hold up interactive requests
+        recommendation_stream = stream_recommendations(
+            recommendations_prompt_template,
+            "recommendations",
+            session_key,
+            username,
+            usage_records,
+            priority,
+        )
+    else:
+        recommendation_stream = shared_recommendations(
+            recommendations_key(viewer_description, recommendation_count, candidates),
+            recommendations_prompt_template,
+            username,
+            usage_records,
+            result_ids,
+        )
+    for recommendations, _ in recommendation_stream:
+        pass
+
+    # Replace only the recommendations that break the viewer's constraints or that they have already seen
+    if not CONSTRAINT_FILTER:
+        viewing_preferences = None
+    if (viewing_preferences is not None or seen is not None) and recommendations:
+        for recommendations, _ in screen_recommendations(
+            recommendations,
+            viewing_preferences,
+            seen,
+            viewer_description,
+            recommendation_count,
+            candidates,
+            username,
+            sum(usage.total_tokens for usage in usage_records),
+            priority,
+            result_ids[0] if result_ids else None,
+        ):
+            pass
+    return RecommendationList(recommendations=recommendations)
 
 
 def retrieve_viewer_description(
     viewer_profile_index: int,
     viewer_information_to_include: list[str],
+    request: gr.Request = None,
 ) -> tuple[str, str]:
+    admit_request(request, "grid")
     viewer_profile = viewer_profiles[viewer_profile_index]
     logger.debug(f"Viewer Profile: {viewer_profile.model_dump_json(indent=4)}")
 
@@ -449,209 +1427,462 @@ def retrieve_recommendations(
     return formatted_recommendations
 
 
+def retrieve_viewers_like_you(viewer_profile_position: int) -> str:
+    recommendations = viewers_like_you(viewer_profiles[viewer_profile_position])
+    if not recommendations:
+        return "No recommendations from similar viewers yet."
+    formatted_recommendations = ""
+    for recommendation in recommendations:
+        formatted_recommendations += (
+            f"- **{recommendation.title}** on {recommendation.streaming_platform}: "
+            f"[Watch here]({recommendation.url})\n"
+        )
+    return formatted_recommendations
+
+
+def render_recommendations_grid(recommendations: list[Recommendation]) -> str:
+    with span("render.recommendations_grid", recommendations=len(recommendations)):
+        return card_renderer.grid(
+            recommendations,
+            heading="Your Recommendations",
+            empty_message="Your personalized recommendations will appear here...",
+        )
+
+
+def reload_viewer_profile(username: str) -> ViewerProfile | None:
+    """Refresh a viewer's in-memory profile from the profile store, which precompute.py also writes."""
+    stored_profile = profile_store.get(username)
+    if stored_profile is None:
+        return viewer_profile_index.get(username)
+    with viewer_profiles_lock:
+        previous_profile = viewer_profile_index.get(username)
+        if previous_profile == stored_profile:
+            return previous_profile
+        invalidate_viewer_descriptions(previous_profile, stored_profile)
+        content_catalog.add_recommendations(stored_profile.recommendations, "profile")
+        viewer_profile_index.upsert(stored_profile)
+    index_viewer_profile(stored_profile)
+    seen_index.load(stored_profile)
+    viewer_index.save()
+    recommendation_index.save()
+    logger.info(f"Viewer profile reloaded from the profile store: {username}")
+    return stored_profile
+
+
+def retrieve_saved_recommendations(viewer_profile_position: int) -> tuple[str, str]:
+    """Return a viewer's saved (e.g., precomputed) recommendations for the grid, without calling the agent.
+
+    The profile is read from the profile store, so recommendations precomputed
+    while the app is running are shown as soon as the viewer is selected.
+    """
+    viewer_profile = reload_viewer_profile(
+        viewer_profiles[viewer_profile_position].registration_information.username
+    )
+    recommendations = viewer_profile.recommendations
+    if not recommendations:
+        return render_recommendations_grid([]), ""
+    return (
+        render_recommendations_grid(recommendations),
+        f"Showing {len(recommendations)} saved recommendation(s). Generate new ones above.",
+    )
+
+
 def retrieve_recommendations_to_grid(
-    viewer_description: str, recommendation_count: int = 4
-) -> str:
+    viewer_description: str,
+    recommendation_count: int = 4,
+    viewer_profile_position: int | None = None,
+    viewer_information_to_include: list[str] | None = None,
+    request: gr.Request = None,
+) -> Iterator[tuple[str, str]]:
     if not viewer_description or "error" in viewer_description.lower():
-        return "No valid viewer description available for recommendations."
-    recommendations = generate_recommendations(viewer_description, recommendation_count)
-    recommendations = json.dumps(
-        [
-            recommendation.model_dump()
-            for recommendation in recommendations.recommendations
-        ],
-        indent=4,
+        yield render_recommendations_grid(
+            []
+        ), "No valid viewer description available for recommendations."
+        return
+
+    admit_request(request, "grid")
+    start = time.monotonic()
+    viewer_profile = (
+        viewer_profiles[viewer_profile_position]
+        if viewer_profile_position is not None
+        else None
     )
 
-    logger.debug(f"Recommendations as JSON: {recommendations}")
+    # Offer local catalog candidates when the viewer's preferences are part of the personalization
+    candidates = []
+    if viewer_profile is not None and "Viewing Preferences" in (
+        viewer_information_to_include or []
+    ):
+        with span("catalog.candidates"):
+            candidates = catalog_candidates(viewer_profile)
+        logger.info(
+            f"Catalog candidates: {[c.recommendation.title for c in candidates]}"
+        )
 
-    return recommendations
+    # The viewer's constraints apply when their preferences are part of the personalization
+    viewing_preferences = (
+        viewer_profile.viewing_preferences
+        if CONSTRAINT_FILTER
+        and viewer_profile is not None
+        and "Viewing Preferences" in (viewer_information_to_include or [])
+        else None
+    )
+
+    username = (
+        viewer_profile.registration_information.username
+        if viewer_profile is not None
+        else None
+    )
+    seen = seen_index.get(username)
+
+    # Phase one: local picks fill the grid before the agent makes its first search
+    local_picks = []
+    if HYBRID_RECOMMENDATIONS and viewer_profile is not None:
+        with span("recommendations.local"):
+            local_picks = local_recommendations(
+                viewer_profile, candidates, recommendation_count
+            )
+            if viewing_preferences is not None:
+                local_picks = constraint_filter.apply(
+                    viewing_preferences, local_picks
+                ).ranked
+            if SEEN_FILTER and seen is not None:
+                local_picks = [
+                    recommendation
+                    for recommendation in local_picks
+                    if recommendation.title not in seen
+                ]
+    first_card = bool(local_picks)
+    local_status = "Showing quick picks from the catalog while the agent searches for fresh recommendations..."
+    if local_picks:
+        metrics.observe(
+            "recommendations.time_to_first_card_ms", (time.monotonic() - start) * 1000
+        )
+        metrics.increment("recommendations.local_picks", len(local_picks))
+        yield render_recommendations_grid(local_picks), local_status
+
+    with span("prompt.recommendations", candidates=len(candidates or [])):
+        recommendations_prompt_template = build_recommendations_prompt(
+            viewer_description,
+            recommendation_count,
+            candidates,
+            seen.recent() if SEEN_FILTER and seen is not None else None,
+        )
+    logger.debug(f"Recommendations Prompt Template: {recommendations_prompt_template}")
+
+    # Phase two: render each agent card as soon as it is complete in the response stream, in place of a local pick
+    recommendations = []
+    usage_records: list[UsageRecord] = []
+    result_ids: list[str] = []
+    try:
+        for recommendations, tool_progress in shared_recommendations(
+            recommendations_key(viewer_description, recommendation_count, candidates),
+            recommendations_prompt_template,
+            username,
+            usage_records,
+            result_ids,
+        ):
+            if recommendations and not first_card:
+                first_card = True
+                metrics.observe(
+                    "recommendations.time_to_first_card_ms",
+                    (time.monotonic() - start) * 1000,
+                )
+            # Cards already shown come from the fragment cache; only new ones are rendered
+            yield render_recommendations_grid(
+                merge_recommendations(
+                    recommendations, local_picks, recommendation_count
+                )
+            ), tool_progress or (
+                local_status if len(recommendations) < len(local_picks) else ""
+            )
+    except Exception as e:
+        if not local_picks:
+            raise
+        # The quick picks stay on screen rather than an empty grid
+        logger.error(f"Error streaming recommendations, keeping local picks: {e}")
+        yield render_recommendations_grid(
+            merge_recommendations(recommendations, local_picks, recommendation_count)
+        ), "Showing quick picks from the catalog; the agent could not finish. Please try again."
+        return
+
+    # The agent's recommendations become catalog candidates for later requests
+    content_catalog.add_recommendations(recommendations, "agent")
+
+    # Only the slots of recommendations that break the viewer's constraints or repeat a seen title go back to the agent
+    constrained = False
+    if (viewing_preferences is not None or seen is not None) and recommendations:
+        for constrained_recommendations, status in screen_recommendations(
+            recommendations,
+            viewing_preferences,
+            seen,
+            viewer_description,
+            recommendation_count,
+            candidates,
+            username,
+            sum(usage.total_tokens for usage in usage_records),
+            origin=result_ids[0] if result_ids else None,
+        ):
+            constrained = True
+            yield render_recommendations_grid(constrained_recommendations), status or ""
+    # Local picks the agent did not replace are removed once it has made any recommendations
+    if (
+        not constrained
+        and local_picks
+        and 0 < len(recommendations) < recommendation_count
+    ):
+        yield render_recommendations_grid(recommendations), ""
 
 
 def retrieve_viewer_profile(username: str) -> tuple[str, str]:
     # search for the user in viewer_profiles
     logger.info(f"Username: {username}")
-    if username:
-        for profile in viewer_profiles:
-            if profile.registration_information.username == username:
-                return (
-                    profile.model_dump_json(),
-                    profile.registration_information.first_name,
-                )
+    profile = viewer_profile_index.get(username) if username else None
+    if profile:
+        return (
+            profile.model_dump_json(),
+            profile.registration_information.first_name,
+        )
     return "{}", ""
 
 
-def chat_with_agent(
-    history: list, recommendation_count: int = 2
-) -> list[Recommendation]:
-    if not history:
-        return list[Recommendation]()
+def summarize_chat(prompt: str, username: str | None = None) -> str:
+    """Run a chat summarization prompt for the ChatCompactor on an agent from the pool."""
+    with (
+        scheduled_checkout("chat_summary") as personalization_agent,
+        usage_tracker.track(personalization_agent, username, "chat_summary"),
+    ):
+        drop_cache_points(personalization_agent.messages)
+        return str(personalization_agent(prompt))
 
-    for event in history:
-        event.pop("metadata", None)
-        event.pop("options", None)
 
-    recommendations_prompt_template = f"""Based directly on chat history in the <chat_history> tags below, make {recommendation_count} personalized recommendation(s) for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.):
+chat_compactor = ChatCompactor(summarize_chat)
+
+
+def build_chat_prompt(
+    compacted: CompactedChat, recommendation_count: int
+) -> str | list[dict]:
+    summary_section = ""
+    if compacted.summary:
+        summary_section = (
+            f"<conversation_summary>\n{compacted.summary}\n</conversation_summary>\n\n"
+        )
+    shown_section = ""
+    if compacted.shown_titles:
+        shown_section = f"<already_recommended>\n{json.dumps(compacted.shown_titles)}\n</already_recommended>\n\n"
+
+    if PROMPT_LAYOUT == "legacy":
+        context_section = ""
+        if summary_section or shown_section:
+            context_section = f"\n{summary_section}{shown_section}The <conversation_summary> tags summarize the earlier part of the conversation. Do not recommend any title in the <already_recommended> tags.\n"
+        return f"""Based directly on chat history in the <chat_history> tags below, make {recommendation_count} personalized recommendation(s) for recent content on any of the popular streaming media platforms (e.g., Netflix, Hulu, Amazon Prime Video, YouTube, etc.):
 
 <chat_history>
-{json.dumps(history, indent=4)}
+{json.dumps(compacted.recent_messages, indent=4)}
 </chat_history>
-
+{context_section}
 Using the structured format provided, return a list of recommendations. Include the title, streaming platform on which the content can be viewed, URL of content, and brief description of the content.
 
 Important Notes:
 - Get the current date and time using the current_time tool before making recommendations.
 - Only return the answer with no additional text, preamble, or explanation.
 - Search the Internet for relevant content and validate that the URLs actually work.
+
+{RECOMMENDATION_JSON_FORMAT}
     """
 
-    logger.info(f"Recommendations Prompt Template: {recommendations_prompt_template}")
-    personalized_recommendations = personalization_agent(
-        recommendations_prompt_template
+    return layout_prompt(
+        CHAT_RECOMMENDATIONS_INSTRUCTIONS,
+        f"<recommendation_count>{recommendation_count}</recommendation_count>\n\n"
+        f"{summary_section}{shown_section}"
+        f"<chat_history>\n{json.dumps(compacted.recent_messages)}\n</chat_history>",
     )
-    try:
-        personalized_recommendations = personalization_agent.structured_output(
-            RecommendationList, str(personalized_recommendations)
-        )
 
-        formatted_recommendations = ""
-        for recommendation in personalized_recommendations.recommendations:
-            formatted_recommendations += (
-                f"## {recommendation.title}\n\n"
-                f"**Available on:** {recommendation.streaming_platform}  \n"
-                f"**Link:** [Watch here]({recommendation.url})  \n"
-                f"**Description:** {recommendation.reason}  \n\n"
+
+def chat_with_agent(
+    history: list, recommendation_count: int = 2, request: gr.Request = None
+) -> Iterator[tuple[str, str | None]]:
+    """Stream recommendations for the chat history as formatted Markdown.
+
+    Returns:
+        Iterator[tuple[str, str | None]]: The Markdown so far, and a tool-call progress message, if any.
+    """
+    if not history:
+        return
+
+    # Drop tool-call progress messages; they are only shown in the chat window
+    history = [event for event in history if not event.get("metadata")]
+    for event in history:
+        event.pop("metadata", None)
+        event.pop("options", None)
+
+    admit_request(request, "chat")
+    session_key = _session_key(request)
+    username = getattr(request, "username", None)
+    with span("prompt.chat", turns=len(history)):
+        if CHAT_COMPACTION:
+            compacted = chat_compactor.compact(session_key, history)
+        else:
+            compacted = CompactedChat(
+                "", history, [], estimate_tokens(json.dumps(history))
             )
-        return formatted_recommendations
+        recommendations_prompt_template = build_chat_prompt(
+            compacted, recommendation_count
+        )
+    metrics.observe("chat.prompt_tokens", compacted.prompt_tokens)
+
+    logger.info(f"Recommendations Prompt Template: {recommendations_prompt_template}")
+    recommendations = []
+    try:
+        # With compaction, the prompt carries the conversation, so any agent will do; without it,
+        # chat keeps its conversation on the agent checked out for this Gradio session
+        for recommendations, tool_progress in stream_recommendations(
+            recommendations_prompt_template,
+            "chat",
+            None if CHAT_COMPACTION else session_key,
+            username,
+        ):
+            with span("render.chat_markdown", recommendations=len(recommendations)):
+                formatted_recommendations = ""
+                for recommendation in recommendations:
+                    formatted_recommendations += (
+                        f"## {recommendation.title}\n\n"
+                        f"**Available on:** {recommendation.streaming_platform}  \n"
+                        f"**Link:** [Watch here]({recommendation.url})  \n"
+                        f"**Description:** {recommendation.reason}  \n\n"
+                    )
+            yield formatted_recommendations, tool_progress
     except ValidationError as e:
         logger.error(f"Error parsing recommendations from agent response: {e}")
-        return personalized_recommendations.message.get(
-            "content", "No recommendations received."
+        yield "No recommendations received.", None
+
+    if CHAT_COMPACTION:
+        chat_compactor.record_turn(
+            session_key,
+            history,
+            [recommendation.title for recommendation in recommendations],
+            username,
         )
 
 
 def generate_welcome_message(request: gr.Request):
-    # search for the user in viewer_profiles
-    for idx, profile in enumerate(viewer_profiles):
-        if profile.registration_information.username == request.username:
-            return (
-                f"Welcome, {profile.registration_information.first_name}",
-                idx,
-                profile.registration_information.first_name,
-                profile.registration_information.last_name,
-                profile.registration_information.username,
-                profile.registration_information.password,
-                profile.registration_information.email,
-                profile.personalization,
-                profile.demographic_information.gender,
-                profile.demographic_information.age_group,
-                profile.demographic_information.primary_language,
-                profile.demographic_information.relationship_status,
-                profile.demographic_information.income_range,
-                profile.demographic_information.occupation,
-                profile.demographic_information.country_region,
-                profile.demographic_information.education_level,
-                profile.demographic_information.ethnicity,
-                profile.viewing_preferences.favorite_genres,
-                profile.viewing_preferences.genres_to_avoid,
-                profile.viewing_preferences.preferred_narrative_elements,
-                profile.viewing_preferences.preferred_themes,
-                profile.viewing_preferences.preferred_plots,
-                profile.viewing_preferences.preferred_formats,
-                profile.viewing_preferences.preferred_min_lengths,
-                profile.viewing_preferences.ratings_to_avoid,
-                profile.viewing_preferences.preferred_streaming_services,
-                (
-                    profile.personal_favorites[0].title
-                    if len(profile.personal_favorites) > 0
-                    else None
-                ),
-                (
-                    profile.personal_favorites[0].platform
-                    if len(profile.personal_favorites) > 0
-                    else None
-                ),
-                (
-                    profile.personal_favorites[1].title
-                    if len(profile.personal_favorites) > 1
-                    else None
-                ),
-                (
-                    profile.personal_favorites[1].platform
-                    if len(profile.personal_favorites) > 1
-                    else None
-                ),
-                (
-                    profile.personal_favorites[2].title
-                    if len(profile.personal_favorites) > 2
-                    else None
-                ),
-                (
-                    profile.personal_favorites[2].platform
-                    if len(profile.personal_favorites) > 2
-                    else None
-                ),
-                (
-                    profile.personal_favorites[3].title
-                    if len(profile.personal_favorites) > 3
-                    else None
-                ),
-                (
-                    profile.personal_favorites[3].platform
-                    if len(profile.personal_favorites) > 3
-                    else None
-                ),
-                (
-                    profile.personal_favorites[4].title
-                    if len(profile.personal_favorites) > 4
-                    else None
-                ),
-                (
-                    profile.personal_favorites[4].platform
-                    if len(profile.personal_favorites) > 4
-                    else None
-                ),
-                profile.current_conditions.season,
-                profile.current_conditions.holiday,
-                profile.current_conditions.occasion,
-                profile.current_conditions.audience,
-                profile.current_conditions.weather,
-                (
-                    f"{profile.viewing_history[0].viewed_date} | {profile.viewing_history[0].format} | {profile.viewing_history[0].title} | {profile.viewing_history[0].platform} | {'👍' if profile.viewing_history[0].liked else '👎'}"
-                    if len(profile.viewing_history) > 0
-                    else None
-                ),
-                (
-                    f"{profile.viewing_history[1].viewed_date} | {profile.viewing_history[1].format} | {profile.viewing_history[1].title} | {profile.viewing_history[1].platform} | {'👍' if profile.viewing_history[1].liked else '👎'}"
-                    if len(profile.viewing_history) > 1
-                    else None
-                ),
-                (
-                    f"{profile.viewing_history[2].viewed_date} | {profile.viewing_history[2].format} | {profile.viewing_history[2].title} | {profile.viewing_history[2].platform} | {'👍' if profile.viewing_history[2].liked else '👎'}"
-                    if len(profile.viewing_history) > 2
-                    else None
-                ),
-                (
-                    f"{profile.viewing_history[3].viewed_date} | {profile.viewing_history[3].format} | {profile.viewing_history[3].title} | {profile.viewing_history[3].platform} | {'👍' if profile.viewing_history[3].liked else '👎'}"
-                    if len(profile.viewing_history) > 3
-                    else None
-                ),
-                (
-                    f"{profile.viewing_history[4].viewed_date} | {profile.viewing_history[4].format} | {profile.viewing_history[4].title} | {profile.viewing_history[4].platform} | {'👍' if profile.viewing_history[4].liked else '👎'}"
-                    if len(profile.viewing_history) > 4
-                    else None
-                ),
-                retrieve_generic_recommendations(),
-            )
+    # look up the user and their position in the viewer dropdown
+    idx = viewer_profile_index.position(request.username)
+    if idx is not None:
+        profile = viewer_profiles[idx]
+        return (
+            f"Welcome, {profile.registration_information.first_name}",
+            idx,
+            profile.registration_information.first_name,
+            profile.registration_information.last_name,
+            profile.registration_information.username,
+            profile.registration_information.password,
+            profile.registration_information.email,
+            profile.personalization,
+            profile.demographic_information.gender,
+            profile.demographic_information.age_group,
+            profile.demographic_information.primary_language,
+            profile.demographic_information.relationship_status,
+            profile.demographic_information.income_range,
+            profile.demographic_information.occupation,
+            profile.demographic_information.country_region,
+            profile.demographic_information.education_level,
+            profile.demographic_information.ethnicity,
+            profile.viewing_preferences.favorite_genres,
+            profile.viewing_preferences.genres_to_avoid,
+            profile.viewing_preferences.preferred_narrative_elements,
+            profile.viewing_preferences.preferred_themes,
+            profile.viewing_preferences.preferred_plots,
+            profile.viewing_preferences.preferred_formats,
+            profile.viewing_preferences.preferred_min_lengths,
+            profile.viewing_preferences.ratings_to_avoid,
+            profile.viewing_preferences.preferred_streaming_services,
+            (
+                profile.personal_favorites[0].title
+                if len(profile.personal_favorites) > 0
+                else None
+            ),
+            (
+                profile.personal_favorites[0].platform
+                if len(profile.personal_favorites) > 0
+                else None
+            ),
+            (
+                profile.personal_favorites[1].title
+                if len(profile.personal_favorites) > 1
+                else None
+            ),
+            (
+                profile.personal_favorites[1].platform
+                if len(profile.personal_favorites) > 1
+                else None
+            ),
+            (
+                profile.personal_favorites[2].title
+                if len(profile.personal_favorites) > 2
+                else None
+            ),
+            (
+                profile.personal_favorites[2].platform
+                if len(profile.personal_favorites) > 2
+                else None
+            ),
+            (
+                profile.personal_favorites[3].title
+                if len(profile.personal_favorites) > 3
+                else None
+            ),
+            (
+                profile.personal_favorites[3].platform
+                if len(profile.personal_favorites) > 3
+                else None
+            ),
+            (
+                profile.personal_favorites[4].title
+                if len(profile.personal_favorites) > 4
+                else None
+            ),
+            (
+                profile.personal_favorites[4].platform
+                if len(profile.personal_favorites) > 4
+                else None
+            ),
+            profile.current_conditions.season,
+            profile.current_conditions.holiday,
+            profile.current_conditions.occasion,
+            profile.current_conditions.audience,
+            profile.current_conditions.weather,
+            (
+                f"{profile.viewing_history[0].viewed_date} | {profile.viewing_history[0].format} | {profile.viewing_history[0].title} | {profile.viewing_history[0].platform} | {'👍' if profile.viewing_history[0].liked else '👎'}"
+                if len(profile.viewing_history) > 0
+                else None
+            ),
+            (
+                f"{profile.viewing_history[1].viewed_date} | {profile.viewing_history[1].format} | {profile.viewing_history[1].title} | {profile.viewing_history[1].platform} | {'👍' if profile.viewing_history[1].liked else '👎'}"
+                if len(profile.viewing_history) > 1
+                else None
+            ),
+            (
+                f"{profile.viewing_history[2].viewed_date} | {profile.viewing_history[2].format} | {profile.viewing_history[2].title} | {profile.viewing_history[2].platform} | {'👍' if profile.viewing_history[2].liked else '👎'}"
+                if len(profile.viewing_history) > 2
+                else None
+            ),
+            (
+                f"{profile.viewing_history[3].viewed_date} | {profile.viewing_history[3].format} | {profile.viewing_history[3].title} | {profile.viewing_history[3].platform} | {'👍' if profile.viewing_history[3].liked else '👎'}"
+                if len(profile.viewing_history) > 3
+                else None
+            ),
+            (
+                f"{profile.viewing_history[4].viewed_date} | {profile.viewing_history[4].format} | {profile.viewing_history[4].title} | {profile.viewing_history[4].platform} | {'👍' if profile.viewing_history[4].liked else '👎'}"
+                if len(profile.viewing_history) > 4
+                else None
+            ),
+            retrieve_generic_recommendations(),
+        )
     return "User not found."
 
 
 def authenticate_user(username, password):
     # if the username and password match from viewer_profiles then allow in
-    for profile in viewer_profiles:
-        if (
-            profile.registration_information.username == username
-            and profile.registration_information.password == password
-        ):
-            return True
-    return False
+    profile = viewer_profile_index.get(username)
+    return profile is not None and profile.registration_information.password == password